@@ -0,0 +1,207 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Each (Location, Violation_Type) pair is one daily series
+SERIES_DIMENSIONS = ['Location', 'Violation_Type']
+
+# Weight of the newest same-weekday observation in the baseline (about five weeks of memory)
+EWMA_ALPHA = 0.2
+# A day is a spike when it is this many deviations above its baseline...
+Z_THRESHOLD = 3.0
+# ...has at least this many violations...
+MIN_COUNT = 3
+# ...and its weekday baseline has seen this many weeks
+WARMUP_WEEKS = 4
+# Weeks folded per closed-form block, which keeps (1 - alpha) ** -k finite
+EWMA_BLOCK = 128
+
+ALERT_COLUMNS = SERIES_DIMENSIONS + ['Date', 'Count', 'Expected', 'Z_Score']
+
+
+def daily_counts(cells, dims=SERIES_DIMENSIONS):
+    """
+    Violations per series and day from cube cells (or any frame with Date,
+    categorical series dimensions and Count). Returns the [series x days]
+    count matrix, the series labels as a MultiIndex and the first day.
+    Cells with a missing date or dimension are left out.
+    """
+    valid = cells['Date'].notna().to_numpy().copy()
+    # Series are numbered over the dimensions' category codes, not their strings
+    key = np.zeros(len(cells), dtype=np.int64)
+    categories = []
+    for dim in dims:
+        values = cells[dim]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype('category')
+        codes = values.cat.codes.to_numpy()
+        valid &= codes >= 0
+        categories.append(np.asarray(values.cat.categories.astype(str), dtype=object))
+        key = key * len(categories[-1]) + codes
+    if not valid.any():
+        return np.zeros((0, 0), dtype='float32'), pd.MultiIndex.from_arrays([[]] * len(dims), names=dims), None
+
+    days = cells['Date'].to_numpy()[valid].astype('datetime64[D]')
+    first = days.min()
+    day_codes = (days - first).astype(np.int64)
+    n_days = int(day_codes.max()) + 1
+    keys, series_codes = np.unique(key[valid], return_inverse=True)
+
+    labels = []
+    for dim_categories in reversed(categories):
+        labels.append(dim_categories[keys % len(dim_categories)])
+        keys = keys // len(dim_categories)
+    series = pd.MultiIndex.from_arrays(labels[::-1], names=dims)
+    counts = np.bincount(series_codes.ravel() * n_days + day_codes,
+                         weights=cells['Count'].to_numpy(dtype='float64')[valid], minlength=len(series) * n_days)
+    return counts.reshape(len(series), n_days).astype('float32'), series, first
+
+
+def _linear_recursion(u, y0, decay):
+    """
+    All states of y[t] = decay * y[t-1] + u[t] along axis 1, starting from y0,
+    without a Python loop over t: y[t] = decay**(t+1) * (y0 + sum_j decay**-(j+1) * u[j]).
+    """
+    out = np.empty_like(u)
+    for start in range(0, u.shape[1], EWMA_BLOCK):
+        block = u[:, start:start + EWMA_BLOCK]
+        powers = decay ** np.arange(1, block.shape[1] + 1)
+        out[:, start:start + block.shape[1]] = powers * (y0[:, None] + np.cumsum(block / powers, axis=1))
+        y0 = out[:, start + block.shape[1] - 1]
+    return out
+
+
+def _ewma_baseline(x, mean0, var0, alpha):
+    """
+    Exponentially weighted mean and variance of each row of x before each
+    observation, and after the last one.
+    """
+    if x.shape[1] == 0:
+        return x.copy(), x.copy(), mean0, var0
+    decay = 1 - alpha
+    mean = _linear_recursion(alpha * x, mean0, decay)
+    prior_mean = np.concatenate([mean0[:, None], mean[:, :-1]], axis=1)
+    diff = x - prior_mean
+    var = _linear_recursion(decay * alpha * diff * diff, var0, decay)
+    prior_var = np.concatenate([var0[:, None], var[:, :-1]], axis=1)
+    return prior_mean, prior_var, mean[:, -1], var[:, -1]
+
+
+class SpikeDetector:
+    """
+    Flags days on which a (Location, Violation_Type) series spikes above its
+    seasonal baseline: an EWMA mean and variance kept per series and weekday.
+
+    All series are scored together; the only Python loop is over the seven
+    weekdays. The last day seen may still be receiving rows, so it is scored
+    but not folded into the baselines until a later day arrives. appended()
+    then only processes the new days.
+    """
+
+    def __init__(self, alpha=EWMA_ALPHA, threshold=Z_THRESHOLD, min_count=MIN_COUNT, warmup=WARMUP_WEEKS):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_count = min_count
+        self.warmup = warmup
+        self.series = pd.MultiIndex.from_arrays([[]] * len(SERIES_DIMENSIONS), names=SERIES_DIMENSIONS)
+        self.mean = np.zeros((0, 7))
+        self.var = np.zeros((0, 7))
+        # Days folded per weekday; series first seen later count as zero on the earlier days
+        self.seen = np.zeros(7, dtype=np.int64)
+        # First day not yet folded into the baselines, and its counts so far
+        self.next_day = None
+        self.pending = np.zeros(0)
+        self.alerts = pd.DataFrame(columns=ALERT_COLUMNS)
+
+    @classmethod
+    def from_cells(cls, cells, **params):
+        return cls(**params).appended(cells)
+
+    def __len__(self):
+        return len(self.series)
+
+    def appended(self, cells):
+        """
+        Returns a detector that also covers cells of new rows, none of which
+        may fall before next_day.
+        """
+        counts, series, first = daily_counts(cells)
+        if first is None:
+            return self
+        if self.next_day is not None and first < self.next_day:
+            raise ValueError("Cells before the last processed day need a full rebuild")
+
+        detector = copy.copy(self)
+        detector.series = self.series.append(series[~series.isin(self.series)])
+        n_new = len(detector.series) - len(self.series)
+        detector.mean = np.vstack([self.mean, np.zeros((n_new, 7))])
+        detector.var = np.vstack([self.var, np.zeros((n_new, 7))])
+
+        start = first if self.next_day is None else self.next_day
+        offset = int((first - start).astype(np.int64))
+        matrix = np.zeros((len(detector.series), offset + counts.shape[1]))
+        matrix[detector.series.get_indexer(series), offset:] = counts
+        matrix[:len(self.pending), 0] += self.pending
+        detector._advance(matrix, start)
+        return detector
+
+    def _advance(self, matrix, start):
+        n_days = matrix.shape[1]
+        first_weekday = pd.Timestamp(start).dayofweek
+        mean, var, seen = self.mean.copy(), self.var.copy(), self.seen.copy()
+        found = []
+
+        for offset in range(min(7, n_days)):
+            weekday = (first_weekday + offset) % 7
+            days = np.arange(offset, n_days, 7)
+            x = matrix[:, days]
+            # The last day is only scored; its baseline is the state after the earlier weeks
+            n_folded = len(days) - (days[-1] == n_days - 1)
+            prior_mean, prior_var, mean[:, weekday], var[:, weekday] = _ewma_baseline(
+                x[:, :n_folded], mean[:, weekday], var[:, weekday], self.alpha)
+            if n_folded < len(days):
+                prior_mean = np.hstack([prior_mean, mean[:, weekday, None]])
+                prior_var = np.hstack([prior_var, var[:, weekday, None]])
+            prior_seen = seen[weekday] + np.arange(len(days))
+            seen[weekday] += n_folded
+
+            # Poisson-like floor so sparse series are not flagged for a single extra violation
+            z = (x - prior_mean) / np.sqrt(np.maximum(np.maximum(prior_var, prior_mean), 1.0))
+            rows, cols = np.nonzero((z >= self.threshold) & (x >= self.min_count) & (prior_seen >= self.warmup))
+            found.append((rows, days[cols], x[rows, cols], prior_mean[rows, cols], z[rows, cols]))
+
+        rows, days, counts, expected, z = (np.concatenate(parts) for parts in zip(*found))
+        alerts = pd.DataFrame({dim: self.series.get_level_values(i)[rows] for i, dim in enumerate(SERIES_DIMENSIONS)})
+        alerts['Date'] = pd.to_datetime(np.datetime64(start, 'D') + days)
+        alerts['Count'] = counts.astype('int64')
+        alerts['Expected'] = expected
+        alerts['Z_Score'] = z
+        # Alerts of the previous in-progress day are replaced by its rescored ones
+        kept = self.alerts[self.alerts['Date'] < pd.Timestamp(start)] if self.next_day is not None else self.alerts
+        self.alerts = pd.concat([kept, alerts], ignore_index=True) if len(kept) else alerts
+
+        self.mean, self.var, self.seen = mean, var, seen
+        self.next_day = np.datetime64(start, 'D') + n_days - 1
+        self.pending = matrix[:, -1].copy()
+
+    def select(self, date_range=None, **selections):
+        """
+        Alerts matching the sidebar filters, newest and strongest first.
+        """
+        alerts = self.alerts
+        mask = np.ones(len(alerts), dtype=bool)
+        if date_range is not None:
+            start, end = (pd.Timestamp(day) for day in date_range)
+            mask &= ((alerts['Date'] >= start) & (alerts['Date'] <= end)).to_numpy()
+        for col, values in selections.items():
+            if values is not None and col in alerts.columns:
+                mask &= alerts[col].isin([str(value) for value in values]).to_numpy()
+        return alerts[mask].sort_values(['Date', 'Z_Score'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def aggregates(cube):
+    """
+    Spike alerts over the days and series of the (filtered) cube.
+    """
+    return SpikeDetector.from_cells(cube.cuboid('daily')).select()
@@ -0,0 +1,40 @@
+def violation_counts(cube):
+    """
+    Count and fine measures per violation type, most frequent first.
+    """
+    return cube.rollup(['Violation_Type']).sort_values('Count', ascending=False, kind='stable')
+
+
+def state_counts(cube):
+    """
+    Violations per state, most frequent first.
+    """
+    counts = cube.rollup(['Location']).sort_values('Count', ascending=False, kind='stable')
+    return counts[['Location', 'Count']].rename(columns={'Location': 'State'})
+
+
+def daily_series(cube):
+    """
+    Daily violation counts and fines with the running total of fines.
+    """
+    daily_stats = cube.rollup(['Date']).rename(columns={
+        'Date': 'Datetime', 'Count': 'Violations', 'Fine_Sum': 'Daily_Fines'
+    })
+    daily_stats['Cumulative_Fines'] = daily_stats['Daily_Fines'].cumsum()
+    return daily_stats
+
+
+def aggregates(cube):
+    """
+    Everything the dashboard page shows: KPIs, rankings and the daily series.
+    """
+    by_violation = violation_counts(cube)
+    return {
+        'totals': cube.totals(),
+        'by_violation': by_violation,
+        'top_5': by_violation.head(5).set_index('Violation_Type')['Count'],
+        'viol_counts': by_violation[['Violation_Type', 'Count']].rename(columns={'Violation_Type': 'Violation Type'}),
+        'state_counts': state_counts(cube),
+        'daily_stats': daily_series(cube),
+        'paid_count': cube.where(Fine_Paid=['Yes']).totals()['Count'],
+    }
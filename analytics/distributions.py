@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# Above this many points, row-level scatter plots switch to a binned density
+SCATTER_ROW_THRESHOLD = 5000
+DENSITY_BINS = 60
+# Rows kept next to a density grid to estimate what the raw scatter would have cost
+PAYLOAD_SAMPLE_ROWS = 500
+# Distribution summaries for box and violin plots
+KDE_GRID_POINTS = 100
+OUTLIER_SAMPLE = 50
+
+
+def _bin_edges(values, bins):
+    lo, hi = values.min(), values.max()
+    # Small integer ranges get one bin per value so discrete data is not aliased
+    if np.issubdtype(values.dtype, np.integer) and hi - lo < bins:
+        return np.arange(lo - 0.5, hi + 1.5)
+    if lo == hi:
+        return np.array([lo - 0.5, hi + 0.5])
+    return np.linspace(lo, hi, bins + 1)
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """
+    2D histogram of two numeric columns, ignoring rows where either is missing.
+    Returns bin centers and counts with empty cells set to NaN.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    valid = ~(np.isnan(x.astype('float64')) | np.isnan(y.astype('float64')))
+    x, y = x[valid], y[valid]
+    if len(x) == 0:
+        return {'x': [], 'y': [], 'z': [[]], 'points': 0}
+
+    x_edges, y_edges = _bin_edges(x, bins), _bin_edges(y, bins)
+    counts, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges])
+    counts[counts == 0] = np.nan
+    return {
+        'x': (x_edges[:-1] + x_edges[1:]) / 2,
+        'y': (y_edges[:-1] + y_edges[1:]) / 2,
+        # Heatmap rows are y bins
+        'z': counts.T,
+        'points': len(x),
+    }
+
+
+def _group_quantile(sorted_values, starts, counts, q):
+    # Linear interpolation between closest ranks, as numpy.quantile does
+    pos = starts + q * (counts - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, starts + counts - 1)
+    frac = pos - lo
+    return sorted_values[lo] + frac * (sorted_values[hi] - sorted_values[lo])
+
+
+def distribution_summary(groups, values, grid_points=KDE_GRID_POINTS, outlier_sample=OUTLIER_SAMPLE):
+    """
+    Box and violin statistics of values per group, computed for all groups in
+    one vectorized pass: quartiles, Tukey whiskers, a bounded sample of
+    outliers and a Gaussian KDE on a grid shared by every group.
+    """
+    if isinstance(groups.dtype, pd.CategoricalDtype):
+        codes, names = groups.cat.codes.to_numpy(), groups.cat.categories
+    else:
+        codes, names = pd.factorize(groups, sort=True)
+    values = np.asarray(values, dtype='float64')
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+
+    # Sort by group, then value, so each group is a contiguous sorted run.
+    # A stable sort on the small integer codes after a value sort is faster than lexsort.
+    order = np.argsort(values)
+    order = order[np.argsort(codes[order], kind='stable')]
+    sorted_codes, sorted_values = codes[order], values[order]
+    counts = np.bincount(sorted_codes, minlength=len(names))
+    present = np.flatnonzero(counts)
+    if len(present) == 0:
+        return None
+    starts = (np.cumsum(counts) - counts)[present]
+    counts = counts[present]
+    # Renumber groups 0..len(present)-1
+    group_of = np.full(len(names), -1)
+    group_of[present] = np.arange(len(present))
+    sorted_groups = group_of[sorted_codes]
+
+    q1 = _group_quantile(sorted_values, starts, counts, 0.25)
+    median = _group_quantile(sorted_values, starts, counts, 0.5)
+    q3 = _group_quantile(sorted_values, starts, counts, 0.75)
+    iqr = q3 - q1
+    low_limit, high_limit = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+    inlier = (sorted_values >= low_limit[sorted_groups]) & (sorted_values <= high_limit[sorted_groups])
+    lowerfence = np.full(len(present), np.inf)
+    upperfence = np.full(len(present), -np.inf)
+    np.minimum.at(lowerfence, sorted_groups[inlier], sorted_values[inlier])
+    np.maximum.at(upperfence, sorted_groups[inlier], sorted_values[inlier])
+
+    # Evenly spaced sample of at most outlier_sample outliers per group
+    outlier_idx = np.flatnonzero(~inlier)
+    outlier_groups = sorted_groups[outlier_idx]
+    n_outliers = np.bincount(outlier_groups, minlength=len(present))
+    rank = np.arange(len(outlier_idx)) - (np.cumsum(n_outliers) - n_outliers)[outlier_groups]
+    step = np.maximum(np.ceil(n_outliers / outlier_sample), 1).astype(np.int64)
+    keep = outlier_idx[rank % step[outlier_groups] == 0]
+
+    # KDE: histogram every group on a shared fine grid, then smooth each row
+    # with its own Gaussian kernel (Scott's rule bandwidth)
+    grid = np.linspace(sorted_values.min(), sorted_values.max(), grid_points)
+    span = grid[-1] - grid[0] or 1.0
+    bins = np.clip(np.round((sorted_values - grid[0]) / span * (grid_points - 1)).astype(np.int64), 0, grid_points - 1)
+    hist = np.bincount(sorted_groups * grid_points + bins, minlength=len(present) * grid_points)
+    hist = hist.reshape(len(present), grid_points).astype('float64')
+
+    sums = np.bincount(sorted_groups, weights=sorted_values, minlength=len(present))
+    sq_sums = np.bincount(sorted_groups, weights=sorted_values ** 2, minlength=len(present))
+    mean = sums / counts
+    std = np.sqrt(np.maximum(sq_sums / counts - mean ** 2, 0))
+    bandwidth = np.maximum(1.06 * std * counts ** -0.2, span / grid_points)
+    diffs = (grid[:, None] - grid[None, :])[None, :, :] / bandwidth[:, None, None]
+    kernels = np.exp(-0.5 * diffs ** 2)
+    density = np.einsum('gj,gij->gi', hist, kernels) / (counts * bandwidth * np.sqrt(2 * np.pi))[:, None]
+
+    return {
+        'names': [str(name) for name in names[present]],
+        'count': counts,
+        'mean': mean,
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': lowerfence, 'upperfence': upperfence,
+        'min': sorted_values[starts], 'max': sorted_values[starts + counts - 1],
+        'outlier_group': sorted_groups[keep], 'outlier_value': sorted_values[keep],
+        'grid': grid, 'density': density,
+    }
@@ -0,0 +1,49 @@
+from analytics.distributions import PAYLOAD_SAMPLE_ROWS, density_grid, distribution_summary
+
+REPEAT_COLUMNS = ['Driver_Age', 'Previous_Violations', 'Driver_Gender', 'Fine_Amount']
+
+
+def age_bounds(df):
+    return int(df['Driver_Age'].min()), int(df['Driver_Age'].max())
+
+
+def age_bands(df):
+    """
+    Violations and the share by repeat offenders per age band, youngest first.
+    """
+    bands = df[['Age_Band', 'Repeat_Offender']].groupby('Age_Band', observed=False)['Repeat_Offender']
+    return bands.agg(Violations='size', Repeat_Share='mean').reset_index()
+
+
+def recidivism(df, scatter_threshold=None):
+    """
+    Drivers with previous violations: their count and either their rows or,
+    above scatter_threshold, an age x previous violations density grid with
+    a small sample of rows.
+    """
+    repeat_offenders = df[df['Repeat_Offender']]
+    repeat_rows, repeat_density = None, None
+    if scatter_threshold is not None and len(repeat_offenders) > scatter_threshold:
+        repeat_density = density_grid(repeat_offenders['Driver_Age'], repeat_offenders['Previous_Violations'])
+        repeat_rows = repeat_offenders.head(PAYLOAD_SAMPLE_ROWS)[REPEAT_COLUMNS]
+    else:
+        repeat_rows = repeat_offenders[REPEAT_COLUMNS]
+    return {
+        'repeat_count': len(repeat_offenders),
+        'repeat_rows': repeat_rows,
+        'repeat_density': repeat_density,
+    }
+
+
+def aggregates(df, age_range=None, scatter_threshold=None):
+    """
+    Age and fine distributions by gender plus recidivism for drivers within age_range.
+    """
+    if age_range is not None:
+        df = df[(df['Driver_Age'] >= age_range[0]) & (df['Driver_Age'] <= age_range[1])]
+    return {
+        'age_summary': distribution_summary(df['Driver_Gender'], df['Driver_Age']),
+        'fine_summary': distribution_summary(df['Driver_Gender'], df['Fine_Amount']),
+        'age_bands': age_bands(df),
+        **recidivism(df, scatter_threshold),
+    }
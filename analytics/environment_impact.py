@@ -0,0 +1,5 @@
+def aggregates(cube):
+    """
+    Violations per weather condition and per road condition.
+    """
+    return cube.rollup(['Weather_Condition']), cube.rollup(['Road_Condition'])
@@ -0,0 +1,122 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Filters shared by every view, as produced by the sidebar
+FILTER_KEYS = ('date_range', 'Location', 'Violation_Type')
+
+
+def parse_filter_spec(spec):
+    """
+    Converts a JSON filter spec into the filter state FilterIndex.select and
+    ViolationCube.where take. Dates are ISO strings; missing keys mean no constraint.
+    """
+    unknown = set(spec) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {sorted(unknown)}")
+
+    filters = {key: spec.get(key) for key in FILTER_KEYS}
+    if filters['date_range'] is not None:
+        start, end = (datetime.date.fromisoformat(day) for day in filters['date_range'])
+        filters['date_range'] = (start, end)
+    return filters
+
+
+def default_filters(index):
+    """
+    The filter state the sidebar starts with: the full date range and every
+    location and violation type.
+    """
+    filters = {'date_range': index.date_bounds()}
+    for col in FILTER_KEYS[1:]:
+        if index.indexes(col):
+            filters[col] = index.options(col)
+    return filters
+
+
+class FrameSelection:
+    """
+    A filtered view of a shared frame: the frame and the positions of the
+    selected rows, a slice or an array. Columns are gathered only when read
+    and never written back, so a session's filters cost its row positions
+    instead of a copy of every column.
+
+    Supports the frame operations the row-level pages use: one column as a
+    Series, a list of columns as a DataFrame, a boolean mask as a narrower
+    selection, iloc/head over positions, len, empty, columns and attrs.
+    """
+
+    def __init__(self, df, rows=None):
+        self.df = df
+        self.rows = slice(0, len(df)) if rows is None else rows
+        self.columns = df.columns
+        self.attrs = df.attrs
+
+    def __len__(self):
+        if isinstance(self.rows, slice):
+            return len(range(*self.rows.indices(len(self.df))))
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def nbytes(self):
+        """
+        Memory held by the selection itself: its row positions.
+        """
+        return 0 if isinstance(self.rows, slice) else self.rows.nbytes
+
+    def positions(self):
+        if isinstance(self.rows, slice):
+            return np.arange(*self.rows.indices(len(self.df)))
+        return self.rows
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            values = self.df[key]
+            return values.iloc[self.rows] if isinstance(self.rows, slice) else values.take(self.rows)
+        if isinstance(key, pd.Series) and pd.api.types.is_bool_dtype(key.dtype):
+            return FrameSelection(self.df, self.positions()[key.to_numpy(dtype=bool)])
+        return self.frame(key)
+
+    @property
+    def iloc(self):
+        return _PositionIndexer(self)
+
+    def head(self, n=5):
+        return self.iloc[:n]
+
+    def frame(self, columns=None):
+        """
+        The selected rows of the given columns (all by default) as a DataFrame.
+        """
+        columns = list(self.columns if columns is None else columns)
+        if isinstance(self.rows, slice):
+            return self.df.iloc[self.rows][columns]
+        return self.df[columns].take(self.rows)
+
+
+class _PositionIndexer:
+    def __init__(self, selection):
+        self.selection = selection
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("FrameSelection.iloc only takes slices")
+        rows = self.selection.rows
+        if isinstance(rows, slice):
+            # Slicing a range composes the two slices without materializing positions
+            selected = range(*rows.indices(len(self.selection.df)))[key]
+            return FrameSelection(self.selection.df, slice(selected.start, selected.stop, selected.step))
+        return FrameSelection(self.selection.df, rows[key])
+
+
+def filter_frame(df, index, filters):
+    """
+    Applies a sidebar filter state to df using its FilterIndex. Returns a
+    FrameSelection over df, which is shared and never copied or modified.
+    """
+    return FrameSelection(df, index.select(**filters))
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from analytics.sketches import GROUP_COLUMN, TOP_K_COLUMN
+
+# Officers listed by default
+TOP_OFFICERS = 20
+
+
+def agency_workload(sketches, date_range=None):
+    """
+    Violations, estimated active officers and estimated distinct drivers per
+    issuing agency, busiest first.
+    """
+    officers, _ = sketches.distinct('Officers', date_range)
+    drivers, _ = sketches.distinct('Drivers', date_range)
+    agencies = pd.DataFrame({
+        GROUP_COLUMN: sketches.groups,
+        'Violations': sketches.group_counts(date_range).to_numpy(),
+        'Officers': officers.round().to_numpy(),
+        'Drivers': drivers.round().to_numpy(),
+    })
+    agencies = agencies[agencies['Violations'] > 0]
+    agencies['Per_Officer'] = agencies['Violations'] / agencies['Officers'].clip(lower=1)
+    return agencies.sort_values('Violations', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def top_officers(sketches, date_range=None, top_n=TOP_OFFICERS):
+    """
+    The top_n issuing officers with their counted violations and the most
+    their true count may exceed it.
+    """
+    top = sketches.top_items(top_n, date_range)
+    return top.rename(columns={'Count': 'Violations', 'Error': 'Max_Error'})[[TOP_K_COLUMN, 'Violations', 'Max_Error']]
+
+
+def aggregates(sketches, date_range=None, top_n=TOP_OFFICERS):
+    """
+    Everything the officer workload page shows, from the per-day sketches
+    merged over date_range.
+    """
+    _, officers = sketches.distinct('Officers', date_range)
+    _, drivers = sketches.distinct('Drivers', date_range)
+    return {
+        'totals': {
+            'Violations': int(sketches.group_counts(date_range).sum()),
+            'Officers': round(officers),
+            'Drivers': round(drivers),
+        },
+        'agencies': agency_workload(sketches, date_range),
+        'top_officers': top_officers(sketches, date_range, top_n),
+    }
@@ -0,0 +1,185 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Attributes whose values are combined into patterns. Hour_Band is derived from Hour.
+PATTERN_ATTRIBUTES = [
+    'Violation_Type', 'Weather_Condition', 'Road_Condition', 'Vehicle_Type', 'Hour_Band', 'Location',
+]
+
+# Hour band name -> first hour of the band
+HOUR_BANDS = {'Night': 0, 'Morning': 6, 'Afternoon': 12, 'Evening': 18}
+
+MIN_SUPPORT = 0.01
+MAX_ITEMS = 3
+# Combined keys up to this many values are counted with a dense bincount
+DENSE_KEY_LIMIT = 1 << 22
+
+
+def _hour_band_codes(hours):
+    hours = np.asarray(hours, dtype='float64')
+    codes = np.digitize(hours, list(HOUR_BANDS.values())[1:])
+    return np.where(np.isnan(hours), -1, codes)
+
+
+def hour_bands(hours):
+    """
+    Band of each hour of day out of HOUR_BANDS, as a categorical.
+    """
+    return pd.Categorical.from_codes(_hour_band_codes(hours).astype(np.int8), categories=list(HOUR_BANDS))
+
+
+def encode(cells, attributes):
+    """
+    Integer codes (-1 for missing) and value labels of each attribute over
+    the cube cells. Hour_Band is derived from Hour unless the cells hold it.
+    """
+    codes, labels = {}, {}
+    for attr in attributes:
+        if attr == 'Hour_Band' and attr not in cells.columns:
+            codes[attr] = _hour_band_codes(cells['Hour'])
+            labels[attr] = np.asarray(list(HOUR_BANDS), dtype=object)
+        else:
+            codes[attr] = cells[attr].cat.codes.to_numpy().astype(np.int64)
+            labels[attr] = np.asarray(cells[attr].cat.categories.astype(str), dtype=object)
+    return codes, labels
+
+
+def _count(keys, weights, size):
+    # Weighted count per distinct key, only for keys that occur
+    if size <= DENSE_KEY_LIMIT:
+        counts = np.bincount(keys, weights=weights, minlength=size)
+        present = np.flatnonzero(counts)
+        return present, counts[present]
+    present, inverse = np.unique(keys, return_inverse=True)
+    return present, np.bincount(inverse, weights=weights)
+
+
+def frequent_itemsets(codes, cards, weights, min_count, max_items=MAX_ITEMS):
+    """
+    Apriori over integer codes: every itemset takes at most one value per
+    attribute and is identified by a mixed-radix key over its attributes.
+    Each level counts all candidate keys of an attribute combination with one
+    bincount, over the rows whose (k-1)-subsets are all frequent.
+    Returns {attribute tuple: (keys, counts)} of itemsets with at least
+    min_count weight.
+    """
+    attributes = list(codes)
+    frequent = {}
+    # Per combination of the previous level, whether each row holds a frequent itemset
+    row_frequent = {}
+    for attr in attributes:
+        valid = codes[attr] >= 0
+        keys, counts = _count(codes[attr][valid], weights[valid], cards[attr])
+        keep = counts >= min_count
+        if keep.any():
+            frequent[(attr,)] = (keys[keep], counts[keep])
+            lookup = np.zeros(cards[attr] + 1, dtype=bool)
+            lookup[keys[keep]] = True
+            # Code -1 reads the extra False at the end
+            row_frequent[(attr,)] = lookup[codes[attr]]
+
+    for k in range(2, max_items + 1):
+        level = {}
+        for combo in combinations(attributes, k):
+            subsets = list(combinations(combo, k - 1))
+            if any(subset not in row_frequent for subset in subsets):
+                continue
+            mask = np.logical_and.reduce([row_frequent[subset] for subset in subsets])
+            if not mask.any():
+                continue
+            size = int(np.prod([cards[attr] for attr in combo]))
+            row_keys = _keys(codes, cards, combo)
+            keys, counts = _count(row_keys[mask], weights[mask], size)
+            keep = counts >= min_count
+            if keep.any():
+                frequent[combo] = (keys[keep], counts[keep])
+                if k < max_items:
+                    level[combo] = _holds(row_keys, mask, keys[keep], size)
+        if not level:
+            break
+        row_frequent = level
+    return frequent
+
+
+def _holds(row_keys, mask, keys, size):
+    # Rows in mask whose key is one of keys
+    held = np.zeros(len(row_keys), dtype=bool)
+    if size <= DENSE_KEY_LIMIT:
+        lookup = np.zeros(size, dtype=bool)
+        lookup[keys] = True
+        held[mask] = lookup[row_keys[mask]]
+    else:
+        held[mask] = np.isin(row_keys[mask], keys)
+    return held
+
+
+def _keys(codes, cards, combo):
+    # Mixed-radix key of the combo's codes; the first attribute is the most significant
+    key = np.zeros(len(codes[combo[0]]), dtype=np.int64)
+    for attr in combo:
+        key = key * cards[attr] + codes[attr]
+    return key
+
+
+def _decode(keys, cards, combo):
+    decoded = {}
+    for attr in reversed(combo):
+        decoded[attr] = keys % cards[attr]
+        keys = keys // cards[attr]
+    return decoded
+
+
+def frequent_patterns(cube, attributes=None, min_support=MIN_SUPPORT, max_items=MAX_ITEMS):
+    """
+    Attribute combinations of two or more values that occur in at least
+    min_support of the violations, with their count, support and lift (the
+    ratio of the observed support to the support expected if the values were
+    independent). Counted over the cube cells weighted by their violation
+    count, so the cost depends on cells, not raw rows.
+    """
+    attributes = list(attributes or PATTERN_ATTRIBUTES)
+    columns = ['Pattern', 'Items', 'Count', 'Support', 'Lift'] + attributes
+    cells = cube.cuboid('patterns')
+    weights = cells['Count'].to_numpy(dtype='float64')
+    total = weights.sum()
+    if not total:
+        return pd.DataFrame(columns=columns)
+
+    codes, labels = encode(cells, attributes)
+    cards = {attr: max(len(labels[attr]), 1) for attr in attributes}
+    frequent = frequent_itemsets(codes, cards, weights, min_support * total, max_items)
+
+    # Support of every single value, for the lift denominators
+    item_support = {}
+    for attr in attributes:
+        support = np.zeros(cards[attr])
+        if (attr,) in frequent:
+            keys, counts = frequent[(attr,)]
+            support[keys] = counts / total
+        item_support[attr] = support
+
+    frames = []
+    for combo, (keys, counts) in frequent.items():
+        if len(combo) < 2:
+            continue
+        decoded = _decode(keys, cards, combo)
+        support = counts / total
+        expected = np.prod([item_support[attr][decoded[attr]] for attr in combo], axis=0)
+        values = {attr: labels[attr][decoded[attr]] for attr in combo}
+        pattern = pd.Series([f"{combo[0]}="] * len(keys)) + values[combo[0]]
+        for attr in combo[1:]:
+            pattern = pattern + f" & {attr}=" + values[attr]
+        frames.append(pd.DataFrame({
+            'Pattern': pattern, 'Items': len(combo), 'Count': counts.astype('int64'),
+            'Support': support, 'Lift': support / expected, **values,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    patterns = pd.concat(frames, ignore_index=True).reindex(columns=columns)
+    return patterns.sort_values(['Lift', 'Count'], ascending=False, kind='stable').reset_index(drop=True)
+
+
+def aggregates(cube, min_support=MIN_SUPPORT, max_items=MAX_ITEMS, attributes=None):
+    return frequent_patterns(cube, attributes, min_support, max_items)
@@ -0,0 +1,22 @@
+def payment_status(cube):
+    return cube.rollup(['Fine_Paid'])
+
+
+def payment_methods(cube):
+    """
+    Paid fines per payment method, most used first.
+    """
+    method_counts = cube.where(Fine_Paid=['Yes']).rollup(['Payment_Method'])
+    return method_counts.sort_values('Count', ascending=False, kind='stable').set_index('Payment_Method')['Count']
+
+
+def payment_by_violation(cube):
+    return cube.rollup(['Violation_Type', 'Fine_Paid'])
+
+
+def aggregates(cube):
+    return {
+        'paid_counts': payment_status(cube),
+        'method_counts': payment_methods(cube),
+        'payment_breakdown': payment_by_violation(cube),
+    }
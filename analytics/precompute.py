@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    anomalies, dashboard, driver_behavior, environment_impact, patterns, payment_trends, risk_map,
+    time_analysis, vehicle_risk, violation_trends
+)
+from analytics.distributions import SCATTER_ROW_THRESHOLD
+from analytics.filters import filter_frame, parse_filter_spec
+from utils.cube import ViolationCube
+from utils.data_loader import prepare_data
+from utils.dataset import row_source
+from utils.filter_index import FilterIndex
+
+# Aggregates of every page, computed from the filtered frame, the filtered cube and the page's options
+VIEW_AGGREGATES = {
+    'dashboard': lambda df, cube, options: dashboard.aggregates(cube),
+    'anomalies': lambda df, cube, options: anomalies.aggregates(cube),
+    'risk_map': lambda df, cube, options: risk_map.aggregates(cube),
+    'violation_trends': lambda df, cube, options: violation_trends.aggregates(df, **options),
+    'time_analysis': lambda df, cube, options: time_analysis.aggregates(cube, **options),
+    'vehicle_risk': lambda df, cube, options: vehicle_risk.aggregates(df, **options),
+    'driver_behavior': lambda df, cube, options: driver_behavior.aggregates(df, **options),
+    'environment_impact': lambda df, cube, options: environment_impact.aggregates(cube),
+    'payment_trends': lambda df, cube, options: payment_trends.aggregates(cube),
+    'patterns': lambda df, cube, options: patterns.aggregates(cube, **options),
+}
+
+
+def default_options(df, cube):
+    """
+    Page options as the dashboard initially shows them.
+    """
+    return {
+        'violation_trends': {'min_fine': 0, 'scatter_threshold': SCATTER_ROW_THRESHOLD},
+        'time_analysis': {'violation_types': time_analysis.violation_options(cube)[:3]},
+        'vehicle_risk': {'selected_types': vehicle_risk.vehicle_types(df)[:5]},
+        'driver_behavior': {'age_range': (18, 60), 'scatter_threshold': SCATTER_ROW_THRESHOLD},
+    }
+
+
+def compute_views(df, index, cube, filters, options=None, views=None):
+    """
+    Computes the aggregates of the given views (all by default) for one
+    filter state. Returns the results, the options used and per-view seconds.
+    """
+    df_filtered = filter_frame(df, index, filters)
+    cube_filtered = cube.where(**filters)
+    view_options = default_options(df_filtered, cube_filtered)
+    for view, overrides in (options or {}).items():
+        view_options[view] = {**view_options.get(view, {}), **overrides}
+
+    results, seconds = {}, {}
+    for view in views or VIEW_AGGREGATES:
+        start = time.perf_counter()
+        results[view] = VIEW_AGGREGATES[view](df_filtered, cube_filtered, view_options.get(view, {}))
+        seconds[view] = round(time.perf_counter() - start, 4)
+    return results, view_options, seconds
+
+
+def to_json_value(value):
+    """
+    Converts aggregate results (frames, series, arrays, numpy scalars) to plain JSON values.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return json.loads(value.to_json(orient='split', date_format='iso'))
+    if isinstance(value, np.ndarray):
+        holder = pd.Series(value) if value.ndim == 1 else pd.DataFrame(value)
+        return json.loads(holder.to_json(orient='values', date_format='iso'))
+    if isinstance(value, dict):
+        return {str(key): to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def write_results(out_dir, results, manifest):
+    os.makedirs(out_dir, exist_ok=True)
+    for view, value in results.items():
+        with open(os.path.join(out_dir, f"{view}.json"), "w") as f:
+            json.dump(to_json_value(value), f, default=str)
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(to_json_value(manifest), f, indent=2, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the aggregates of every dashboard page.")
+    parser.add_argument("file_path", nargs="?", default="Indian_Traffic_Violations.csv")
+    parser.add_argument("--spec", help='JSON file with {"filters": {...}, "options": {view: {...}}}.')
+    parser.add_argument("--out", default="precomputed", help="Directory the results are written to.")
+    parser.add_argument("--views", nargs="+", choices=list(VIEW_AGGREGATES), help="Only compute these views.")
+    args = parser.parse_args()
+
+    spec = {}
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f)
+    try:
+        filters = parse_filter_spec(spec.get("filters", {}))
+    except ValueError as e:
+        parser.exit(1, f"{args.spec}: {e}\n")
+
+    df = prepare_data(args.file_path)
+    index = FilterIndex(df)
+    cube = ViolationCube.from_frame(df, rows=row_source(df, index))
+    results, options, seconds = compute_views(df, index, cube, filters, spec.get("options"), args.views)
+    write_results(args.out, results, {
+        "source": args.file_path,
+        "rows": len(df),
+        "filters": filters,
+        "options": options,
+        "seconds": seconds,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    for view, took in seconds.items():
+        print(f"{view:20s} {took:.3f}s")
+    print(f"Wrote {len(results)} views to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import copy
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# t-digest compression: at most compression / 2 centroids per cell and metric
+COMPRESSION = 100
+# Percentiles shown for each metric, by column label
+PERCENTILES = {'Median': 0.5, 'P90': 0.9, 'P99': 0.99}
+QUANTILE_METRICS = ['Fine_Amount', 'Recorded_Speed', 'Overspeed', 'Alcohol_Level']
+# Columns the metrics are computed from
+SOURCE_COLUMNS = ['Fine_Amount', 'Recorded_Speed', 'Speed_Limit', 'Alcohol_Level']
+# Digests are kept per month partition and these dimensions
+CELL_DIMENSIONS = ['Location', 'Violation_Type']
+
+# Month of rows without a timestamp, and label of a missing dimension value
+UNDATED = np.iinfo(np.int64).min
+MISSING = ''
+
+
+def metric_values(df):
+    """
+    Values of each of QUANTILE_METRICS for the rows of df, as float64 with
+    NaN where missing. Overspeed is the signed Recorded_Speed - Speed_Limit,
+    unlike the stored Overspeed feature, which is clipped at 0.
+    """
+    speed = df['Recorded_Speed'].to_numpy(dtype='float64', na_value=np.nan)
+    return {
+        'Fine_Amount': df['Fine_Amount'].to_numpy(dtype='float64', na_value=np.nan),
+        'Recorded_Speed': speed,
+        'Overspeed': speed - df['Speed_Limit'].to_numpy(dtype='float64', na_value=np.nan),
+        'Alcohol_Level': df['Alcohol_Level'].to_numpy(dtype='float64', na_value=np.nan),
+    }
+
+
+def compress(cells, values, weights, compression=COMPRESSION):
+    """
+    t-digest centroids of weighted points sorted by cell, then value. Points
+    are grouped into centroids of consecutive values whose quantiles within
+    their cell fall in one unit of the k1 scale function, so centroids are
+    small near the tails and large near the median. A heavy value stays a
+    single centroid. Returns the cell, mean and weight of each centroid.
+    """
+    if not len(values):
+        return cells[:0], values[:0].astype(np.float32), weights[:0]
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    sizes = np.diff(np.r_[starts, len(values)])
+    cumulative = np.cumsum(weights, dtype=np.float64)
+    before = cumulative - weights - np.repeat(cumulative[starts] - weights[starts], sizes)
+    totals = np.repeat(np.add.reduceat(weights.astype(np.float64), starts), sizes)
+    q = (before + weights / 2) / totals
+    buckets = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1) + compression / 4).astype(np.int64)
+
+    keys = cells.astype(np.int64) * (compression // 2 + 2) + buckets
+    bounds = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    centroid_weights = np.add.reduceat(weights, bounds)
+    sums = np.add.reduceat(values * weights, bounds)
+    return cells[bounds], (sums / centroid_weights).astype(np.float32), centroid_weights
+
+
+def weighted_quantiles(means, weights, qs):
+    """
+    Quantiles of centroids sorted by mean. Each centroid spans the ranks of
+    its points at its mean, and values between centroids are interpolated
+    linearly, which matches numpy's default quantile on unit weights.
+    """
+    last = np.cumsum(weights, dtype=np.float64) - 1
+    if not len(last) or last[-1] < 0:
+        return np.full(len(qs), np.nan)
+    ranks = np.asarray(qs) * last[-1]
+    # The first centroid whose ranks reach each target; below its first rank
+    # the value lies between it and the previous centroid
+    i = np.searchsorted(last, ranks)
+    first = last[i] - weights[i] + 1
+    previous = np.maximum(i - 1, 0)
+    gap = np.maximum(first - last[previous], 1)
+    fraction = np.clip((ranks - last[previous]) / gap, 0, 1)
+    values = means[previous] + fraction * (means[i].astype(np.float64) - means[previous])
+    return np.where(ranks >= first, means[i], values)
+
+
+class QuantileSketches:
+    """
+    Mergeable t-digests of the QUANTILE_METRICS per (month partition,
+    Location, Violation_Type) cell, so percentiles for any sidebar filter
+    come from merging digests instead of sorting rows.
+
+    Centroids of each metric are kept sorted by mean across all cells, so a
+    filter only masks them by cell. Months the date range covers partly are
+    read from rows: rows(filters, columns) returns them as a frame. Appended
+    rows are folded into the digests of the cells they fall in.
+    """
+
+    def __init__(self, rows=None, compression=COMPRESSION):
+        self.rows = rows
+        self.compression = compression
+        self.cells = pd.MultiIndex.from_arrays([[]] * 3, names=['Month'] + CELL_DIMENSIONS)
+        # First and last day with data in each dated month (days since the epoch)
+        self.months = pd.DataFrame({'First': np.zeros(0, np.int64), 'Last': np.zeros(0, np.int64)},
+                                   index=pd.Index([], dtype=np.int64, name='Month'))
+        self.centroids = {metric: (np.zeros(0, np.int64), np.zeros(0, np.float32), np.zeros(0, np.uint32))
+                          for metric in QUANTILE_METRICS}
+        self.filters = None
+        self.key = [uuid.uuid4().hex]
+
+    @classmethod
+    def from_frame(cls, df, rows=None, **params):
+        return cls(rows, **params).appended(df)
+
+    def _cell_codes(self, df):
+        """
+        Month of each row and the distinct cells of df as a MultiIndex, with
+        the position of each row's cell in it.
+        """
+        timestamps = df['Datetime'].to_numpy()
+        months = timestamps.astype('datetime64[M]').astype(np.int64)
+        months[np.isnat(timestamps)] = UNDATED
+        # Cells are numbered over integer codes, not labels, as in daily_counts
+        month_codes, month_labels = pd.factorize(months)
+        key, levels = month_codes.astype(np.int64), [np.asarray(month_labels)]
+        for dim in CELL_DIMENSIONS:
+            codes, labels = pd.factorize(df[dim])
+            labels = np.append(np.asarray(labels.astype(str), dtype=object), MISSING)
+            key = key * len(labels) + np.where(codes < 0, len(labels) - 1, codes)
+            levels.append(labels)
+        keys, inverse = np.unique(key, return_inverse=True)
+        labels = []
+        for level in reversed(levels):
+            labels.append(level[keys % len(level)])
+            keys = keys // len(level)
+        return months, pd.MultiIndex.from_arrays(labels[::-1], names=self.cells.names), inverse
+
+    def appended(self, df, rows=None):
+        """
+        Returns sketches that also cover the rows of df; rows replaces the
+        row source when given.
+        """
+        out = copy.copy(self)
+        out.rows = rows or self.rows
+        out.key = [uuid.uuid4().hex]
+        if not len(df):
+            return out
+        months, batch_cells, inverse = self._cell_codes(df)
+        out.cells = self.cells.append(batch_cells[~batch_cells.isin(self.cells)])
+        cell_codes = out.cells.get_indexer(batch_cells)[inverse]
+
+        timestamps = df['Datetime']
+        dated = timestamps.notna().to_numpy()
+        days = timestamps.to_numpy()[dated].astype('datetime64[D]').astype(np.int64)
+        batch_months = pd.DataFrame({'Month': months[dated], 'First': days, 'Last': days})
+        out.months = pd.concat([self.months.reset_index(), batch_months]).groupby('Month').agg(
+            {'First': 'min', 'Last': 'max'})
+
+        out.centroids = {}
+        for metric, values in metric_values(df).items():
+            old_cells, old_means, old_weights = self.centroids[metric]
+            valid = ~np.isnan(values)
+            touched = np.zeros(len(out.cells), dtype=bool)
+            touched[cell_codes[valid]] = True
+            # Centroids of the cells the batch falls in are re-compressed with its points
+            kept = ~touched[old_cells]
+            cells = np.concatenate([old_cells[~kept], cell_codes[valid]])
+            points = np.concatenate([old_means[~kept].astype(np.float64), values[valid]])
+            weights = np.concatenate([old_weights[~kept], np.ones(valid.sum(), dtype=np.uint32)])
+            # A stable sort on the cell codes after a value sort is faster than
+            # lexsort, and a radix sort when the codes fit in 16 bits
+            order = np.argsort(points)
+            codes = cells[order].astype(np.uint16) if len(out.cells) <= 1 << 16 else cells[order]
+            order = order[np.argsort(codes, kind='stable')]
+            cells, means, weights = compress(cells[order], points[order], weights[order], self.compression)
+            # Both parts are sorted by mean, so the stable sort only merges two runs
+            order = np.argsort(means, kind='stable')
+            cells, means, weights = (np.concatenate([old[kept], new[order]]) for old, new in
+                                     ((old_cells, cells), (old_means, means), (old_weights, weights)))
+            order = np.argsort(means, kind='stable')
+            out.centroids[metric] = (cells[order], means[order], weights[order])
+        return out
+
+    def where(self, date_range=None, **selections):
+        """
+        The sketches restricted to a sidebar filter state; percentiles() then
+        merges the matching cells.
+        """
+        for col in selections:
+            if col not in CELL_DIMENSIONS:
+                raise ValueError(f"Percentiles cannot be filtered by {col}")
+        out = copy.copy(self)
+        out.filters = {'date_range': date_range, **selections}
+        out.key = self.key + [out.filters]
+        return out
+
+    def _selected_cells(self):
+        """
+        Mask over cells whose digests are merged, and the sub-ranges of
+        partly covered months whose rows are read instead.
+        """
+        filters = self.filters or {}
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim in CELL_DIMENSIONS:
+            if filters.get(dim) is not None:
+                mask &= self.cells.get_level_values(dim).isin([str(value) for value in filters[dim]])
+
+        edges = []
+        if filters.get('date_range') is not None:
+            start, end = (np.datetime64(pd.Timestamp(day).date(), 'D').astype(np.int64) for day in filters['date_range'])
+            months = self.months
+            full = months.index[(months['First'] >= start) & (months['Last'] <= end)]
+            partial = months[(months['First'] <= end) & (months['Last'] >= start) & ~months.index.isin(full)]
+            mask &= self.cells.get_level_values('Month').isin(full)
+            for first, last in zip(partial['First'], partial['Last']):
+                edges.append(tuple(np.datetime64(int(day), 'D').astype(object) for day in (max(first, start), min(last, end))))
+        return mask, edges
+
+    def percentiles(self, qs=PERCENTILES):
+        """
+        Percentiles of each metric under the filters, with the number of rows
+        they cover.
+        """
+        mask, edges = self._selected_cells()
+        edge_values = {metric: [] for metric in QUANTILE_METRICS}
+        for date_range in edges:
+            rows = self.rows({**(self.filters or {}), 'date_range': date_range}, SOURCE_COLUMNS)
+            for metric, values in metric_values(rows).items():
+                edge_values[metric].append(values[~np.isnan(values)].astype(np.float32))
+
+        results = []
+        for metric in QUANTILE_METRICS:
+            cells, means, weights = self.centroids[metric]
+            if not mask.all():
+                selected = np.flatnonzero(mask[cells])
+                means, weights = means[selected], weights[selected]
+            if edge_values[metric]:
+                # Rows of partly covered months are merged as unit-weight points;
+                # with both runs sorted the stable sort only merges them
+                values = np.sort(np.concatenate(edge_values[metric]))
+                means = np.concatenate([means, values])
+                order = np.argsort(means, kind='stable')
+                means = means[order]
+                weights = np.concatenate([weights, np.ones(len(values), dtype=np.uint32)])[order]
+            results.append([metric, int(weights.sum()), *weighted_quantiles(means, weights, list(qs.values()))])
+        return pd.DataFrame(results, columns=['Metric', 'Count', *qs])
+
+    @property
+    def nbytes(self):
+        return sum(sum(array.nbytes for array in arrays) for arrays in self.centroids.values())
@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Optional CSV with Location,lat,lon rows for districts or cities, added to STATE_COORDS
+COORDS_PATH = "location_coords.csv"
+# Hex cell size in degrees of latitude used when points are binned
+HEX_SIZE = 1.0
+# Longitudes are scaled by the cosine of this latitude (central India) so
+# cells are roughly regular and do not move when the filters change
+HEX_REFERENCE_LAT = 22.0
+
+# Approximate centroid [lat, lon] of each state
+STATE_COORDS = {
+    "Andhra Pradesh": [15.9129, 79.7400],
+    "Arunachal Pradesh": [28.2180, 94.7278],
+    "Assam": [26.2006, 92.9376],
+    "Bihar": [25.0961, 85.3131],
+    "Chhattisgarh": [21.2787, 81.8661],
+    "Goa": [15.2993, 74.1240],
+    "Gujarat": [22.2587, 71.1924],
+    "Haryana": [29.0588, 76.0856],
+    "Himachal Pradesh": [31.1048, 77.1734],
+    "Jharkhand": [23.6102, 85.2799],
+    "Karnataka": [15.3173, 75.7139],
+    "Kerala": [10.8505, 76.2711],
+    "Madhya Pradesh": [22.9734, 78.6569],
+    "Maharashtra": [19.7515, 75.7139],
+    "Manipur": [24.6637, 93.9063],
+    "Meghalaya": [25.4670, 91.3662],
+    "Mizoram": [23.1645, 92.9376],
+    "Nagaland": [26.1584, 94.5624],
+    "Odisha": [20.9517, 85.0985],
+    "Punjab": [31.1471, 75.3412],
+    "Rajasthan": [27.0238, 74.2179],
+    "Sikkim": [27.5330, 88.5122],
+    "Tamil Nadu": [11.1271, 78.6569],
+    "Telangana": [18.1124, 79.0193],
+    "Tripura": [23.9408, 91.9882],
+    "Uttar Pradesh": [26.8467, 80.9462],
+    "Uttarakhand": [30.0668, 79.0193],
+    "West Bengal": [22.9868, 87.8550],
+    "Delhi": [28.7041, 77.1025]
+}
+
+
+def coordinate_table(path=COORDS_PATH):
+    """
+    Location, lat and lon of every known place: the state centroids plus the
+    rows of the optional coordinates CSV, which win for duplicate names.
+    """
+    table = pd.DataFrame([(name, lat, lon) for name, (lat, lon) in STATE_COORDS.items()],
+                         columns=['Location', 'lat', 'lon'])
+    if path and os.path.exists(path):
+        extra = pd.read_csv(path, usecols=['Location', 'lat', 'lon'])
+        table = pd.concat([table, extra], ignore_index=True).drop_duplicates('Location', keep='last')
+    return table.reset_index(drop=True)
+
+
+# Joined against the rolled-up cube instead of looking coordinates up per row
+COORDINATES = coordinate_table()
+
+
+def state_stats(cube, coordinates=None):
+    """
+    Violation count, total and average fine per location, with its coordinates
+    (NaN for locations without a known position).
+    """
+    stats = cube.rollup(['Location'])[['Location', 'Count', 'Fine_Sum', 'Fine_Mean']]
+    stats.columns = ['Location', 'Total_Violations', 'Total_Fines', 'Avg_Fine']
+    coordinates = COORDINATES if coordinates is None else coordinates
+    names = stats['Location'].astype(str)
+    return stats.assign(**coordinates.set_index('Location')[['lat', 'lon']].reindex(names).reset_index(drop=True))
+
+
+def aggregates(cube):
+    stats = state_stats(cube)
+    # Filter out locations we couldn't map
+    return stats, stats.dropna(subset=['lat', 'lon']).reset_index(drop=True)
+
+
+def _hex_axial(x, y, size):
+    # Fractional axial coordinates of pointy-top hexagons, rounded in cube space
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def hex_bins(points, size=HEX_SIZE):
+    """
+    Sums violations and fines of located points into hexagonal cells of the
+    given size in degrees. Returns one row per occupied cell with its centre,
+    totals and number of locations.
+    """
+    columns = ['q', 'r', 'lat', 'lon', 'Total_Violations', 'Total_Fines', 'Avg_Fine', 'Locations']
+    if points.empty:
+        return pd.DataFrame(columns=columns)
+    lat = points['lat'].to_numpy(dtype='float64')
+    lon = points['lon'].to_numpy(dtype='float64')
+    scale = np.cos(np.radians(HEX_REFERENCE_LAT))
+    q, r = _hex_axial(lon * scale, lat, size)
+
+    cells, inverse = np.unique(np.stack([q, r], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    count = np.bincount(inverse, weights=points['Total_Violations'].to_numpy(dtype='float64'))
+    fines = np.bincount(inverse, weights=points['Total_Fines'].to_numpy(dtype='float64'))
+    q, r = cells[:, 0], cells[:, 1]
+    return pd.DataFrame({
+        'q': q, 'r': r,
+        'lat': size * 1.5 * r,
+        'lon': size * np.sqrt(3) * (q + r / 2) / scale,
+        'Total_Violations': count.astype('int64'),
+        'Total_Fines': fines,
+        'Avg_Fine': np.divide(fines, count, out=np.zeros_like(fines), where=count > 0),
+        'Locations': np.bincount(inverse),
+    }, columns=columns)
+
+
+def _colors(values, palette):
+    # Index into the palette by each value's position between the min and max
+    values = np.asarray(values, dtype='float64')
+    span = values.max() - values.min() if len(values) else 0
+    position = (values - values.min()) / span if span > 0 else np.zeros(len(values))
+    return np.asarray(palette, dtype=object)[np.round(position * (len(palette) - 1)).astype(int)]
+
+
+def point_features(points, palette, max_radius=30, min_radius=4):
+    """
+    GeoJSON FeatureCollection with one Point per location. Radius (by the
+    square root of the violation count) and colour (by average fine) are
+    computed for all points at once and stored as each feature's Leaflet style.
+    """
+    count = points['Total_Violations'].to_numpy(dtype='float64')
+    radius = min_radius + (max_radius - min_radius) * np.sqrt(count / count.max()) if len(count) else count
+    colors = _colors(points['Avg_Fine'], palette)
+    features = [
+        {'type': 'Feature',
+         'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+         'properties': {'Location': name, 'Total_Violations': int(n), 'Total_Fines': round(fines),
+                        'Avg_Fine': round(avg, 1),
+                        'style': {'radius': round(rad, 1), 'color': color, 'fillColor': color}}}
+        for name, lat, lon, n, fines, avg, rad, color in zip(
+            points['Location'].astype(str).tolist(), points['lat'].tolist(), points['lon'].tolist(),
+            count.tolist(), points['Total_Fines'].tolist(), points['Avg_Fine'].tolist(),
+            radius.tolist(), colors.tolist())
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def hex_features(hexes, palette, size=HEX_SIZE):
+    """
+    GeoJSON FeatureCollection with one hexagon Polygon per cell of hex_bins(),
+    coloured by violation count. All vertices are computed in one array.
+    """
+    if hexes.empty:
+        return {'type': 'FeatureCollection', 'features': []}
+    angles = np.radians(30 + 60 * np.arange(7))
+    scale = np.cos(np.radians(HEX_REFERENCE_LAT))
+    lon = hexes['lon'].to_numpy()[:, None] + size * np.cos(angles)[None, :] / scale
+    lat = hexes['lat'].to_numpy()[:, None] + size * np.sin(angles)[None, :]
+    rings = np.round(np.stack([lon, lat], axis=2), 5).tolist()
+    colors = _colors(np.log1p(hexes['Total_Violations']), palette)
+    features = [
+        {'type': 'Feature',
+         'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+         'properties': {'Total_Violations': int(n), 'Avg_Fine': round(avg, 1), 'Locations': int(places),
+                        'style': {'color': color, 'fillColor': color, 'weight': 1, 'fillOpacity': 0.6}}}
+        for ring, n, avg, places, color in zip(
+            rings, hexes['Total_Violations'].tolist(), hexes['Avg_Fine'].tolist(),
+            hexes['Locations'].tolist(), colors.tolist())
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,233 @@
+import copy
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# HyperLogLog precision: 2**10 one-byte registers per sketch, about 3% standard error
+HLL_PRECISION = 10
+# Officers kept per day by the top-k summaries
+TOP_K_CAPACITY = 64
+
+# Distinct counts are kept per day and issuing agency
+GROUP_COLUMN = 'Issuing_Agency'
+TOP_K_COLUMN = 'Officer_ID'
+# The source has no driver identifier, so a driver is approximated by their vehicle and licence attributes
+DRIVER_KEY = [
+    'Registration_State', 'Vehicle_Type', 'Vehicle_Color', 'Vehicle_Model_Year',
+    'Driver_Age', 'Driver_Gender', 'License_Type',
+]
+# Sketch name -> columns whose combined values are counted
+DISTINCT_KEYS = {'Officers': [TOP_K_COLUMN], 'Drivers': DRIVER_KEY}
+
+# Label of rows without an issuing agency
+UNKNOWN_GROUP = 'Unknown'
+
+
+def row_hashes(df, columns):
+    """
+    64-bit hash of each row's values in columns, and which rows have all of them.
+    """
+    valid = df[columns].notna().all(axis=1).to_numpy()
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy(), valid
+
+
+def hll_ranks(hashes, precision=HLL_PRECISION):
+    """
+    HyperLogLog register and rank (position of the first set bit in the
+    remaining bits) of each hash.
+    """
+    bits = 64 - precision
+    registers = (hashes >> np.uint64(bits)).astype(np.int64)
+    rest = hashes & np.uint64((1 << bits) - 1)
+    # Bit length from the float exponent, per 32-bit half so it is exact
+    high = (rest >> np.uint64(32)).astype(np.float64)
+    low = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    length = np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+    return registers, (bits - length + 1).astype(np.uint8)
+
+
+def hll_estimate(registers):
+    """
+    Distinct count estimate of HyperLogLog registers along the last axis,
+    with linear counting for small cardinalities.
+    """
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=-1)
+    zeros = np.sum(registers == 0, axis=-1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)
+
+
+def _truncate(table, days, bounds, capacity):
+    """
+    Keeps the capacity items with the highest upper bound (Count + Error) on
+    each day. The upper bound of a dropped item raises its day's bound, the
+    most any unlisted item can have occurred that day.
+    """
+    table = table.assign(Upper=table['Count'] + table['Error'])
+    table = table.sort_values(['Day', 'Upper'], ascending=[True, False], kind='stable', ignore_index=True)
+    dropped = table.groupby('Day', sort=False).cumcount().to_numpy() >= capacity
+    bounds = bounds.copy()
+    np.maximum.at(bounds, np.searchsorted(days, table['Day'].to_numpy()[dropped]), table['Upper'].to_numpy()[dropped])
+    return table[~dropped].drop(columns='Upper').reset_index(drop=True), bounds
+
+
+class WorkloadSketches:
+    """
+    Mergeable per-day summaries of who issued violations and to how many
+    distinct people, in memory that grows with the days covered rather than
+    the rows.
+
+    Each day holds exact violation counts per issuing agency, one
+    HyperLogLog sketch per agency for each of DISTINCT_KEYS, and a top-k
+    summary of officers: the TOP_K_CAPACITY most active with their counts,
+    plus a bound on the count of any officer left out. Merging sums counts,
+    takes the maximum of registers and combines top-k summaries as
+    Space-Saving does, so any date range is answered by merging its days,
+    and appended rows, even late ones, only touch the days they fall on.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, capacity=TOP_K_CAPACITY):
+        self.precision = precision
+        self.capacity = capacity
+        # Days covered, as days since the epoch
+        self.days = np.zeros(0, dtype=np.int64)
+        self.groups = pd.Index([], dtype=object)
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self.registers = {name: np.zeros((0, 0, 1 << precision), dtype=np.uint8) for name in DISTINCT_KEYS}
+        # Top-k rows sorted by day; Error is how much an item's Count may fall short
+        self.top = pd.DataFrame({'Day': np.zeros(0, dtype=np.int64), 'Item': pd.Series([], dtype=object),
+                                 'Count': np.zeros(0, dtype=np.int64), 'Error': np.zeros(0, dtype=np.int64)})
+        self.bounds = np.zeros(0, dtype=np.int64)
+        self.key = [uuid.uuid4().hex]
+
+    @classmethod
+    def from_frame(cls, df, **params):
+        return cls(**params).appended(df)
+
+    def _summarize(self, df):
+        """
+        Sketches of the dated rows of df alone.
+        """
+        sketches = WorkloadSketches(self.precision, self.capacity)
+        dated = df['Datetime'].notna().to_numpy()
+        if not dated.any():
+            return sketches
+        days = df['Datetime'].to_numpy()[dated].astype('datetime64[D]').astype(np.int64)
+        sketches.days, day_codes = np.unique(days, return_inverse=True)
+        group_codes, groups = pd.factorize(df[GROUP_COLUMN][dated])
+        groups = pd.Index(np.asarray(groups.astype(str), dtype=object))
+        if (group_codes < 0).any():
+            group_codes = np.where(group_codes < 0, len(groups), group_codes)
+            groups = groups.append(pd.Index([UNKNOWN_GROUP], dtype=object))
+        sketches.groups = groups
+        n_days, n_groups, m = len(sketches.days), len(groups), 1 << self.precision
+
+        cell_codes = day_codes * n_groups + group_codes
+        sketches.counts = np.bincount(cell_codes, minlength=n_days * n_groups).reshape(n_days, n_groups)
+
+        for name, columns in DISTINCT_KEYS.items():
+            hashes, valid = row_hashes(df, columns)
+            hashes, valid = hashes[dated], valid[dated]
+            registers, ranks = hll_ranks(hashes[valid], self.precision)
+            flat = np.zeros(n_days * n_groups * m, dtype=np.uint8)
+            np.maximum.at(flat, cell_codes[valid] * m + registers, ranks)
+            sketches.registers[name] = flat.reshape(n_days, n_groups, m)
+
+        # Exact counts per day and officer, cut down to the top-k summary of each day
+        item_codes, items = pd.factorize(df[TOP_K_COLUMN][dated])
+        n_items = max(len(items), 1)
+        valid = item_codes >= 0
+        keys, counts = np.unique(day_codes[valid] * n_items + item_codes[valid], return_counts=True)
+        table = pd.DataFrame({'Day': sketches.days[keys // n_items],
+                              'Item': np.asarray(items.astype(str), dtype=object)[keys % n_items],
+                              'Count': counts, 'Error': np.zeros(len(keys), dtype=np.int64)})
+        sketches.top, sketches.bounds = _truncate(table, sketches.days, np.zeros(n_days, dtype=np.int64),
+                                                  self.capacity)
+        return sketches
+
+    def appended(self, df):
+        """
+        Returns sketches that also cover the rows of df.
+        """
+        return self.merged(self._summarize(df))
+
+    def merged(self, other):
+        """
+        Returns the merge of two sketches built with the same parameters.
+        """
+        if not len(other.days):
+            return self
+        out = copy.copy(self)
+        out.days = np.union1d(self.days, other.days)
+        out.groups = self.groups.append(other.groups[~other.groups.isin(self.groups)])
+
+        def place(sketches, values):
+            # Spread one side's per (day, group) values over the merged days and groups
+            placed = np.zeros((len(out.days), len(out.groups)) + values.shape[2:], dtype=values.dtype)
+            placed[np.ix_(np.searchsorted(out.days, sketches.days), out.groups.get_indexer(sketches.groups))] = values
+            return placed
+
+        out.counts = place(self, self.counts) + place(other, other.counts)
+        out.registers = {name: np.maximum(place(self, self.registers[name]), place(other, other.registers[name]))
+                         for name in DISTINCT_KEYS}
+
+        # An item missing from one side's summary of a day may have occurred up to that side's bound
+        bounds = np.zeros(len(out.days), dtype=np.int64)
+        sides = []
+        for sketches in (self, other):
+            day_codes = np.searchsorted(out.days, sketches.days)
+            bounds[day_codes] += sketches.bounds
+            own = sketches.bounds[np.searchsorted(sketches.days, sketches.top['Day'].to_numpy())]
+            sides.append(sketches.top.assign(Error=sketches.top['Error'] - own))
+        table = pd.concat(sides, ignore_index=True).groupby(['Day', 'Item'], sort=False)[['Count', 'Error']].sum()
+        table = table.reset_index()
+        table['Error'] += bounds[np.searchsorted(out.days, table['Day'].to_numpy())]
+        out.top, out.bounds = _truncate(table, out.days, bounds, self.capacity)
+        out.key = [uuid.uuid4().hex]
+        return out
+
+    def _day_slice(self, date_range, days=None):
+        # Positions of the days in date_range within days (self.days by default), which are sorted
+        days = self.days if days is None else days
+        if date_range is None:
+            return slice(0, len(days))
+        start, end = (np.datetime64(pd.Timestamp(day).date(), 'D').astype(np.int64) for day in date_range)
+        return slice(np.searchsorted(days, start), np.searchsorted(days, end, side='right'))
+
+    def group_counts(self, date_range=None):
+        """
+        Violations per group over the date range.
+        """
+        return pd.Series(self.counts[self._day_slice(date_range)].sum(axis=0), index=self.groups)
+
+    def distinct(self, name, date_range=None):
+        """
+        Estimated distinct values of one of DISTINCT_KEYS over the date range,
+        per group and in total.
+        """
+        registers = self.registers[name][self._day_slice(date_range)]
+        if not len(registers):
+            return pd.Series(0.0, index=self.groups), 0.0
+        merged = registers.max(axis=0)
+        return pd.Series(hll_estimate(merged), index=self.groups), float(hll_estimate(merged.max(axis=0)))
+
+    def top_items(self, n, date_range=None):
+        """
+        The n most frequent officers over the date range, with their count in
+        the daily summaries and the most it may fall short of the true count.
+        """
+        days = self._day_slice(date_range)
+        top = self.top.iloc[self._day_slice(date_range, self.top['Day'].to_numpy())]
+        own = self.bounds[np.searchsorted(self.days, top['Day'].to_numpy())]
+        items = top.assign(Error=top['Error'] - own).groupby('Item', sort=False)[['Count', 'Error']].sum()
+        items['Error'] += self.bounds[days].sum()
+        items = items.sort_values('Count', ascending=False, kind='stable').head(n)
+        return items.reset_index().rename(columns={'Item': TOP_K_COLUMN})
+
+    @property
+    def nbytes(self):
+        return (self.counts.nbytes + sum(registers.nbytes for registers in self.registers.values())
+                + int(self.top.memory_usage(deep=True).sum()) + self.bounds.nbytes)
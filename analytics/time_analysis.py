@@ -0,0 +1,34 @@
+from utils.schema import ORDERED_CATEGORIES
+
+
+def violation_options(cube):
+    return cube.rollup(['Violation_Type'])['Violation_Type'].tolist()
+
+
+def monthly_series(cube):
+    """
+    Violations per month and violation type, in calendar order.
+    """
+    return cube.rollup(['Month_Num', 'Month', 'Violation_Type'])
+
+
+def hourly_series(cube):
+    return cube.rollup(['Hour'])[['Hour', 'Count']]
+
+
+def day_hour_heatmap(cube):
+    """
+    Violations per weekday (rows, Monday first) and hour of day (columns).
+    """
+    # Day_of_Week is stored as an ordered categorical, so the rows only need every weekday present
+    day_hour = cube.rollup(['Day_of_Week', 'Hour'])
+    heatmap_data = day_hour.pivot(index='Day_of_Week', columns='Hour', values='Count')
+    return heatmap_data.reindex(ORDERED_CATEGORIES['Day_of_Week']).fillna(0).astype(int)
+
+
+def aggregates(cube, violation_types=None):
+    """
+    Monthly, hourly and weekday x hour series, limited to the given violation types.
+    """
+    filtered_cube = cube.where(Violation_Type=violation_types) if violation_types else cube
+    return monthly_series(filtered_cube), hourly_series(filtered_cube), day_hour_heatmap(filtered_cube)
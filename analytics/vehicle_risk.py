@@ -0,0 +1,27 @@
+from analytics.distributions import distribution_summary
+
+DETAIL_COLUMNS = ['Vehicle_Type', 'Vehicle_Color', 'Vehicle_Model_Year', 'Vehicle_Age', 'Violation_Type', 'Fine_Amount']
+
+
+def vehicle_types(df):
+    return df['Vehicle_Type'].dropna().unique().tolist()
+
+
+def vehicle_composition(df):
+    """
+    Violations per vehicle type and color.
+    """
+    columns = ['Vehicle_Type', 'Vehicle_Color']
+    return df[columns].groupby(columns, observed=True).size().reset_index(name='Count')
+
+
+def aggregates(df, selected_types=None, detail_rows=100):
+    """
+    Composition, fine distribution and the first detail rows for the given vehicle types.
+    """
+    filtered_df = df[df['Vehicle_Type'].isin(selected_types)] if selected_types else df
+    return (
+        vehicle_composition(filtered_df),
+        distribution_summary(filtered_df['Vehicle_Type'], filtered_df['Fine_Amount']),
+        filtered_df.head(detail_rows)[DETAIL_COLUMNS],
+    )
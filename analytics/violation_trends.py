@@ -0,0 +1,41 @@
+from analytics.distributions import PAYLOAD_SAMPLE_ROWS, density_grid, distribution_summary
+
+SCATTER_COLUMNS = ['Recorded_Speed', 'Fine_Amount', 'Violation_Type', 'Location']
+
+
+def fine_bounds(df):
+    return int(df['Fine_Amount'].min()), int(df['Fine_Amount'].max())
+
+
+def violation_hierarchy(df):
+    """
+    Total fines per violation type and vehicle type, with plain string labels.
+    """
+    # Aggregate first; plotly's hierarchy builder does not accept categorical columns
+    sun_data = df[['Violation_Type', 'Vehicle_Type', 'Fine_Amount']].groupby(
+        ['Violation_Type', 'Vehicle_Type'], observed=True)['Fine_Amount'].sum().reset_index()
+    return sun_data.astype({'Violation_Type': str, 'Vehicle_Type': str})
+
+
+def aggregates(df, min_fine=0, scatter_threshold=None):
+    """
+    Hierarchy, fine distribution and speed vs fine data for fines of at least
+    min_fine. Above scatter_threshold rows the speed vs fine points are binned
+    into a density grid, with a small sample of rows kept alongside.
+    """
+    filtered_df = df[df['Fine_Amount'] >= min_fine]
+
+    scatter_rows, density = None, None
+    if scatter_threshold is not None and len(filtered_df) > scatter_threshold:
+        density = density_grid(filtered_df['Recorded_Speed'], filtered_df['Fine_Amount'])
+        scatter_rows = filtered_df.head(PAYLOAD_SAMPLE_ROWS)[SCATTER_COLUMNS]
+    else:
+        scatter_rows = filtered_df[SCATTER_COLUMNS]
+
+    return {
+        'rows': len(filtered_df),
+        'sun_data': violation_hierarchy(filtered_df),
+        'scatter_rows': scatter_rows,
+        'density': density,
+        'fine_summary': distribution_summary(filtered_df['Violation_Type'], filtered_df['Fine_Amount']),
+    }
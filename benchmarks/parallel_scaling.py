@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import time
+
+from benchmarks.run_benchmarks import DATA_DIR, RESULTS_DIR, environment, measure
+from benchmarks.synthetic_data import dataset_path, write_dataset
+from utils.cube import ViolationCube
+from utils.data_loader import prepare_data
+from utils.parallel import get_pool
+
+# Rollups timed at each worker count, from coarse to fine
+ROLLUPS = [['Location'], ['Violation_Type', 'Hour'], ['Date', 'Location']]
+
+
+def default_workers():
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    return counts + ([cpus] if counts[-1] != cpus else [])
+
+
+def run(df, workers, repeat):
+    """
+    Times the cube build and a few rollups with the given number of workers.
+    """
+    if workers > 1:
+        # Start the pool's processes outside the timed runs
+        list(get_pool(workers).map(abs, range(workers)))
+    steps = {}
+    steps['cube'], cube = measure(lambda: ViolationCube.from_frame(df, workers), repeat=repeat, trace_memory=False)
+    for dims in ROLLUPS:
+        steps[f"rollup.{'+'.join(dims)}"], _ = measure(lambda: cube.rollup(dims), repeat=repeat, trace_memory=False)
+    return steps, len(cube)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cube aggregation across worker process counts.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers())
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/parallel-<time>-<commit>.json).")
+    args = parser.parse_args()
+
+    path = dataset_path(args.data_dir, args.rows, args.years, args.seed)
+    if not os.path.exists(path):
+        os.makedirs(args.data_dir, exist_ok=True)
+        write_dataset(path, args.rows, args.years, args.seed)
+    df = prepare_data(path)
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': environment(),
+        'settings': {'rows': len(df), 'years': args.years, 'seed': args.seed, 'repeat': args.repeat},
+        'workers': {},
+    }
+    baseline = None
+    for workers in args.workers:
+        steps, cells = run(df, workers, args.repeat)
+        baseline = baseline or steps
+        print(f"{workers} workers ({cells:,} cells)")
+        for step, stats in steps.items():
+            speedup = baseline[step]['seconds'] / stats['seconds'] if stats['seconds'] else 0
+            print(f"  {step:35s} {stats['seconds']:9.4f}s  x{speedup:.2f}")
+        results['workers'][str(workers)] = steps
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"parallel-{time.strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
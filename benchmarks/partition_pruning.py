@@ -0,0 +1,78 @@
+import argparse
+import datetime
+import json
+import os
+import time
+
+from benchmarks.run_benchmarks import DATA_DIR, RESULTS_DIR, environment, measure
+from benchmarks.synthetic_data import dataset_path, write_dataset
+from utils.cube import ViolationCube
+from utils.data_loader import prepare_data
+from utils.filter_index import FilterIndex
+
+# Length of the recent date range queried at every history length
+RECENT_DAYS = 7
+
+
+def run(path, history_months, repeat):
+    """
+    Times reading the last history_months of the store and a recent-week
+    query against the full history.
+    """
+    steps = {}
+    steps['load.history'], recent = measure(lambda: prepare_data(path, history_months=history_months),
+                                            repeat=repeat, trace_memory=False)
+    df = prepare_data(path)
+    index, cube = FilterIndex(df), ViolationCube.from_frame(df)
+    last = df['Datetime'].max().date()
+    date_range = (last - datetime.timedelta(days=RECENT_DAYS - 1), last)
+
+    steps['load.recent_week'], _ = measure(lambda: prepare_data(path, date_range=date_range),
+                                           repeat=repeat, trace_memory=False)
+    steps['index.recent_week'], _ = measure(lambda: index.select(date_range=date_range),
+                                            repeat=repeat, trace_memory=False)
+    steps['cube.recent_week'], _ = measure(lambda: cube.where(date_range=date_range).rollup(['Date', 'Location']),
+                                           repeat=repeat, trace_memory=False)
+    return steps, len(df), len(recent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recent-range queries across history lengths.")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--rows-per-year", type=int, default=100_000)
+    parser.add_argument("--history-months", type=int, default=3, help="Months read by the load.history step.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/pruning-<time>-<commit>.json).")
+    args = parser.parse_args()
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': environment(),
+        'settings': {'rows_per_year': args.rows_per_year, 'history_months': args.history_months,
+                     'recent_days': RECENT_DAYS, 'seed': args.seed, 'repeat': args.repeat},
+        'years': {},
+    }
+    for years in args.years:
+        rows = years * args.rows_per_year
+        path = dataset_path(args.data_dir, rows, years, args.seed)
+        if not os.path.exists(path):
+            os.makedirs(args.data_dir, exist_ok=True)
+            write_dataset(path, rows, years, args.seed)
+        steps, total, recent = run(path, args.history_months, args.repeat)
+        print(f"{years} years ({total:,} rows, {recent:,} in the last {args.history_months} months)")
+        for step, stats in steps.items():
+            print(f"  {step:25s} {stats['seconds']:9.4f}s")
+        results['years'][str(years)] = steps
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"pruning-{time.strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from analytics.filters import filter_frame
+from analytics.quantiles import COMPRESSION, PERCENTILES, QUANTILE_METRICS, SOURCE_COLUMNS, QuantileSketches, metric_values
+from benchmarks.run_benchmarks import DATA_DIR, RESULTS_DIR, environment
+from benchmarks.synthetic_data import dataset_path, write_dataset
+from utils.data_loader import prepare_data
+from utils.dataset import row_source
+from utils.filter_index import FilterIndex
+
+
+def random_filters(index, rng, n):
+    """
+    n sidebar states mixing random date ranges, sets of locations and
+    violation types; each constraint is left out half of the time.
+    """
+    first, last = index.date_bounds()
+    days = (last - first).days
+    locations, types = index.options('Location'), index.options('Violation_Type')
+    states = []
+    for _ in range(n):
+        filters = {'date_range': None, 'Location': None, 'Violation_Type': None}
+        if rng.random() < 0.5:
+            start, end = sorted(rng.integers(0, days + 1, size=2))
+            filters['date_range'] = (first + datetime.timedelta(days=int(start)),
+                                     first + datetime.timedelta(days=int(end)))
+        if rng.random() < 0.5:
+            filters['Location'] = list(rng.choice(locations, size=rng.integers(1, 6), replace=False))
+        if rng.random() < 0.5:
+            filters['Violation_Type'] = list(rng.choice(types, size=rng.integers(1, 4), replace=False))
+        states.append(filters)
+    return states
+
+
+def rank_error(values, estimate, true, q):
+    """
+    How far q lies from the range of quantiles at which estimate occurs in
+    the sorted values, beyond how far it lies from that of the exact
+    quantile, which also falls between values on small selections.
+    """
+    def distance(value):
+        low = np.searchsorted(values, value, side='left') / len(values)
+        high = np.searchsorted(values, value, side='right') / len(values)
+        return max(low - q, q - high, 0.0)
+    return max(distance(estimate) - distance(true), 0.0)
+
+
+def compare(sketches, df, index, states):
+    """
+    Sketch percentiles against exact ones for each filter state: rank and
+    absolute value errors per metric and percentile, and both query times.
+    """
+    errors = {metric: {label: {'rank': [], 'value': []} for label in PERCENTILES} for metric in QUANTILE_METRICS}
+    sketch_seconds, exact_seconds, mismatched = [], [], 0
+    for filters in states:
+        start = time.perf_counter()
+        table = sketches.where(**filters).percentiles().set_index('Metric')
+        sketch_seconds.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        exact = {metric: np.sort(values[~np.isnan(values)])
+                 for metric, values in metric_values(filter_frame(df, index, filters).frame(SOURCE_COLUMNS)).items()}
+        exact_quantiles = {metric: np.quantile(values, list(PERCENTILES.values())) if len(values) else None
+                           for metric, values in exact.items()}
+        exact_seconds.append(time.perf_counter() - start)
+
+        for metric, values in exact.items():
+            mismatched += int(table.loc[metric, 'Count'] != len(values))
+            if not len(values):
+                continue
+            for (label, q), true in zip(PERCENTILES.items(), exact_quantiles[metric]):
+                estimate = table.loc[metric, label]
+                errors[metric][label]['rank'].append(rank_error(values, estimate, true, q))
+                errors[metric][label]['value'].append(abs(estimate - true))
+
+    summary = {
+        metric: {label: {'max_rank_error': round(float(np.max(e['rank'])), 5),
+                         'p95_rank_error': round(float(np.quantile(e['rank'], 0.95)), 5),
+                         'max_value_error': round(float(np.max(e['value'])), 4)}
+                 for label, e in by_label.items() if e['rank']}
+        for metric, by_label in errors.items()
+    }
+    return summary, {
+        'states': len(states),
+        'count_mismatches': mismatched,
+        'sketch_seconds': round(float(np.median(sketch_seconds)), 5),
+        'exact_seconds': round(float(np.median(exact_seconds)), 5),
+        'sketch_max_seconds': round(float(np.max(sketch_seconds)), 5),
+        'exact_max_seconds': round(float(np.max(exact_seconds)), 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check quantile sketch percentiles against exact ones.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--states", type=int, default=50, help="Random filter states to compare.")
+    parser.add_argument("--batches", type=int, default=10,
+                        help="Also check sketches built by appending the rows in this many batches.")
+    parser.add_argument("--compression", type=int, default=COMPRESSION)
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="Largest rank error allowed before exiting with status 1.")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/quantiles-<time>-<commit>.json).")
+    args = parser.parse_args()
+
+    path = dataset_path(args.data_dir, args.rows, args.years, args.seed)
+    if not os.path.exists(path):
+        os.makedirs(args.data_dir, exist_ok=True)
+        write_dataset(path, args.rows, args.years, args.seed)
+    df = prepare_data(path)
+    index = FilterIndex(df)
+    states = random_filters(index, np.random.default_rng(args.seed), args.states)
+
+    builds = {}
+    start = time.perf_counter()
+    sketches = QuantileSketches.from_frame(df, rows=row_source(df, index), compression=args.compression)
+    builds['full'] = (sketches, time.perf_counter() - start)
+    if args.batches > 1:
+        # Batches in random order, so appends also land in months already covered
+        bounds = np.linspace(0, len(df), args.batches + 1).astype(int)
+        start = time.perf_counter()
+        sketches = QuantileSketches(rows=row_source(df, index), compression=args.compression)
+        for i in np.random.default_rng(args.seed).permutation(args.batches):
+            sketches = sketches.appended(df.iloc[bounds[i]:bounds[i + 1]])
+        builds['appended'] = (sketches, time.perf_counter() - start)
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': environment(),
+        'settings': {'rows': len(df), 'states': args.states, 'batches': args.batches,
+                     'compression': args.compression, 'years': args.years, 'seed': args.seed},
+        'builds': {},
+    }
+    worst = 0.0
+    for name, (sketches, seconds) in builds.items():
+        summary, stats = compare(sketches, df, index, states)
+        stats.update({'build_seconds': round(seconds, 4), 'mb': round(sketches.nbytes / 1e6, 2)})
+        print(f"{name}: built in {stats['build_seconds']:.2f}s, {stats['mb']:.1f} MB; "
+              f"query {stats['sketch_seconds'] * 1000:.1f} ms (max {stats['sketch_max_seconds'] * 1000:.1f}) vs "
+              f"{stats['exact_seconds'] * 1000:.1f} ms (max {stats['exact_max_seconds'] * 1000:.1f}) exact; "
+              f"{stats['count_mismatches']} count mismatches")
+        for metric, by_label in summary.items():
+            print(f"  {metric:15s} " + "  ".join(
+                f"{label} rank {e['max_rank_error']:.4f} (p95 {e['p95_rank_error']:.4f}) value {e['max_value_error']:g}"
+                for label, e in by_label.items()))
+            worst = max([worst] + [e['max_rank_error'] for e in by_label.values()])
+        results['builds'][name] = {'stats': stats, 'errors': summary}
+        worst = max(worst, float(stats['count_mismatches'] > 0))
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"quantiles-{time.strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\nResults written to {out}")
+    if worst > args.tolerance:
+        print(f"Largest rank error {worst:.4f} exceeds the tolerance of {args.tolerance}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
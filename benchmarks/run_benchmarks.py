@@ -0,0 +1,181 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analytics.filters import filter_frame
+from analytics.precompute import VIEW_AGGREGATES, default_options
+from benchmarks.synthetic_data import dataset_path, write_dataset
+from utils.cube import CUBOIDS, ViolationCube
+from utils.data_loader import peak_rss_mb, prepare_data
+from utils.dataset import Dataset, row_source
+from utils.filter_index import FilterIndex
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join("benchmarks", "data")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+# Steps slower than the baseline by more than this factor are flagged by --compare
+REGRESSION_RATIO = 1.2
+
+
+def measure(fn, repeat=3, trace_memory=True):
+    """
+    Median wall time of fn over repeat runs, plus the peak Python/numpy heap
+    allocated during one extra traced run. Returns (stats, last result).
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+
+    stats = {'seconds': round(statistics.median(times), 5), 'min_seconds': round(min(times), 5)}
+    if trace_memory:
+        # Traced separately because tracemalloc slows allocation-heavy code down
+        tracemalloc.start()
+        try:
+            result = fn()
+            stats['peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        finally:
+            tracemalloc.stop()
+    return stats, result
+
+
+def filter_states(index):
+    """
+    Representative sidebar selections: nothing, the last 30 days, a few
+    states, a few violation types and all of them combined.
+    """
+    first, last = index.date_bounds()
+    last_month = (max(first, last - datetime.timedelta(days=29)), last)
+    locations = index.options('Location')[:3]
+    violations = index.options('Violation_Type')[:3]
+    none = {'date_range': None, 'Location': None, 'Violation_Type': None}
+    return {
+        'all': none,
+        'last_30_days': {**none, 'date_range': last_month},
+        'three_states': {**none, 'Location': locations},
+        'three_violation_types': {**none, 'Violation_Type': violations},
+        'combined': {'date_range': last_month, 'Location': locations, 'Violation_Type': violations},
+    }
+
+
+def run_size(rows, args):
+    path = dataset_path(args.data_dir, rows, args.years, args.seed)
+    if not os.path.exists(path):
+        os.makedirs(args.data_dir, exist_ok=True)
+        start = time.perf_counter()
+        write_dataset(path, rows, args.years, args.seed)
+        print(f"  generated {path} in {time.perf_counter() - start:.1f}s")
+
+    steps = {}
+    # Cold load parses the CSV into the store once, warm loads read the store
+    steps['load_data.cold'], _ = measure(lambda: prepare_data(path, force_rebuild=True), repeat=1,
+                                         trace_memory=args.memory)
+    steps['load_data.warm'], df = measure(lambda: prepare_data(path), repeat=args.repeat, trace_memory=args.memory)
+    # What load_dataset builds once per server process: the warm read plus the filter index, cube,
+    # spike detector, workload and quantile sketches
+    steps['dataset.build'], _ = measure(lambda: Dataset(path), repeat=args.repeat, trace_memory=args.memory)
+    steps['filter_index'], index = measure(lambda: FilterIndex(df), repeat=args.repeat, trace_memory=args.memory)
+    steps['cube'], cube = measure(lambda: ViolationCube.from_frame(df, rows=row_source(df, index)),
+                                  repeat=args.repeat, trace_memory=args.memory)
+
+    for name, filters in filter_states(index).items():
+        # What sidebar_filters does per rerun, without the widgets
+        def apply_filters():
+            sub_cube = cube.where(**filters)
+            return filter_frame(df, index, filters), [sub_cube.cuboid(name) for name in CUBOIDS]
+
+        steps[f'sidebar_filters.{name}'], (df_filtered, _) = measure(
+            apply_filters, repeat=args.repeat, trace_memory=args.memory)
+        cube_filtered = cube.where(**filters)
+        options = default_options(df_filtered, cube_filtered)
+        for view, compute in VIEW_AGGREGATES.items():
+            steps[f'{view}.{name}'], _ = measure(
+                lambda: compute(df_filtered, cube_filtered, options.get(view, {})),
+                repeat=args.repeat, trace_memory=args.memory)
+
+    for step, stats in steps.items():
+        print(f"  {step:45s} {stats['seconds']:9.4f}s" + (f" {stats['peak_mb']:9.1f} MB" if 'peak_mb' in stats else ""))
+    return {'rows': len(df), 'cube_cells': len(cube), 'peak_rss_mb': peak_rss_mb(), 'steps': steps}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(baseline, results):
+    """
+    Prints the time ratio of every step against a baseline results file.
+    """
+    print(f"\nCompared with {baseline['environment'].get('commit')} ({baseline['created']}):")
+    for size, current in results['sizes'].items():
+        previous = baseline['sizes'].get(size)
+        if previous is None:
+            continue
+        print(f"  {int(size):,} rows")
+        for step, stats in current['steps'].items():
+            before = previous['steps'].get(step)
+            if before is None or not before['seconds']:
+                continue
+            ratio = stats['seconds'] / before['seconds']
+            flag = "  <-- slower" if ratio > REGRESSION_RATIO else ""
+            print(f"    {step:45s} {before['seconds']:9.4f}s -> {stats['seconds']:9.4f}s  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, filtering and view aggregation at scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per step; the median is reported.")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the traced memory runs.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/<time>-<commit>.json).")
+    parser.add_argument("--compare", metavar="BASELINE", help="Results file to compare against.")
+    args = parser.parse_args()
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': environment(),
+        'settings': {'years': args.years, 'seed': args.seed, 'repeat': args.repeat},
+        'sizes': {},
+    }
+    for rows in args.sizes:
+        print(f"{rows:,} rows")
+        results['sizes'][str(rows)] = run_size(rows, args)
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
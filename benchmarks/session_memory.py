@@ -0,0 +1,142 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analytics.filters import filter_frame
+from analytics.precompute import VIEW_AGGREGATES
+from benchmarks.run_benchmarks import DATA_DIR, RESULTS_DIR, environment
+from benchmarks.synthetic_data import dataset_path, write_dataset
+from utils.data_loader import prepare_data
+from utils.dataset import read_only
+from utils.filter_index import FilterIndex
+
+# Pages that aggregate the filtered rows rather than the cube
+FRAME_VIEWS = ['violation_trends', 'vehicle_risk', 'driver_behavior']
+
+
+def rss_mb():
+    """
+    Current resident memory of this process in MB, or None where unsupported.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+
+
+def session_filters(index, sessions):
+    """
+    One sidebar state per session, each selecting a single location in turn.
+    """
+    locations = index.options('Location')
+    return [{'date_range': None, 'Location': [locations[i % len(locations)]], 'Violation_Type': None}
+            for i in range(sessions)]
+
+
+def run_sessions(path, sessions, copy):
+    """
+    Loads the shared frame, then starts one thread per session. Each session
+    keeps its filtered rows and computes the row-level pages from them while
+    the others do the same. Resident memory is read once every session holds
+    its rows. With copy, sessions keep a copy of their rows instead of a
+    selection, as filtering with df.iloc did.
+    """
+    df = read_only(prepare_data(path))
+    index = FilterIndex(df)
+    states = session_filters(index, sessions)
+    gc.collect()
+    shared = rss_mb()
+
+    held = [None] * sessions
+    barrier = threading.Barrier(sessions + 1)
+
+    def session(i):
+        rows = filter_frame(df, index, states[i])
+        if copy:
+            rows = rows.frame()
+        for view in FRAME_VIEWS:
+            VIEW_AGGREGATES[view](rows, None, {})
+        held[i] = rows
+        # Hold the rows until memory has been measured
+        barrier.wait()
+        barrier.wait()
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    total = rss_mb()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    per_session = None if shared is None else round((total - shared) / sessions, 2)
+    return {
+        'rows': len(df),
+        'shared_mb': shared,
+        'total_mb': total,
+        'per_session_mb': per_session,
+        'rows_per_session': round(sum(len(rows) for rows in held) / sessions),
+        'seconds': round(seconds, 4),
+    }
+
+
+def measure_sessions(path, sessions, copy):
+    # A fresh process per run, so memory freed by an earlier run does not hide this one's
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_sessions, path, sessions, copy).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure resident memory per concurrent dashboard session.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--copy", action="store_true", help="Also run with sessions holding copies of their rows.")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/sessions-<time>-<commit>.json).")
+    args = parser.parse_args()
+
+    path = dataset_path(args.data_dir, args.rows, args.years, args.seed)
+    if not os.path.exists(path):
+        os.makedirs(args.data_dir, exist_ok=True)
+        write_dataset(path, args.rows, args.years, args.seed)
+    # Build the store once so every run only reads it
+    prepare_data(path)
+
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': environment(),
+        'settings': {'rows': args.rows, 'years': args.years, 'seed': args.seed},
+        'modes': {},
+    }
+    for mode in (["selection", "copy"] if args.copy else ["selection"]):
+        print(mode)
+        results['modes'][mode] = {}
+        for sessions in args.sessions:
+            run = measure_sessions(path, sessions, mode == "copy")
+            print(f"  {sessions:4d} sessions  shared {run['shared_mb']:8.1f} MB  total {run['total_mb']:8.1f} MB  "
+                  f"per session {run['per_session_mb']:7.2f} MB  ({run['rows_per_session']:,} rows each)")
+            results['modes'][mode][str(sessions)] = run
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"sessions-{time.strftime('%Y%m%d-%H%M%S')}-{results['environment']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
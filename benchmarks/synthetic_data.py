@@ -0,0 +1,139 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics.risk_map import STATE_COORDS
+
+# Rows generated and written at a time, so 10M-row files fit in memory
+CHUNK_ROWS = 500_000
+START_DATE = "2021-01-01"
+
+VIOLATION_TYPES = {
+    'Over-speeding': 0.22, 'No Helmet': 0.16, 'Signal Jumping': 0.13, 'No Seatbelt': 0.11,
+    'Using Mobile Phone': 0.10, 'Wrong Parking': 0.10, 'Driving Without License': 0.07,
+    'Overloading': 0.06, 'Drunk Driving': 0.05,
+}
+VEHICLE_TYPES = {'Bike': 0.3, 'Car': 0.28, 'Scooter': 0.17, 'Auto Rickshaw': 0.1, 'Truck': 0.09, 'Bus': 0.06}
+VEHICLE_COLORS = ['Black', 'Blue', 'Green', 'Grey', 'Red', 'Silver', 'White', 'Yellow']
+GENDERS = {'Male': 0.72, 'Female': 0.25, 'Other': 0.03}
+LICENSE_TYPES = ['Commercial', 'Four-Wheeler', 'Heavy Vehicle', 'Learner', 'Two-Wheeler']
+WEATHER = {'Clear': 0.45, 'Cloudy': 0.2, 'Rainy': 0.18, 'Foggy': 0.1, 'Dust Storm': 0.07}
+ROADS = {'Dry': 0.45, 'Wet': 0.2, 'Potholes': 0.15, 'Under Construction': 0.1, 'Slippery': 0.1}
+AGENCIES = ['Highway Patrol', 'Local Police', 'RTO', 'Traffic Police']
+VALIDITY = {'Valid': 0.8, 'Expired': 0.14, 'Suspended': 0.06}
+# N/A is read back as missing, as in the bundled CSV
+WORN = {'Yes': 0.45, 'No': 0.25, 'N/A': 0.3}
+LIGHTS = ['Green', 'Red', 'Yellow']
+BREATHALYZER = {'Negative': 0.6, 'Not Conducted': 0.3, 'Positive': 0.1}
+YES_NO = ['No', 'Yes']
+PAYMENT_METHODS = ['Card', 'Cash', 'Online']
+SPEED_LIMITS = [30, 40, 50, 60, 80, 100]
+COMMENTS = {'Repeat Offender': 0.25, 'First Violation': 0.25, 'Fine Paid On Spot': 0.25, '': 0.25}
+# Violations per hour of day: quiet nights, morning and evening peaks
+HOUR_WEIGHTS = np.array([2, 1, 1, 1, 1, 2, 4, 7, 9, 8, 6, 6, 6, 6, 6, 7, 8, 9, 9, 7, 5, 4, 3, 2], dtype=float)
+
+
+def _choice(rng, options, size):
+    if isinstance(options, dict):
+        values, weights = list(options), np.array(list(options.values()))
+        return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights / weights.sum())]
+    return np.asarray(options, dtype=object)[rng.integers(0, len(options), size=size)]
+
+
+def _zipf_weights(n, exponent=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_chunk(rng, first_id, rows, years):
+    """
+    One chunk of synthetic violations with the 33 columns of the bundled CSV.
+    States follow a Zipf distribution; timestamps span the given number of years.
+    """
+    states = np.asarray(list(STATE_COORDS), dtype=object)
+    state_weights = _zipf_weights(len(states))
+
+    days = rng.integers(0, int(365.25 * years), size=rows)
+    dates = np.datetime_as_string(np.datetime64(START_DATE) + days, unit='D')
+    hours = rng.choice(24, size=rows, p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+    minutes = rng.integers(0, 60, size=rows)
+    clock = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+
+    speed_limit = _choice(rng, SPEED_LIMITS, rows).astype(int)
+    fine_paid = _choice(rng, YES_NO, rows)
+    payment = np.where(fine_paid == 'Yes', _choice(rng, PAYMENT_METHODS, rows), 'Not Paid')
+
+    return pd.DataFrame({
+        'Violation_ID': np.char.add('VLT', (first_id + np.arange(rows)).astype(str)),
+        'Violation_Type': _choice(rng, VIOLATION_TYPES, rows),
+        'Fine_Amount': rng.integers(100, 5001, size=rows),
+        'Location': states[rng.choice(len(states), size=rows, p=state_weights)],
+        'Date': dates,
+        'Time': clock[hours * 60 + minutes],
+        'Vehicle_Type': _choice(rng, VEHICLE_TYPES, rows),
+        'Vehicle_Color': _choice(rng, VEHICLE_COLORS, rows),
+        'Vehicle_Model_Year': rng.integers(1995, 2024, size=rows),
+        'Registration_State': states[rng.choice(len(states), size=rows, p=state_weights)],
+        'Driver_Age': rng.integers(18, 76, size=rows),
+        'Driver_Gender': _choice(rng, GENDERS, rows),
+        'License_Type': _choice(rng, LICENSE_TYPES, rows),
+        'Penalty_Points': rng.integers(0, 11, size=rows),
+        'Weather_Condition': _choice(rng, WEATHER, rows),
+        'Road_Condition': _choice(rng, ROADS, rows),
+        'Officer_ID': np.char.add('OFF', rng.integers(1000, 10000, size=rows).astype(str)),
+        'Issuing_Agency': _choice(rng, AGENCIES, rows),
+        'License_Validity': _choice(rng, VALIDITY, rows),
+        'Number_of_Passengers': rng.integers(1, 6, size=rows),
+        'Helmet_Worn': _choice(rng, WORN, rows),
+        'Seatbelt_Worn': _choice(rng, WORN, rows),
+        'Traffic_Light_Status': _choice(rng, LIGHTS, rows),
+        'Speed_Limit': speed_limit,
+        'Recorded_Speed': np.clip(speed_limit + rng.normal(5, 20, size=rows).round().astype(int), 20, 120),
+        'Alcohol_Level': rng.integers(0, 51, size=rows) / 100,
+        'Breathalyzer_Result': _choice(rng, BREATHALYZER, rows),
+        'Towed': _choice(rng, YES_NO, rows),
+        'Fine_Paid': fine_paid,
+        'Payment_Method': payment,
+        'Court_Appearance_Required': _choice(rng, YES_NO, rows),
+        'Previous_Violations': rng.integers(0, 6, size=rows),
+        'Comments': _choice(rng, COMMENTS, rows),
+    })
+
+
+def write_dataset(path, rows, years=3, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Writes a synthetic violations CSV of the given size, chunk by chunk.
+    The same rows, years and seed always produce the same file.
+    """
+    rng = np.random.default_rng(seed)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        for first in range(0, rows, chunk_rows):
+            chunk = generate_chunk(rng, 100000 + first, min(chunk_rows, rows - first), years)
+            chunk.to_csv(f, index=False, header=first == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(data_dir, rows, years=3, seed=0):
+    return os.path.join(data_dir, f"violations-{rows}-{years}y-s{seed}.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic traffic violation CSVs.")
+    parser.add_argument("rows", type=int, nargs="+")
+    parser.add_argument("--years", type=int, default=3, help="Years of timestamps to spread rows over.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default=os.path.join("benchmarks", "data"))
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for rows in args.rows:
+        path = write_dataset(dataset_path(args.out_dir, rows, args.years, args.seed), rows, args.years, args.seed)
+        print(f"Wrote {rows:,} rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
+import os
+import time
+
 import streamlit as st
 from streamlit_option_menu import option_menu
-from utils.data_loader import load_data
-from utils.ui_helper import apply_custom_css, sidebar_filters
+from analytics.filters import filter_frame
+from utils.cache_warmup import start_cache_warmer
+from utils.chart_helper import scatter_row_threshold
+from utils.dataset import load_dataset
+from utils.export import EXPORT_FORMATS, export_data
+from utils.instrumentation import dataframe, get_recorder, record, set_page, timed
+from utils.memo import get_aggregate_cache
+from utils.parallel import PARALLEL_MIN_ROWS
+from utils.schema import memory_report
+from utils.sql_backend import SELECT_ROW_LIMIT, load_database
+from utils.ui_helper import apply_custom_css, sidebar_filter_state
 
 # Import Views
 from views import (
     dashboard, risk_map, violation_trends, time_analysis, 
-    vehicle_risk, driver_behavior, payment_trends, environment_impact
+    vehicle_risk, driver_behavior, payment_trends, environment_impact, patterns, officer_workload
 )
 
 # --- App Config ---
@@ -18,9 +30,20 @@ st.set_page_config(
 )
 
 # --- Load Data ---
-# Caching is handled inside load_data
+# Caching is handled inside load_dataset; batches appended to the store are picked up on each rerun
 DATA_PATH = "Indian_Traffic_Violations.csv"
-df = load_data(DATA_PATH)
+# "pandas" keeps the cleaned frame in memory; "sqlite" queries an embedded database instead
+BACKEND = os.environ.get("TRAFFIC_BACKEND", "pandas")
+# Pages that need rows rather than cube aggregates; the sqlite backend only fetches them there
+ROW_PAGES = {"Violation Trends", "Vehicle Risk", "Driver Behavior", "Reports"}
+# Set TRAFFIC_PREWARM=1 to load the data and warm the aggregate cache in the background on the first run
+PREWARM = os.environ.get("TRAFFIC_PREWARM", "0") == "1"
+rerun_start = time.perf_counter()
+if PREWARM:
+    start_cache_warmer(DATA_PATH, BACKEND)
+dataset = load_database(DATA_PATH) if BACKEND == "sqlite" else load_dataset(DATA_PATH)
+df, filter_index, cube, spikes, sketches, quantiles = dataset.snapshot()
+load_seconds = time.perf_counter() - rerun_start
 
 # --- Apply Styling ---
 apply_custom_css()
@@ -47,6 +70,8 @@ with st.sidebar:
             "Driver Behavior",
             "Environment Impact",
             "Payment Trends",
+            "Patterns",
+            "Officer Workload",
             "Reports",
             "Settings"
         ],
@@ -59,6 +84,8 @@ with st.sidebar:
             "person-badge",
             "cloud-lightning-rain",
             "wallet2",
+            "diagram-3",
+            "shield-check",
             "file-earmark-text",
             "gear"
         ],
@@ -72,33 +99,162 @@ with st.sidebar:
     )
     
     st.markdown("---")
-    
+
+    # Timings below are attributed to the selected page
+    set_page(selected)
+    record("load_data", load_seconds)
+
     # Global Filters
-    df_filtered = sidebar_filters(df)
+    with timed("sidebar_filters"):
+        filters = sidebar_filter_state(filter_index)
+        if df is not None:
+            df_filtered = filter_frame(df, filter_index, filters)
+        elif selected in ROW_PAGES:
+            df_filtered = dataset.select(filters, limit=SELECT_ROW_LIMIT)
+        cube_filtered = cube.where(**filters)
+
+if df is None and selected in ROW_PAGES and 'matching_rows' in df_filtered.attrs:
+    st.info(f"Showing an even sample of {len(df_filtered):,} of the {df_filtered.attrs['matching_rows']:,} "
+            "matching violations; counts on this page cover the sample only. Narrow the filters to see every row.")
 
 # --- Routing ---
 if selected == "Dashboard":
-    dashboard.show(df_filtered)
+    dashboard.show(cube_filtered, spikes.select(**filters), quantiles.where(**filters))
 elif selected == "India Risk Map":
-    risk_map.show(df_filtered)
+    risk_map.show(cube_filtered)
 elif selected == "Violation Trends":
-    violation_trends.show(df_filtered)
+    violation_trends.show(df_filtered, filters)
 elif selected == "Time & Trend":
-    time_analysis.show(df_filtered)
+    time_analysis.show(cube_filtered)
 elif selected == "Vehicle Risk":
-    vehicle_risk.show(df_filtered)
+    vehicle_risk.show(df_filtered, filters)
 elif selected == "Driver Behavior":
-    driver_behavior.show(df_filtered)
+    driver_behavior.show(df_filtered, filters)
 elif selected == "Environment Impact":
-    environment_impact.show(df_filtered)
+    environment_impact.show(cube_filtered)
 elif selected == "Payment Trends":
-    payment_trends.show(df_filtered)
+    payment_trends.show(cube_filtered)
+elif selected == "Patterns":
+    patterns.show(cube_filtered)
+elif selected == "Officer Workload":
+    officer_workload.show(sketches, filters)
 elif selected == "Reports":
     st.title("📄 Reports")
     st.info("Report generation module coming soon. (Placeholder)")
     st.write("You could export the filtered dataset below:")
-    st.download_button("Download CSV", df_filtered.to_csv(index=False), "filtered_data.csv", "text/csv")
+    all_columns = list(df_filtered.columns)
+    export_columns = st.multiselect("Columns to export", all_columns, default=all_columns)
+    export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+    extension, mime = EXPORT_FORMATS[export_format]
+    st.caption(f"{df_filtered.attrs.get('matching_rows', len(df_filtered)):,} rows × "
+               f"{len(export_columns or all_columns)} columns. "
+               "The file is generated in chunks when you click download.")
+    # A callable is only run on click, so reruns never build the export; a sampled selection is fetched in full then
+    export_rows = (lambda: dataset.select(filters)) if 'matching_rows' in df_filtered.attrs else (lambda: df_filtered)
+    st.download_button(f"Download {export_format}",
+                        lambda: export_data(export_rows(), export_format, export_columns),
+                        f"filtered_data.{extension}", mime, on_click="ignore")
 elif selected == "Settings":
     st.title("⚙️ Settings")
     st.write("Application settings and configuration.")
     st.toggle("Dark Mode Support", value=True)
+
+    st.subheader("Chart Rendering")
+    # Stored under a non-widget key so the value survives visits to other pages
+    st.session_state['scatter_row_threshold'] = st.number_input(
+        "Scatter plots switch to a binned density above this many points",
+        min_value=100, step=1000, value=scatter_row_threshold()
+    )
+
+    if df is not None:
+        st.subheader("Parallel Aggregation")
+        # The dataset is shared by every session, so this is server configuration rather than a widget
+        st.write(f"**{dataset.workers}** worker processes (1 aggregates in the app process).")
+        st.caption(f"Cubes with at least {PARALLEL_MIN_ROWS:,} cells are built and rolled up in a pool of "
+                   f"worker processes over shared memory. This machine has {os.cpu_count()} CPUs. "
+                   "Set TRAFFIC_WORKERS before starting the server to change it.")
+
+    st.subheader("Data Cache")
+    if df is None:
+        load_info = None
+        info = dataset.load_info
+        st.write(f"SQLite database with {info['rows']:,} rows from {info['parts']} store parts, "
+                 f"{info['bytes'] / 1e6:,.1f} MB at `{info['database']}`")
+    else:
+        load_info = df.attrs.get('load_info')
+    if load_info:
+        st.write(f"Cache **{load_info['cache']}**: loaded {load_info['rows']:,} rows from "
+                 f"{load_info['partitions']} of {load_info['parts']} partitions "
+                 f"in {load_info['seconds']:.3f}s from `{load_info['store']}`")
+        ingest = load_info.get('ingest')
+        if ingest:
+            st.caption(f"Ingested {ingest['chunks']} chunks into {ingest['parts']} month partitions "
+                       f"at {ingest['rows_per_sec']:,} rows/s, peak RSS {ingest['peak_rss_mb']} MB")
+            if ingest['unparsed_timestamps']:
+                st.warning(f"{ingest['unparsed_timestamps']:,} rows have an unparseable Date/Time and are "
+                           "left out of date filters and time charts.")
+        appended = load_info.get('appended')
+        if appended:
+            st.caption(f"{appended['batches']} appended batches with {appended['rows']:,} rows; "
+                       f"the last {appended['last_rows']:,} rows were applied in {appended['last_seconds']:.3f}s")
+    if load_info and load_info['since'] is not None:
+        st.caption(f"Holding the last {dataset.history_months} months of data, from {load_info['since']:%Y-%m-%d}; "
+                   "older partitions stay on disk. Set TRAFFIC_HISTORY_MONTHS before starting the server to change it.")
+    elif df is not None:
+        st.caption("Holding every month of data. Set TRAFFIC_HISTORY_MONTHS before starting the server "
+                   "to keep only the latest months in memory.")
+    if st.button("Rebuild Data Cache"):
+        dataset.rebuild()
+        get_aggregate_cache().clear()
+        st.rerun()
+
+    st.subheader("Aggregate Cache")
+    aggregate_cache = get_aggregate_cache()
+    cache_stats = aggregate_cache.stats()
+    st.write(f"{cache_stats['entries']} / {cache_stats['max_entries']} entries, "
+             f"{cache_stats['hits']:,} hits, {cache_stats['misses']:,} misses "
+             f"({cache_stats['hit_rate']:.0%} hit rate)")
+    if st.button("Clear Aggregate Cache"):
+        aggregate_cache.clear()
+        st.rerun()
+
+    if df is not None:
+        st.subheader("Memory Usage")
+        mem = memory_report(df)
+        st.write(f"Loaded frame uses **{mem['Bytes'].sum() / 1e6:,.1f} MB** across {len(mem)} columns.")
+        dataframe(mem, hide_index=True)
+
+    st.subheader("Cache Warm-up")
+    if st.button("Warm Cache Now"):
+        st.session_state['warm_cache'] = True
+    if PREWARM or st.session_state.get('warm_cache'):
+        progress = start_cache_warmer(DATA_PATH, BACKEND).progress()
+        if progress['status'] == "running":
+            st.progress(progress['done'] / progress['total'] if progress['total'] else 0.0,
+                        text=f"Warming {progress['current'] or '...'} "
+                             f"({progress['done']} / {progress['total'] or '?'} filter presets, "
+                             f"{progress['seconds']:.1f}s)")
+        elif progress['status'] == "failed":
+            st.error(f"Warm-up failed after {progress['seconds']:.1f}s: {progress['error']}")
+        else:
+            st.write(f"Warmed {progress['done']} filter presets in **{progress['seconds']:.1f}s**, "
+                     f"{progress['entries_per_preset'] or 0} cache entries each; the cache was grown to hold them all.")
+    st.caption("Computes every page's aggregates for the default filters, the last 30 days and each "
+               "single state in a background thread, once per server process.")
+
+    st.subheader("Performance")
+    recorder = get_recorder()
+    recorder.enabled = st.toggle("Record timings and payload sizes", value=recorder.enabled)
+    log_enabled = st.toggle("Append measurements to a JSON-lines log", value=recorder.log_path is not None)
+    log_path = st.text_input("Log file", value=recorder.log_path or "perf_log.jsonl", disabled=not log_enabled)
+    recorder.log_path = log_path if log_enabled else None
+    st.caption(f"Rolling p50/p95 over the last {recorder.window} samples of each step, across all sessions. "
+               "Aggregation steps include memoized hits. Payload sizes are measured on one render in "
+               f"{recorder.size_every} of each chart and table. Off by default; TRAFFIC_PERF=1 turns it on at startup.")
+    dataframe(recorder.summary(), hide_index=True)
+    if st.button("Clear Measurements"):
+        recorder.clear()
+        st.rerun()
+
+# Whole-script time of this rerun, including rendering
+record("rerun", time.perf_counter() - rerun_start)
@@ -0,0 +1,69 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_data import generate_chunk
+from utils.cube import CUBOIDS, ViolationCube
+from utils.data_loader import clean_data, sort_by_time
+from utils.dataset import row_source
+from utils.filter_index import FilterIndex
+
+
+def synthetic_frame(rows, years, seed=0):
+    return sort_by_time(clean_data(generate_chunk(np.random.default_rng(seed), 100000, rows, years)))
+
+
+@pytest.fixture(scope="module")
+def small():
+    df = synthetic_frame(20_000, 1)
+    index = FilterIndex(df)
+    return df, index, ViolationCube.from_frame(df, rows=row_source(df, index))
+
+
+def test_cells_far_below_rows():
+    df = synthetic_frame(300_000, 1)
+    cube = ViolationCube.from_frame(df)
+    for name in CUBOIDS:
+        assert len(cube.cuboid(name)) < len(df) / 4, name
+    assert len(cube) < len(df)
+
+
+@pytest.mark.parametrize("dims", [
+    ['Date'], ['Location'], ['Month_Num', 'Month', 'Violation_Type'], ['Day_of_Week', 'Hour'],
+    ['Weather_Condition'], ['Violation_Type', 'Fine_Paid'], ['Payment_Method'],
+])
+def test_rollup_matches_rows(small, dims):
+    df, index, cube = small
+    first, last = index.date_bounds()
+    # Starts and ends mid-month, so months and the whole history are covered partly
+    filters = {'date_range': (first + datetime.timedelta(days=40), last - datetime.timedelta(days=75)),
+               'Location': index.options('Location')[:5], 'Violation_Type': None}
+    rows = df.iloc[index.select(**filters)]
+    if dims == ['Date']:
+        rows = rows.assign(Date=rows['Datetime'].dt.normalize())
+    expected = rows.groupby(dims, observed=True).agg(Count=('Fine_Amount', 'size'), Fine_Sum=('Fine_Amount', 'sum'))
+    expected = expected[expected['Count'] > 0].reset_index()
+
+    out = cube.where(**filters).rollup(dims)
+    np.testing.assert_array_equal(out['Count'].to_numpy(), expected['Count'].to_numpy())
+    np.testing.assert_allclose(out['Fine_Sum'].to_numpy(), expected['Fine_Sum'].to_numpy())
+
+
+def test_filtered_totals_match_rows(small):
+    df, index, cube = small
+    first, last = index.date_bounds()
+    filters = {'date_range': (first + datetime.timedelta(days=10), last - datetime.timedelta(days=10))}
+    rows = df.iloc[index.select(**filters)]
+    paid = cube.where(**filters).where(Fine_Paid=['Yes']).totals()
+    assert paid['Count'] == int((rows['Fine_Paid'] == 'Yes').sum())
+    assert paid['Fine_Sum'] == pytest.approx(float(rows.loc[rows['Fine_Paid'] == 'Yes', 'Fine_Amount'].sum()))
+
+
+def test_appended_matches_full_build(small):
+    df, index, cube = small
+    half = len(df) // 2
+    appended = ViolationCube.from_frame(df.iloc[:half]).appended(df.iloc[half:], rows=row_source(df, index))
+    for dims in (['Date', 'Location'], ['Day_of_Week', 'Hour'], ['Fine_Paid', 'Payment_Method']):
+        pd.testing.assert_frame_equal(appended.rollup(dims), cube.rollup(dims))
@@ -0,0 +1,68 @@
+import collections
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_data import generate_chunk
+from utils.data_loader import MAX_MONTH_PARTS, MIN_PARTITION_ROWS, append_batch, ensure_store, prepare_data
+from utils.dataset import Dataset
+from utils.store import read_manifest
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # The store cache lives under the working directory
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    generate_chunk(rng, 0, 5_000, 1).to_csv("base.csv", index=False)
+    batches = []
+    for i in range(20):
+        path = f"batch-{i}.csv"
+        generate_chunk(rng, 100_000 + i * 200, 200, 1).to_csv(path, index=False)
+        batches.append(path)
+    return "base.csv", batches
+
+
+def test_sparse_months_share_partitions(store):
+    file_path, _ = store
+    single = prepare_data(file_path)
+    # 5,000 rows over a year fit in one partition rather than twelve
+    assert single.attrs['load_info']['parts'] == -(-5_000 // MIN_PARTITION_ROWS)
+    chunked = prepare_data(file_path, force_rebuild=True, chunk_rows=1_000)
+    assert chunked.attrs['load_info']['ingest']['chunks'] == 5
+    assert single['Violation_ID'].tolist() == chunked['Violation_ID'].tolist()
+
+
+def test_appends_keep_month_parts_bounded(store):
+    file_path, batches = store
+    store_dir, _ = ensure_store(file_path)
+    for path in batches:
+        append_batch(file_path, path)
+
+    manifest = read_manifest(store_dir)
+    per_month = collections.Counter(part["month"] for part in manifest["parts"])
+    months = len(per_month)
+    assert max(per_month.values()) <= MAX_MONTH_PARTS
+    assert manifest["rows"] == sum(part["rows"] for part in manifest["parts"]) == 5_000 + 20 * 200
+    # Replaced files are deleted one append later
+    files = glob.glob(os.path.join(store_dir, "part-*.feather"))
+    assert len(files) <= len(manifest["parts"]) + months * MAX_MONTH_PARTS
+
+
+def test_readers_follow_compaction(store):
+    file_path, batches = store
+    current, lagging = Dataset(file_path), Dataset(file_path)
+    for path in batches:
+        append_batch(file_path, path)
+        # Kept up to date after every append, so only the new parts are read
+        assert current.refresh()
+    assert current.df.attrs['load_info']['appended']['batches'] == len(batches)
+    # Several appends behind, after their parts were merged into older ones
+    assert lagging.refresh()
+
+    fresh = Dataset(file_path)
+    for dataset in (current, lagging):
+        assert len(dataset.df) == len(fresh.df) == 5_000 + 20 * 200
+        assert sorted(dataset.df['Violation_ID']) == sorted(fresh.df['Violation_ID'])
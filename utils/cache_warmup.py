@@ -0,0 +1,133 @@
+import datetime
+import threading
+import time
+
+import streamlit as st
+
+from analytics.filters import default_filters, filter_frame
+from utils.dataset import load_dataset
+from utils.memo import MAX_ENTRIES, get_aggregate_cache
+from utils.sql_backend import load_database
+from views import (
+    dashboard, driver_behavior, environment_impact, officer_workload, patterns, payment_trends, risk_map,
+    time_analysis, vehicle_risk, violation_trends
+)
+
+# Pages whose aggregates come from the cube, and pages that need the filtered rows
+CUBE_VIEWS = [dashboard, risk_map, time_analysis, environment_impact, payment_trends, patterns]
+FRAME_VIEWS = [violation_trends, vehicle_risk, driver_behavior]
+
+# Length of the recent-days preset
+RECENT_DAYS = 30
+
+
+def filter_presets(index, recent_days=RECENT_DAYS):
+    """
+    Sidebar states worth having in the cache as (label, filters) pairs: the
+    defaults, the last recent_days days and each single location.
+    """
+    default = default_filters(index)
+    presets = [("Default filters", default)]
+    if default['date_range'] is not None:
+        first, last = default['date_range']
+        start = max(first, last - datetime.timedelta(days=recent_days - 1))
+        presets.append((f"Last {recent_days} days", {**default, 'date_range': (start, last)}))
+    for location in default.get('Location') or []:
+        presets.append((location, {**default, 'Location': [location]}))
+    return presets
+
+
+def warm_views(dataset, df, index, cube, sketches, quantiles, filters):
+    """
+    Computes every page's aggregates for one filter state into the aggregate cache.
+    """
+    cube_filtered = cube.where(**filters)
+    for view in CUBE_VIEWS:
+        view.warm(cube_filtered)
+    dashboard.warm_percentiles(quantiles.where(**filters))
+    officer_workload.warm(sketches, filters)
+    # The sqlite backend has no frame in memory; the rows are fetched for this state only
+    df_filtered = filter_frame(df, index, filters) if df is not None else dataset.select(filters)
+    for view in FRAME_VIEWS:
+        view.warm(df_filtered, filters)
+
+
+class CacheWarmer:
+    """
+    Loads the data and fills the aggregate cache for the filter presets in a
+    background thread, so the first sessions render from a warm cache.
+
+    Once the first preset shows how many entries one takes, the LRU is
+    grown to hold every preset on top of its usual capacity, so warming
+    the later presets does not evict the earlier ones. Presets are still
+    warmed in reverse, so the most common ones are the most recently used.
+    """
+
+    def __init__(self, load):
+        self._load = load
+        self.status = "pending"
+        self.current = None
+        self.done = 0
+        self.total = None
+        self.entries_per_preset = None
+        self.seconds = None
+        self.error = None
+        self._start = None
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self.status = "running"
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.current = "Loading data"
+            dataset = self._load()
+            df, index, cube, _, sketches, quantiles = dataset.snapshot()
+            presets = filter_presets(index)
+            self.total = len(presets)
+            cache = get_aggregate_cache()
+            for label, filters in reversed(presets):
+                self.current = label
+                misses = cache.misses
+                warm_views(dataset, df, index, cube, sketches, quantiles, filters)
+                if not self.done:
+                    # Every computed aggregate adds one entry
+                    self.entries_per_preset = cache.misses - misses
+                    cache.reserve(MAX_ENTRIES + self.entries_per_preset * len(presets))
+                self.done += 1
+            self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = repr(e)
+        finally:
+            self.current = None
+            self.seconds = time.perf_counter() - self._start
+
+    def progress(self):
+        """
+        Status, presets warmed out of the total, cache entries per preset,
+        the step in progress and seconds elapsed (the total warm-up time once finished).
+        """
+        elapsed = self.seconds if self.seconds is not None else time.perf_counter() - self._start
+        return {
+            'status': self.status,
+            'done': self.done,
+            'total': self.total,
+            'entries_per_preset': self.entries_per_preset,
+            'current': self.current,
+            'seconds': elapsed,
+            'error': self.error,
+        }
+
+
+@st.cache_resource
+def start_cache_warmer(file_path, backend="pandas"):
+    """
+    Starts warming the cache once per server process.
+    """
+    if backend == "sqlite":
+        return CacheWarmer(lambda: load_database(file_path)).start()
+    return CacheWarmer(lambda: load_dataset(file_path)).start()
@@ -0,0 +1,100 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from analytics.distributions import SCATTER_ROW_THRESHOLD
+
+VIOLIN_HALF_WIDTH = 0.4
+
+
+def scatter_row_threshold():
+    """
+    Current row threshold, as configured on the Settings page.
+    """
+    return st.session_state.get('scatter_row_threshold', SCATTER_ROW_THRESHOLD)
+
+
+def density_figure(grid, x_label, y_label, title):
+    fig = go.Figure(go.Heatmap(
+        x=grid['x'], y=grid['y'], z=grid['z'],
+        colorscale='Viridis', colorbar=dict(title="Violations"),
+        hovertemplate=f"{x_label}: %{{x}}<br>{y_label}: %{{y}}<br>Violations: %{{z}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig
+
+
+def estimate_payload(sample, rows, build_figure):
+    """
+    Estimates the JSON size of a figure over rows points by building it on a sample.
+    """
+    if sample.empty:
+        return 0
+    sample_bytes = len(build_figure(sample).to_json())
+    return int(sample_bytes / len(sample) * rows)
+
+
+def format_bytes(n):
+    if n >= 1e6:
+        return f"{n / 1e6:,.1f} MB"
+    return f"{n / 1e3:,.0f} KB"
+
+
+def show_density_note(rows, density_fig, raw_bytes):
+    density_bytes = len(density_fig.to_json())
+    st.caption(
+        f"Showing a binned density of {rows:,} points: {format_bytes(density_bytes)} sent "
+        f"instead of ~{format_bytes(raw_bytes)} for raw points "
+        f"({format_bytes(max(raw_bytes - density_bytes, 0))} saved)."
+    )
+
+
+def _summary_box(summary, i, name, color, x):
+    return go.Box(
+        x=[x], q1=[summary['q1'][i]], median=[summary['median'][i]], q3=[summary['q3'][i]],
+        lowerfence=[summary['lowerfence'][i]], upperfence=[summary['upperfence'][i]],
+        mean=[summary['mean'][i]], name=name, marker_color=color, showlegend=False,
+    )
+
+
+def distribution_figure(summary, group_label, value_label, title, violin=False, show_outliers=True):
+    """
+    Draws box plots, or violins with an inner box, from a distribution_summary.
+    The figure size depends on the number of groups, not rows.
+    """
+    fig = go.Figure()
+    if summary is None:
+        fig.update_layout(title=title)
+        return fig
+
+    colors = px.colors.qualitative.Plotly
+    positions = np.arange(len(summary['names']))
+    for i, name in enumerate(summary['names']):
+        color = colors[i % len(colors)]
+        if violin:
+            in_range = (summary['grid'] >= summary['min'][i]) & (summary['grid'] <= summary['max'][i])
+            y = summary['grid'][in_range]
+            half_width = summary['density'][i][in_range] / summary['density'][i].max() * VIOLIN_HALF_WIDTH
+            fig.add_trace(go.Scatter(
+                x=np.concatenate([i - half_width, (i + half_width)[::-1]]),
+                y=np.concatenate([y, y[::-1]]),
+                fill='toself', mode='lines', line_color=color, name=name, hoverinfo='name',
+            ))
+            box = _summary_box(summary, i, name, color, i)
+            box.update(width=0.1, fillcolor='white', line_color=color)
+            fig.add_trace(box)
+        else:
+            fig.add_trace(_summary_box(summary, i, name, color, name))
+
+        if show_outliers:
+            outliers = summary['outlier_value'][summary['outlier_group'] == i]
+            fig.add_trace(go.Scatter(
+                x=np.full(len(outliers), i if violin else name, dtype=object), y=outliers,
+                mode='markers', marker=dict(color=color, size=4), name=name, showlegend=False,
+            ))
+
+    if violin:
+        fig.update_xaxes(tickvals=positions, ticktext=summary['names'])
+    fig.update_layout(title=title, xaxis_title=group_label, yaxis_title=value_label)
+    return fig
@@ -0,0 +1,403 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from analytics.patterns import hour_bands
+from utils.parallel import PARALLEL_MIN_ROWS, map_partitions, partition_bounds
+from utils.schema import align_categories
+
+# Dimensions of the sidebar filters, held by every cuboid
+FILTER_DIMENSIONS = ['Location', 'Violation_Type']
+
+# Cuboid -> (grain, dimensions). A rollup reads the first cuboid holding every
+# dimension it groups or filters by: crossing all dimensions in one cube would
+# leave about one cell per row. Cells are kept per period of the grain: days
+# ('D', in Date), months ('M', in Period) or, with None, one period spanning
+# every dated row. Month_Num, Month and Day_of_Week are functionally dependent
+# on Date and do not add daily cells.
+CUBOIDS = {
+    'daily': ('D', FILTER_DIMENSIONS + ['Month_Num', 'Month', 'Day_of_Week']),
+    'payment': ('M', FILTER_DIMENSIONS + ['Fine_Paid', 'Payment_Method']),
+    'weather': ('M', FILTER_DIMENSIONS + ['Weather_Condition']),
+    'road': ('M', FILTER_DIMENSIONS + ['Road_Condition']),
+    'hourly': (None, FILTER_DIMENSIONS + ['Day_of_Week', 'Hour']),
+    'patterns': (None, FILTER_DIMENSIONS + ['Vehicle_Type', 'Weather_Condition', 'Road_Condition', 'Hour_Band']),
+}
+
+# Dimension -> (stored column, function deriving it from that column)
+DERIVED_DIMENSIONS = {'Hour_Band': ('Hour', hour_bands)}
+
+MEASURES = {
+    'Count': 'sum',
+    'Fine_Sum': 'sum',
+    'Fine_Sq': 'sum',
+    'Fine_Max': 'max',
+}
+
+
+def period_column(grain):
+    return 'Date' if grain == 'D' else 'Period'
+
+
+def source_columns(name):
+    """
+    Stored columns the cells of a cuboid are aggregated from.
+    """
+    _, dims = CUBOIDS[name]
+    return ['Datetime', 'Fine_Amount'] + [DERIVED_DIMENSIONS[dim][0] if dim in DERIVED_DIMENSIONS else dim
+                                          for dim in dims]
+
+
+def periods(timestamps, grain):
+    """
+    First day of the period of each timestamp, NaT where it is missing. With
+    no grain every dated row falls in the period of the epoch.
+    """
+    if grain is None:
+        return np.where(np.isnat(timestamps), timestamps, np.zeros(1, dtype=timestamps.dtype))
+    return timestamps.astype(f'datetime64[{grain}]').astype(timestamps.dtype)
+
+
+def _aggregate(cells, keys, sort=False, dropna=True):
+    # Sums and maxima are taken over one grouping rather than per named aggregation
+    grouped = cells.groupby(keys, observed=True, sort=sort, dropna=dropna)
+    out = grouped[['Count', 'Fine_Sum', 'Fine_Sq']].sum()
+    out['Fine_Max'] = grouped['Fine_Max'].max()
+    return out.reset_index()
+
+
+def combine_cells(cells, keys):
+    """
+    Merges cells with equal keys, keeping missing keys, in order of first
+    appearance.
+    """
+    return _aggregate(cells, keys, dropna=False)
+
+
+def frame_cells(df, name, dims=None):
+    """
+    Cells of one cuboid over a frame of violations, or with dims, cells of
+    only those of its dimensions.
+    """
+    grain, cuboid_dims = CUBOIDS[name]
+    keys = {}
+    for dim in [period_column(grain)] + cuboid_dims if dims is None else dims:
+        if dim == period_column(grain):
+            keys[dim] = periods(df['Datetime'].to_numpy(), grain)
+        elif dim in DERIVED_DIMENSIONS:
+            col, derive = DERIVED_DIMENSIONS[dim]
+            if col in df.columns:
+                keys[dim] = derive(df[col].to_numpy(dtype='float64', na_value=np.nan))
+        elif dim in df.columns:
+            keys[dim] = df[dim].array
+    fine = df['Fine_Amount'].to_numpy(dtype='float64')
+
+    frame = pd.DataFrame(keys).assign(Count=np.ones(len(df), dtype=np.int64), Fine_Sum=fine,
+                                      Fine_Sq=fine * fine, Fine_Max=fine)
+    return _aggregate(frame, list(keys), dropna=False)
+
+
+def frame_cuboids(df):
+    """
+    Cells of every cuboid over a frame of violations.
+    """
+    return {name: frame_cells(df, name) for name in CUBOIDS}
+
+
+def rollup_cells(cells, dims, sort=False):
+    """
+    Combines cells with equal values of dims. Sums stay sums and maxima stay
+    maxima, so partial rollups can be rolled up again.
+    """
+    return _aggregate(cells, dims, sort=sort)
+
+
+def _concat_in_order(frames, key):
+    """
+    Concatenates cells with aligned categories, dated cells ahead of undated
+    ones and in period order.
+    """
+    frames = align_categories(*frames)
+    dated = [frame[key].notna() for frame in frames]
+    combined = pd.concat([frame[mask] for frame, mask in zip(frames, dated)]
+                         + [frame[~mask] for frame, mask in zip(frames, dated)], ignore_index=True)
+    n_dated = sum(int(mask.sum()) for mask in dated)
+    values = combined[key].to_numpy()[:n_dated]
+    if not np.all(values[1:] >= values[:-1]):
+        # Late rows: restore period order
+        combined = combined.sort_values(key, kind='stable', na_position='last', ignore_index=True)
+    return combined
+
+
+def _combine_filters(first, second):
+    """
+    One filter state selecting the rows both states select.
+    """
+    combined = dict(first)
+    for col, values in second.items():
+        current = combined.get(col)
+        if values is None or current is None:
+            combined[col] = values if current is None else current
+        elif col == 'date_range':
+            combined[col] = (max(current[0], values[0]), min(current[1], values[1]))
+        else:
+            allowed = set(current)
+            combined[col] = [value for value in values if value in allowed]
+    return combined
+
+
+class ViolationCube:
+    """
+    Violation counts and fine totals pre-aggregated into the CUBOIDS.
+
+    Views filter the cube with where() and roll it up to the dimensions a
+    chart needs, so their cost depends on the number of cells, not raw rows.
+    Each cuboid keeps its cells in period order with undated cells last, so
+    the periods a date range covers are a contiguous slice found by binary
+    search: filtering a few recent weeks costs the same however much history
+    the cube holds. Periods a date range covers partly are aggregated from
+    the rows of the days it does cover: rows(filters, columns) returns them
+    as a frame, as for QuantileSketches. Daily cells never need rows.
+    With workers > 1, building and rolling up large cubes is split into
+    contiguous row ranges aggregated in a process pool, and the partials merged.
+    """
+
+    def __init__(self, cuboids=None, rows=None, version=None, parent=None, filters=None, workers=1):
+        self._root = self if parent is None else parent._root
+        self._cells = dict(cuboids or {})
+        self.rows = rows
+        self.workers = workers
+        self._filters = filters or {}
+        self._periods = {}
+        self._spans = {}
+        self._present = {}
+        self.version = version if version is not None else uuid.uuid4().hex
+        # Identifies this sub-cube for memoization: base version plus every where() applied
+        self.key = [self.version] if parent is None else parent.key + [filters]
+        if parent is not None:
+            self._filters = _combine_filters(parent._filters, self._filters)
+
+    def cuboid(self, name):
+        """
+        Cells of the named cuboid under the filters.
+        """
+        # where() is lazy so a memoized view never has to filter the cells
+        if name not in self._cells:
+            cells, rows = self._root._select(name, **self._filters)
+            if rows is not None:
+                cells = pd.concat(align_categories(cells, frame_cells(rows, name)), ignore_index=True)
+            self._cells[name] = cells
+        return self._cells[name]
+
+    @classmethod
+    def from_frame(cls, df, workers=1, rows=None):
+        if workers <= 1 or len(df) < PARALLEL_MIN_ROWS:
+            return cls(frame_cuboids(df), rows=rows, workers=workers)
+
+        # The frame is sorted by time, so day-aligned row ranges give partials with disjoint dates
+        timestamps = df['Datetime'].to_numpy()
+        days = np.where(np.isnat(timestamps), np.iinfo(np.int64).max,
+                        timestamps.astype('datetime64[D]').astype(np.int64))
+        columns = list(dict.fromkeys(col for name in CUBOIDS for col in source_columns(name) if col in df.columns))
+        bounds = partition_bounds(len(df), workers, days if np.all(days[:-1] <= days[1:]) else None)
+        parts = map_partitions(df, columns, bounds, frame_cuboids, workers)
+        cuboids = {}
+        for name, (grain, dims) in CUBOIDS.items():
+            cells = _concat_in_order([part[name] for part in parts], period_column(grain))
+            if grain != 'D':
+                # Months and the whole history span several partials
+                cells = combine_cells(cells, [col for col in cells.columns if col not in MEASURES])
+            cuboids[name] = cells
+        return cls(cuboids, rows=rows, workers=workers)
+
+    def appended(self, batch, rows=None):
+        """
+        Returns a new cube that also covers a batch of new rows. Only the batch
+        is aggregated. rows reads the combined frame.
+        """
+        return self.merged(ViolationCube.from_frame(batch), rows)
+
+    def merged(self, other, rows=None):
+        """
+        Returns a new cube holding the cells of both cubes, which is correct
+        because rollup() and totals() combine cells with equal keys. Dated
+        cells stay ahead of undated ones and in period order; cells of the
+        months or history both cubes cover are merged, so they do not pile up
+        over many appends.
+        """
+        cuboids = {}
+        for name, (grain, dims) in CUBOIDS.items():
+            key = period_column(grain)
+            cells = _concat_in_order([self.cuboid(name), other.cuboid(name)], key)
+            if grain != 'D' and self.cuboid(name)[key].isin(other.cuboid(name)[key].dropna()).any():
+                cells = combine_cells(cells, [col for col in cells.columns if col not in MEASURES])
+            cuboids[name] = cells
+        return ViolationCube(cuboids, rows=rows if rows is not None else self.rows, workers=self.workers)
+
+    def __len__(self):
+        return sum(len(self.cuboid(name)) for name in CUBOIDS)
+
+    @property
+    def empty(self):
+        return self.totals()['Count'] == 0
+
+    def where(self, date_range=None, **selections):
+        """
+        Returns the sub-cube matching the same filters FilterIndex.select takes.
+        Cells are only filtered when first accessed.
+        """
+        filters = {'date_range': date_range, **selections}
+        if all(value is None for value in filters.values()):
+            return self
+        return ViolationCube(rows=self.rows, version=self.version, parent=self, filters=filters,
+                             workers=self.workers)
+
+    def _dated_periods(self, name):
+        """
+        Periods of the dated cells of a cuboid, which come first and in
+        period order, or None if the cells are not in that order.
+        """
+        if name not in self._periods:
+            grain, _ = CUBOIDS[name]
+            values = self._cells[name][period_column(grain)].to_numpy().astype('datetime64[D]')
+            n_dated = np.count_nonzero(~np.isnat(values))
+            dated = values[:n_dated]
+            in_order = not np.isnat(dated).any() and bool(np.all(dated[1:] >= dated[:-1]))
+            self._periods[name] = dated if in_order else None
+        return self._periods[name]
+
+    def _period_spans(self, grain):
+        """
+        Each period of the grain holding data, with its first and last day
+        with data.
+        """
+        if grain not in self._spans:
+            days = self._dated_periods('daily')
+            if days is None:
+                days = self._cells['daily']['Date'].dropna().to_numpy().astype('datetime64[D]')
+            days = np.unique(days)
+            starts = periods(days, grain)
+            bounds = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+            self._spans[grain] = (starts[bounds], days[bounds], days[np.r_[bounds[1:], len(days)] - 1])
+        return self._spans[grain]
+
+    def _coverage(self, grain, start, end):
+        """
+        First and last period a date range covers entirely (None if it covers
+        none), and the sub-ranges of the periods it covers partly.
+        """
+        if grain == 'D':
+            return (start, end) if start <= end else None, []
+        starts, firsts, lasts = self._period_spans(grain)
+        covered = (firsts >= start) & (lasts <= end)
+        partial = (firsts <= end) & (lasts >= start) & ~covered
+        edges = [(max(first, start), min(last, end)) for first, last in zip(firsts[partial], lasts[partial])]
+        if not covered.any():
+            return None, edges
+        return (starts[covered][0], starts[covered][-1]), edges
+
+    def _edge_rows(self, name, edges, selections):
+        """
+        Rows of the days a date range covers in the periods it covers partly,
+        under every selection.
+        """
+        if self.rows is None:
+            raise ValueError(f"A date range covering part of a period needs rows for the {name} cuboid")
+        # Rows are read by the indexed sidebar columns and masked by the others here
+        indexed = {col: values for col, values in selections.items() if col in FILTER_DIMENSIONS}
+        frames = [self.rows({**indexed, 'date_range': tuple(day.astype(object) for day in edge)}, source_columns(name))
+                  for edge in edges]
+        rows = pd.concat(align_categories(*frames), ignore_index=True) if len(frames) > 1 else frames[0]
+        mask = np.ones(len(rows), dtype=bool)
+        for col, values in selections.items():
+            if values is not None and col not in indexed:
+                mask &= rows[col].isin(values).to_numpy()
+        return rows if mask.all() else rows[mask]
+
+    def _select(self, name, date_range=None, **selections):
+        """
+        Cells of the periods a filter state covers entirely, and the rows it
+        selects in periods it covers partly (None if there are none).
+        """
+        grain, _ = CUBOIDS[name]
+        cells, rows = self._cells[name], None
+        if date_range is not None:
+            start, end = (np.datetime64(pd.Timestamp(day).date(), 'D') for day in date_range)
+            covered, edges = self._coverage(grain, start, end)
+            dated = self._dated_periods(name)
+            if covered is None:
+                cells = cells.iloc[:0]
+            elif dated is not None:
+                cells = cells.iloc[np.searchsorted(dated, covered[0], 'left'):np.searchsorted(dated, covered[1], 'right')]
+            else:
+                values = cells[period_column(grain)].to_numpy().astype('datetime64[D]')
+                cells = cells[(values >= covered[0]) & (values <= covered[1])]
+            if edges:
+                rows = self._edge_rows(name, edges, selections)
+        mask = np.ones(len(cells), dtype=bool)
+        for col, values in selections.items():
+            # As in FilterIndex.select, selecting every value of a sidebar column keeps cells missing it
+            if values is None or (col in FILTER_DIMENSIONS and set(values) >= self._present_values(col)):
+                continue
+            mask &= cells[col].isin(values).to_numpy()
+        return (cells if mask.all() else cells[mask]), rows
+
+    def _present_values(self, col):
+        # Values of a column that occur; the daily cuboid counts every row
+        if col not in self._present:
+            self._present[col] = set(self._cells['daily'][col].dropna().unique())
+        return self._present[col]
+
+    def _cuboid_for(self, dims):
+        """
+        The first cuboid holding dims and every filtered dimension.
+        """
+        needed = set(dims) | {col for col, values in self._filters.items() if col != 'date_range' and values is not None}
+        for name, (grain, cuboid_dims) in CUBOIDS.items():
+            if needed <= set(cuboid_dims) | ({'Date'} if grain == 'D' else set()):
+                return name
+        raise ValueError(f"No cuboid holds {sorted(needed)}")
+
+    def rollup(self, dims):
+        """
+        Aggregates the cube to the given dimensions, adding Fine_Mean.
+        Rows are sorted by the dimension values.
+        """
+        dims = list(dims)
+        if not dims:
+            return pd.DataFrame([self.totals()])
+
+        name = self._cuboid_for(dims)
+        # Rows of partly covered periods are aggregated straight to dims, not to every cuboid dimension
+        cells, rows = (self._cells[name], None) if name in self._cells else self._root._select(name, **self._filters)
+        if self.workers > 1 and len(cells) >= PARALLEL_MIN_ROWS:
+            bounds = partition_bounds(len(cells), self.workers)
+            parts = map_partitions(cells, dims + list(MEASURES), bounds, rollup_cells, self.workers, dims)
+            cells = pd.concat(parts, ignore_index=True)
+        if rows is not None:
+            cells = pd.concat(align_categories(cells[dims + list(MEASURES)], frame_cells(rows, name, dims)),
+                              ignore_index=True)
+        out = rollup_cells(cells, dims, sort=True)
+        out = out[out['Count'] > 0]
+        out['Fine_Mean'] = out['Fine_Sum'] / out['Count']
+        return out.reset_index(drop=True)
+
+    def totals(self):
+        """
+        Grand totals of every measure plus the mean and population std of fines.
+        """
+        cells = self.cuboid(self._cuboid_for([]))
+        count = int(cells['Count'].sum())
+        fine_sum = float(cells['Fine_Sum'].sum())
+        fine_sq = float(cells['Fine_Sq'].sum())
+        mean = fine_sum / count if count else 0.0
+        variance = max(fine_sq / count - mean * mean, 0.0) if count else 0.0
+        return {
+            'Count': count,
+            'Fine_Sum': fine_sum,
+            'Fine_Sq': fine_sq,
+            'Fine_Max': float(cells['Fine_Max'].max()) if count else 0.0,
+            'Fine_Mean': mean,
+            'Fine_Std': variance ** 0.5,
+        }
@@ -1,37 +1,105 @@
+import argparse
+import os
+import shutil
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+import numpy as np
 import pandas as pd
-import streamlit as st
 
-@st.cache_data
-def load_data(file_path):
+from utils.features import add_features
+from utils.schema import (
+    DERIVED_COLUMNS, ORDERED_CATEGORIES, apply_schema, memory_report, sort_categories, validate_batch
+)
+from utils.store import (
+    append_parts, clear_store, file_fingerprint, overlapping_parts, read_manifest, read_parts, read_store,
+    replace_parts, store_columns, store_path, write_manifest, write_part
+)
+
+# Rows parsed and cleaned at a time when ingesting the CSV into the store
+CHUNK_ROWS = 250_000
+# Subdirectory of a store holding each chunk's month pieces until they are merged
+PIECES_DIR = "pieces"
+# Consecutive sparse months are merged into one partition until it holds this many rows
+MIN_PARTITION_ROWS = 10_000
+# Parts a month may hold before an append merges its earlier parts into one
+MAX_MONTH_PARTS = 8
+
+# Layouts of the source Date and Time columns
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M'
+
+
+def _parse_distinct(values, fmt):
     """
-    Loads and pre-processes the traffic violation data.
+    Parses each distinct value of a column once with an explicit format.
+    Returns the row codes (-1 for missing), the distinct strings and their
+    parsed timestamps (NaT where parsing failed).
     """
-    try:
-        df = pd.read_csv(file_path)
-    except FileNotFoundError:
-        st.error(f"File not found: {file_path}")
-        return pd.DataFrame()
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Index(uniques).astype(str)
+    parsed = pd.to_datetime(uniques, format=fmt, errors='coerce')
+    failed = parsed.isna()
+    if failed.any():
+        # Values in another layout fall back to format inference, on the distinct failures only
+        parsed = parsed.where(~failed, pd.to_datetime(uniques.where(failed), format='mixed', errors='coerce'))
+    return codes, uniques, parsed
 
+
+def _take(per_value, codes, fill):
+    # Rows with code -1 (missing value) take fill
+    return np.append(per_value, fill)[codes]
+
+
+def parse_timestamps(df):
+    """
+    Builds Datetime from the Date and Time columns, parsing each distinct
+    value once and combining day and time of day arithmetically. Also derives
+    the calendar features from integer fields and stores Date and Time as
+    categoricals. Returns the number of rows whose timestamp could not be parsed.
+    """
+    date_codes, date_values, dates = _parse_distinct(df['Date'], DATE_FORMAT)
+    time_codes, time_values, times = _parse_distinct(df['Time'], TIME_FORMAT)
+
+    days = dates.normalize()
+    day_of_time = (times - times.normalize()).to_numpy()
+    datetimes = _take(days.to_numpy(), date_codes, np.datetime64('NaT')) \
+        + _take(day_of_time, time_codes, np.timedelta64('NaT'))
+    valid = ~np.isnat(datetimes)
+
+    month = np.where(valid, _take(days.month.to_numpy(dtype='float64', na_value=np.nan), date_codes, np.nan), np.nan)
+    weekday = np.where(valid, _take(days.dayofweek.to_numpy(dtype='float64', na_value=np.nan), date_codes, np.nan), np.nan)
+    hour = np.where(valid, _take(times.hour.to_numpy(dtype='float64', na_value=np.nan), time_codes, np.nan), np.nan)
+    # Month and weekday names come from their numbers instead of per-row string formatting
+    month_codes = np.where(valid, month - 1, -1).astype(np.int8)
+    weekday_codes = np.where(valid, weekday, -1).astype(np.int8)
+
+    df['Date'] = pd.Categorical.from_codes(date_codes, categories=date_values)
+    df['Time'] = pd.Categorical.from_codes(time_codes, categories=time_values)
+    df['Datetime'] = datetimes
+    df['Month'] = pd.Categorical.from_codes(month_codes, categories=ORDERED_CATEGORIES['Month'], ordered=True)
+    df['Month_Num'] = month
+    df['Day_of_Week'] = pd.Categorical.from_codes(weekday_codes, categories=ORDERED_CATEGORIES['Day_of_Week'],
+                                                  ordered=True)
+    df['Hour'] = hour
+    return int(np.count_nonzero(~valid))
+
+
+def clean_data(df):
+    """
+    Cleans the raw CSV frame and derives the temporal and other features used by the views.
+    """
     # --- Data Cleaning & Preprocessing ---
 
     # 1. Combine Date and Time into a datetime column
-    # Ensure Date and Time are strings before combining
-    df['Date'] = df['Date'].astype(str)
-    df['Time'] = df['Time'].astype(str)
-    
-    # Attempt to parse standard formats
-    try:
-        df['Datetime'] = pd.to_datetime(df['Date'] + ' ' + df['Time'], errors='coerce')
-    except Exception as e:
-        st.warning(f"Could not parse some Date/Time values: {e}")
-        df['Datetime'] = pd.to_datetime(df['Date'], errors='coerce') # Fallback
-
     # 2. Extract Temporal Features
-    df['Month'] = df['Datetime'].dt.month_name()
-    df['Month_Num'] = df['Datetime'].dt.month
-    df['Day_of_Week'] = df['Datetime'].dt.day_name()
-    df['Hour'] = df['Datetime'].dt.hour
-    
+    # Unparseable rows get NaT and are counted rather than silently dropped
+    df.attrs['unparsed_timestamps'] = parse_timestamps(df)
+
     # 3. Numeric Conversions
     df['Fine_Amount'] = pd.to_numeric(df['Fine_Amount'], errors='coerce').fillna(0)
     df['Recorded_Speed'] = pd.to_numeric(df['Recorded_Speed'], errors='coerce')
@@ -43,11 +111,316 @@ def load_data(file_path):
     df['Seatbelt_Worn'] = df['Seatbelt_Worn'].fillna('Unknown')
     df['Comments'] = df['Comments'].fillna('None')
 
-    # 5. Categorical Consistency (Optional cleaning based on inspection)
-    # Ensure consistent casing
-    categorical_cols = ['Violation_Type', 'Location', 'Vehicle_Type', 'Gender', 'Payment_Method']
-    for col in categorical_cols:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.title()
+    # 5. Derived Features, computed once here rather than in the views
+    add_features(df)
+
+    # 6. Compact Types & Categorical Consistency
+    # Text columns become categoricals with title-cased categories, numerics are downcast
+    return apply_schema(df)
+
+
+def sort_by_time(df):
+    """
+    Orders rows by Datetime with unparseable timestamps last, so date ranges
+    map to contiguous row slices. Already-sorted frames are returned as is.
+    """
+    valid = df['Datetime'].notna()
+    if valid.is_monotonic_decreasing and df['Datetime'][valid].is_monotonic_increasing:
+        return df
+    return df.sort_values('Datetime', kind='stable', na_position='last', ignore_index=True)
+
+
+def month_partitions(df):
+    """
+    Splits a cleaned frame by calendar month of Datetime. Returns (month,
+    frame) pairs in month order, month as 'YYYY-MM', with the rows lacking a
+    timestamp last under month None.
+    """
+    months = df['Datetime'].to_numpy().astype('datetime64[M]')
+    undated = np.isnat(months)
+    keys = np.where(undated, np.iinfo(np.int64).max, months.astype(np.int64))
+    order = np.argsort(keys, kind='stable')
+    partitions = []
+    for rows in np.split(order, np.flatnonzero(np.diff(keys[order])) + 1):
+        if len(rows):
+            month = None if undated[rows[0]] else str(months[rows[0]])
+            partitions.append((month, df.iloc[rows].reset_index(drop=True)))
+    return partitions
+
+
+def history_start(parts, months):
+    """
+    First day of the last `months` calendar months with data in the store,
+    or None to keep the whole history.
+    """
+    latest = max((part["month"] for part in parts if part.get("month")), default=None)
+    if not months or latest is None:
+        return None
+    return pd.Timestamp(np.datetime64(latest, 'M') - (months - 1))
+
+
+def peak_rss_mb():
+    """
+    Peak resident memory of this process in MB, or None where unsupported.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is reported in KB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def partition_groups(month_rows, min_rows=MIN_PARTITION_ROWS):
+    """
+    Groups months, given as {month: rows}, into the months of each stored
+    partition: consecutive months are joined until a partition holds
+    min_rows rows, so sparse data is not split into hundreds of tiny files.
+    Groups are in month order, with the undated rows last on their own.
+    """
+    groups = []
+    rows = min_rows
+    for month in sorted(month for month in month_rows if month is not None):
+        if rows >= min_rows:
+            groups.append([])
+            rows = 0
+        groups[-1].append(month)
+        rows += month_rows[month]
+    if None in month_rows:
+        groups.append([None])
+    return groups
+
 
+def write_pieces(pieces_dir, pieces, partitions):
+    """
+    Writes (month, frame) partitions of a chunk as pieces, adding their
+    entries to the per-month lists in pieces.
+    """
+    if partitions:
+        os.makedirs(pieces_dir, exist_ok=True)
+    for month, frame in partitions:
+        n_pieces = sum(len(month_pieces) for month_pieces in pieces.values())
+        pieces.setdefault(month, []).append(write_part(pieces_dir, frame, n_pieces))
+
+
+def ingest_csv(file_path, store_dir, fingerprint, chunk_rows=CHUNK_ROWS):
+    """
+    Streams the CSV into the store in bounded-size chunks, cleaning each chunk
+    independently so peak memory does not grow with the file size. Each chunk
+    is split by month, and the pieces of a month are then merged into one
+    time-sorted partition, so peak memory is bounded by a chunk or a month.
+    A CSV that fits in one chunk is partitioned in memory, without pieces.
+    """
+    start = time.perf_counter()
+    clear_store(store_dir)
+    pieces_dir = os.path.join(store_dir, PIECES_DIR)
+
+    pieces = {}
+    chunks = 0
+    unparsed = 0
+    # The month frames of the latest chunk, written as pieces only once another chunk follows
+    held = []
+    for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+        cleaned = clean_data(chunk)
+        chunks += 1
+        # Popped so the count is not persisted with the part
+        unparsed += cleaned.attrs.pop('unparsed_timestamps')
+        write_pieces(pieces_dir, pieces, held)
+        held = month_partitions(cleaned)
+
+    if pieces:
+        write_pieces(pieces_dir, pieces, held)
+        month_rows = {month: sum(piece["rows"] for piece in month_pieces) for month, month_pieces in pieces.items()}
+        read_months = lambda months: read_parts(pieces_dir, [piece for month in months for piece in pieces[month]])
+    else:
+        # Slices of one chunk share its categories, so they concatenate as they are
+        frames = dict(held)
+        month_rows = {month: len(frame) for month, frame in held}
+        read_months = lambda months: pd.concat([frames[month] for month in months], ignore_index=True)
+
+    parts = []
+    # Month order with the undated rows last, so reading every part gives time order
+    for months in partition_groups(month_rows):
+        frame = sort_by_time(sort_categories(read_months(months)))
+        # Keyed by its last month, which appends and history windows go by
+        parts.append(write_part(store_dir, frame, len(parts), month=months[-1]))
+    shutil.rmtree(pieces_dir, ignore_errors=True)
+    write_manifest(store_dir, fingerprint, parts)
+
+    seconds = time.perf_counter() - start
+    rows = sum(part["rows"] for part in parts)
+    return {
+        "rows": rows,
+        "chunks": chunks,
+        "parts": len(parts),
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds) if seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "unparsed_timestamps": unparsed,
+    }
+
+
+def ensure_store(file_path, force_rebuild=False, chunk_rows=CHUNK_ROWS):
+    """
+    Ingests file_path into its store unless a complete store exists. Returns
+    the store directory and the ingest info (None when nothing was ingested).
+    """
+    fingerprint = file_fingerprint(file_path)
+    store_dir = store_path(file_path, fingerprint)
+    if not force_rebuild and read_manifest(store_dir) is not None:
+        return store_dir, None
+    return store_dir, ingest_csv(file_path, store_dir, fingerprint, chunk_rows=chunk_rows)
+
+
+def prepare_data(file_path, force_rebuild=False, chunk_rows=CHUNK_ROWS, history_months=None, date_range=None):
+    """
+    Returns the cleaned frame, reading it from the on-disk store when the
+    source file is unchanged and rebuilding the store otherwise.
+
+    Only the partitions that overlap the last history_months months with
+    data, and the given date_range, are read, and rows outside them are
+    dropped. Rows without a timestamp
+    are kept unless a date_range is given, since a date filter never selects them.
+    """
+    start = time.perf_counter()
+    fingerprint = file_fingerprint(file_path)
+    store_dir = store_path(file_path, fingerprint)
+
+    manifest = None if force_rebuild else read_manifest(store_dir)
+    cache_status = "hit"
+    ingest_info = None
+    if manifest is None or not all(os.path.exists(os.path.join(store_dir, part["file"])) for part in manifest["parts"]):
+        cache_status = "miss"
+        ingest_info = ingest_csv(file_path, store_dir, fingerprint, chunk_rows=chunk_rows)
+        manifest = read_manifest(store_dir)
+
+    since = history_start(manifest["parts"], history_months)
+    first, last = since, None
+    if date_range is not None:
+        first = max(day for day in (since, pd.Timestamp(date_range[0])) if day is not None)
+        # The last day of the range is included up to its final timestamp
+        last = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    df = read_store(store_dir, manifest, first, last, undated=date_range is None)
+    df = sort_categories(df)
+    df = sort_by_time(df)
+    if first is not None or last is not None:
+        # Partitions of several sparse months can reach past the requested range
+        timestamps = df['Datetime']
+        keep = timestamps.isna() if date_range is None else pd.Series(False, index=df.index)
+        keep |= timestamps.between(first or timestamps.min(), last or timestamps.max())
+        if not keep.all():
+            df = df[keep.to_numpy()].reset_index(drop=True)
+
+    df.attrs['load_info'] = {
+        "source": file_path,
+        "store": store_dir,
+        "cache": cache_status,
+        "rows": len(df),
+        # Parts and appends read, so later refreshes only need to read parts appended after these
+        "parts": len(manifest["parts"]),
+        "batches": manifest["batches"],
+        # Month partitions read out of all parts, and the first day kept in memory
+        "partitions": len(overlapping_parts(manifest["parts"], first, last, undated=date_range is None)),
+        "since": since,
+        "seconds": round(time.perf_counter() - start, 4),
+        "ingest": ingest_info,
+    }
     return df
+
+
+def read_batch(batch_path):
+    """
+    Reads a batch of raw violations from a CSV or Parquet file.
+    """
+    if batch_path.endswith(".parquet"):
+        return pd.read_parquet(batch_path)
+    return pd.read_csv(batch_path)
+
+
+def compact_months(store_dir, months):
+    """
+    Merges the parts of each given month into one time-sorted part once the
+    month holds more than MAX_MONTH_PARTS parts, so repeated appends do not
+    leave hundreds of small files. The parts of the latest append are kept
+    apart, so a reader that is one append behind only has to read those.
+    Returns the number of parts merged away.
+    """
+    manifest = read_manifest(store_dir)
+    merged = 0
+    for month in months:
+        parts = [part for part in manifest["parts"] if part["month"] == month]
+        if len(parts) <= MAX_MONTH_PARTS:
+            continue
+        earlier = [part for part in parts if part["batches"][1] < manifest["batches"]]
+        replace_parts(store_dir, earlier, sort_by_time(sort_categories(read_parts(store_dir, earlier))), month)
+        merged += len(earlier) - 1
+    return merged
+
+
+def append_batch(file_path, batch_path):
+    """
+    Validates a batch of new violations against the source schema, cleans it
+    and appends it to the prepared store of file_path. Work is proportional
+    to the batch; running dashboards pick the batch up on their next rerun.
+    """
+    start = time.perf_counter()
+    store_dir, _ = ensure_store(file_path)
+
+    batch = read_batch(batch_path)
+    source_columns = [col for col in store_columns(store_dir) if col not in DERIVED_COLUMNS]
+    validate_batch(batch, source_columns)
+    cleaned = clean_data(batch[source_columns])
+    unparsed = cleaned.attrs.pop('unparsed_timestamps')
+    parts = append_parts(store_dir, month_partitions(cleaned), source=os.path.basename(batch_path))
+    compacted = compact_months(store_dir, [part["month"] for part in parts])
+    return {
+        "rows": len(cleaned),
+        "unparsed_timestamps": unparsed,
+        "parts": [part["file"] for part in parts],
+        "compacted": compacted,
+        "store": store_dir,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the prepared violations store.")
+    parser.add_argument("file_path", nargs="?", default="Indian_Traffic_Violations.csv")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cached store and re-parse the CSV.")
+    parser.add_argument("--memory", action="store_true", help="Print the per-column memory usage.")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per chunk when ingesting the CSV.")
+    parser.add_argument("--history-months", type=int,
+                        help="Only load the partitions of the last N months with data.")
+    parser.add_argument("--append", nargs="+", metavar="BATCH",
+                        help="Append new violation batches (CSV or Parquet) to the store.")
+    args = parser.parse_args()
+
+    if args.append:
+        for batch_path in args.append:
+            try:
+                info = append_batch(args.file_path, batch_path)
+            except ValueError as e:
+                parser.exit(1, f"{batch_path}: {e}\n")
+            print(f"Appended {info['rows']:,} rows from {batch_path} as {', '.join(info['parts'])} "
+                  f"in {info['seconds']:.3f}s")
+            if info['compacted']:
+                print(f"  Compacted the earlier parts of its months into {info['compacted']} fewer files")
+            if info['unparsed_timestamps']:
+                print(f"  {info['unparsed_timestamps']:,} rows have an unparseable Date/Time")
+        return
+
+    df = prepare_data(args.file_path, force_rebuild=args.rebuild, chunk_rows=args.chunk_rows,
+                      history_months=args.history_months)
+    info = df.attrs['load_info']
+    print(f"Cache {info['cache']}: {info['rows']:,} rows from {info['partitions']} of {info['parts']} "
+          f"partitions in {info['seconds']:.3f}s ({info['store']})")
+    if info['ingest']:
+        ingest = info['ingest']
+        print(f"Ingested {ingest['chunks']} chunks into {ingest['parts']} month partitions "
+              f"at {ingest['rows_per_sec']:,} rows/s, peak RSS {ingest['peak_rss_mb']} MB")
+        if ingest['unparsed_timestamps']:
+            print(f"{ingest['unparsed_timestamps']:,} rows have an unparseable Date/Time")
+    if args.memory:
+        print(memory_report(df).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
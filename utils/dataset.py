@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analytics.anomalies import SpikeDetector
+from analytics.filters import filter_frame
+from analytics.quantiles import QuantileSketches
+from analytics.sketches import WorkloadSketches
+from utils.cube import ViolationCube
+from utils.data_loader import history_start, prepare_data, sort_by_time
+from utils.filter_index import FilterIndex
+from utils.parallel import DEFAULT_WORKERS
+from utils.schema import align_categories, sort_categories
+from utils.store import file_fingerprint, overlapping_parts, read_manifest, read_parts, split_parts, store_path
+
+# Months of history kept in memory (the latest months with data); unset or 0 keeps everything
+DEFAULT_HISTORY_MONTHS = int(os.environ.get("TRAFFIC_HISTORY_MONTHS", "0")) or None
+
+
+def read_only(df):
+    """
+    Rebuilds df over read-only views of its column buffers, without copying,
+    so an in-place write through any session raises instead of changing the
+    rows every session shares.
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Categorical.codes is already a read-only view
+            columns[col] = pd.Categorical.from_codes(values.array.codes, dtype=values.dtype)
+        elif isinstance(values.dtype, np.dtype):
+            array = values.to_numpy().view()
+            array.flags.writeable = False
+            columns[col] = array
+        else:
+            # Arrow-backed columns sit on immutable buffers
+            columns[col] = values.array
+    frozen = pd.DataFrame(columns, index=df.index, copy=False)
+    frozen.attrs = df.attrs
+    return frozen
+
+
+def row_source(df, index):
+    """
+    Reads the given columns of the rows of df matching a filter state, as
+    ViolationCube and QuantileSketches do for periods a date range covers partly.
+    """
+    return lambda filters, columns: filter_frame(df, index, filters).frame(columns)
+
+
+class Dataset:
+    """
+    The cleaned violations frame with its filter index, cube, spike
+    detector, workload and quantile sketches, shared by every session and kept
+    current with batches appended to the store. The frame is read-only; sessions filter it through
+    FrameSelection views and never hold copies of it.
+
+    Appended batches are applied incrementally: only the new parts are read,
+    sorted, indexed and aggregated, then joined to the existing structures.
+
+    With history_months, only the month partitions of the latest months are
+    read; once data for a later month arrives, the oldest month drops out.
+    """
+
+    def __init__(self, file_path, workers=DEFAULT_WORKERS, history_months=DEFAULT_HISTORY_MONTHS):
+        self.file_path = file_path
+        self.workers = workers
+        self.history_months = history_months
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self, force_rebuild=False):
+        df = read_only(prepare_data(self.file_path, force_rebuild=force_rebuild, history_months=self.history_months))
+        self.df = df
+        self.index = FilterIndex(df)
+        self.cube = ViolationCube.from_frame(df, self.workers, rows=row_source(df, self.index))
+        self.spikes = SpikeDetector.from_cells(self.cube.cuboid('daily'))
+        self.sketches = WorkloadSketches.from_frame(df)
+        self.quantiles = QuantileSketches.from_frame(df, rows=row_source(df, self.index))
+
+    def _append(self, batch, manifest, start):
+        batch = sort_by_time(sort_categories(batch))
+        df, batch = align_categories(self.df, batch)
+        n_valid = len(self.index.timestamps)
+        batch_valid = int(batch['Datetime'].notna().sum())
+
+        if n_valid == 0 or batch_valid == 0 or batch['Datetime'].iloc[0] >= self.index.timestamps[-1]:
+            # Newer rows: slot them between the existing dated and NaT rows
+            combined = pd.concat([df.iloc[:n_valid], batch.iloc[:batch_valid],
+                                  df.iloc[n_valid:], batch.iloc[batch_valid:]], ignore_index=True)
+            index = self.index.appended(batch)
+        else:
+            # Late-arriving rows break the time order, so re-sort and re-index everything
+            combined = sort_by_time(pd.concat([df, batch], ignore_index=True))
+            index = FilterIndex(combined)
+
+        load_info = dict(self.df.attrs['load_info'])
+        appended = load_info.get('appended') or {"batches": 0, "rows": 0}
+        load_info.update({
+            "rows": len(combined),
+            "parts": len(manifest['parts']),
+            "batches": manifest['batches'],
+            "appended": {
+                "batches": appended["batches"] + 1,
+                "rows": appended["rows"] + len(batch),
+                "last_rows": len(batch),
+                "last_seconds": round(time.perf_counter() - start, 4),
+            },
+        })
+        combined.attrs['load_info'] = load_info
+        combined = read_only(combined)
+        batch_cube = ViolationCube.from_frame(batch)
+        cube = self.cube.merged(batch_cube, rows=row_source(combined, index))
+        batch_cells = batch_cube.cuboid('daily')
+        first_day = batch_cells['Date'].min()
+        if pd.isna(first_day) or self.spikes.next_day is None or first_day >= self.spikes.next_day:
+            # Only the new days are scored and folded into the baselines
+            spikes = self.spikes.appended(batch_cells)
+        else:
+            spikes = SpikeDetector.from_cells(cube.cuboid('daily'))
+        # Sketches merge per day, so late rows need no rebuild
+        sketches = self.sketches.appended(batch)
+        quantiles = self.quantiles.appended(batch, rows=row_source(combined, index))
+        self.df, self.index, self.cube, self.spikes = combined, index, cube, spikes
+        self.sketches, self.quantiles = sketches, quantiles
+
+    def refresh(self):
+        """
+        Applies batches appended to the store since the last refresh, or
+        reloads everything when the source file changed or the store was
+        rebuilt. Returns True when the data changed.
+        """
+        start = time.perf_counter()
+        store_dir = store_path(self.file_path, file_fingerprint(self.file_path))
+        manifest = read_manifest(store_dir)
+        load_info = self.df.attrs['load_info']
+        if store_dir != load_info['store'] or (manifest and manifest['batches'] < load_info['batches']):
+            self._load()
+            return True
+        # A store being rebuilt has no manifest yet; keep serving the current data
+        if manifest is None or manifest['batches'] == load_info['batches']:
+            return False
+
+        split = split_parts(manifest['parts'], load_info['batches'])
+        since = history_start(manifest['parts'], self.history_months)
+        if split is None or (since is not None and (load_info['since'] is None or since > load_info['since'])):
+            # Compaction merged unread appends into older parts, or the window
+            # moved to a new month and reading only the kept partitions evicts the oldest
+            self._load()
+            return True
+        new_parts = overlapping_parts(split[1], since)
+        if not new_parts:
+            load_info['parts'], load_info['batches'] = len(manifest['parts']), manifest['batches']
+            return False
+        self._append(read_parts(store_dir, new_parts), manifest, start)
+        return True
+
+    def snapshot(self):
+        """
+        Refreshes and returns a consistent (frame, index, cube, spikes,
+        sketches, quantiles) tuple.
+        """
+        with self._lock:
+            self.refresh()
+            return self.df, self.index, self.cube, self.spikes, self.sketches, self.quantiles
+
+    def rebuild(self):
+        """
+        Re-parses the source file into a fresh store and reloads it.
+        """
+        with self._lock:
+            self._load(force_rebuild=True)
+
+
+@st.cache_resource
+def load_dataset(file_path):
+    """
+    Loads and pre-processes the traffic violation data once per process.
+    """
+    try:
+        return Dataset(file_path)
+    except FileNotFoundError:
+        st.error(f"File not found: {file_path}")
+        st.stop()
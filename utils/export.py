@@ -0,0 +1,63 @@
+import gzip
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows converted at a time, so only one chunk exists uncompressed in memory
+EXPORT_CHUNK_ROWS = 100_000
+
+# Label shown on the Reports page -> file extension and MIME type
+EXPORT_FORMATS = {
+    'CSV (gzip)': ('csv.gz', 'application/gzip'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'CSV': ('csv', 'text/csv'),
+}
+
+
+def _chunks(df, columns, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield start, df.iloc[start:start + chunk_rows][columns]
+
+
+def write_csv(df, f, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Writes the selected columns of df as UTF-8 CSV to a binary file, chunk by chunk.
+    """
+    text = io.TextIOWrapper(f, encoding='utf-8', newline='', write_through=True)
+    for start, chunk in _chunks(df, columns, chunk_rows):
+        chunk.to_csv(text, index=False, header=start == 0)
+    # Leave f open for the caller
+    text.detach()
+
+
+def write_parquet(df, f, columns, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Writes the selected columns of df as zstd-compressed Parquet, one row group per chunk.
+    """
+    writer = None
+    for _, chunk in _chunks(df, columns, chunk_rows):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(f, table.schema, compression='zstd')
+        writer.write_table(table.cast(writer.schema))
+    writer.close()
+
+
+def export_data(df, fmt, columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Returns the export of df in one of EXPORT_FORMATS as bytes. Only the
+    compressed output and one chunk of rows are held in memory at a time.
+    """
+    columns = list(columns) if columns else list(df.columns)
+    buffer = io.BytesIO()
+    if fmt == 'Parquet':
+        write_parquet(df, buffer, columns, chunk_rows)
+    elif fmt == 'CSV (gzip)':
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6) as gz:
+            write_csv(df, gz, columns, chunk_rows)
+    elif fmt == 'CSV':
+        write_csv(df, buffer, columns, chunk_rows)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buffer.getvalue()
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from utils.schema import AGE_BANDS, ORDERED_CATEGORIES
+
+# Drivers with at least this many earlier violations are flagged as repeat offenders
+REPEAT_OFFENDER_MIN_VIOLATIONS = 1
+
+
+def _values(df, col):
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def overspeed(df):
+    """
+    km/h by which Recorded_Speed exceeds Speed_Limit, 0 at or below it.
+    """
+    return np.clip(_values(df, 'Recorded_Speed') - _values(df, 'Speed_Limit'), 0, None)
+
+
+def age_band(df):
+    """
+    Band of Driver_Age out of AGE_BANDS, as an ordered categorical.
+    """
+    age = _values(df, 'Driver_Age')
+    codes = np.searchsorted(np.array(list(AGE_BANDS.values()), dtype='float64'), age, side='right') - 1
+    codes[np.isnan(age)] = -1
+    return pd.Categorical.from_codes(codes.astype(np.int8), categories=ORDERED_CATEGORIES['Age_Band'], ordered=True)
+
+
+def vehicle_age(df):
+    """
+    Years between Vehicle_Model_Year and the violation, never negative:
+    model years run ahead of the calendar.
+    """
+    years = df['Datetime'].dt.year.to_numpy(dtype='float64', na_value=np.nan)
+    return np.clip(years - _values(df, 'Vehicle_Model_Year'), 0, None)
+
+
+def repeat_offender(df):
+    return _values(df, 'Previous_Violations') >= REPEAT_OFFENDER_MIN_VIOLATIONS
+
+
+# Derived feature -> (columns it reads, function computing it over the whole frame).
+# Storage dtypes are declared in utils.schema like those of every other column.
+FEATURES = {
+    'Overspeed': (['Recorded_Speed', 'Speed_Limit'], overspeed),
+    'Age_Band': (['Driver_Age'], age_band),
+    'Vehicle_Age': (['Datetime', 'Vehicle_Model_Year'], vehicle_age),
+    'Repeat_Offender': (['Previous_Violations'], repeat_offender),
+}
+
+
+def add_features(df):
+    """
+    Adds every feature of FEATURES whose input columns df has. Each is
+    computed once per cleaned chunk, column-wise, and stored with the base
+    columns, so views read it instead of deriving it on every render.
+    """
+    for name, (columns, compute) in FEATURES.items():
+        if all(col in df.columns for col in columns):
+            df[name] = compute(df)
+    return df
@@ -0,0 +1,172 @@
+import copy
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Columns with a posting list per value
+INDEXED_COLUMNS = ('Location', 'Violation_Type')
+
+
+class FilterIndex:
+    """
+    Row index over the time-sorted violations frame, built once at load time.
+
+    Date ranges resolve to a contiguous slice with searchsorted. Each indexed
+    column keeps, per category code, the sorted row numbers holding that value;
+    selections are intersected as row masks over the date slice only.
+    """
+
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.n_rows = len(df)
+        if 'Datetime' in df.columns:
+            timestamps = df['Datetime'].to_numpy()
+            # NaT rows sort last, so the parseable timestamps are a prefix
+            self.timestamps = timestamps[:np.count_nonzero(~np.isnat(timestamps))]
+        else:
+            self.timestamps = None
+
+        self.categories = {}
+        self.postings = {}
+        self.missing = {}
+        for col in columns:
+            if col not in df.columns:
+                continue
+            values = df[col]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            codes = values.cat.codes.to_numpy()
+
+            # Stable sort keeps row numbers ascending within each value
+            order = np.argsort(codes, kind='stable')
+            n_categories = len(values.cat.categories)
+            bounds = np.searchsorted(codes[order], np.arange(-1, n_categories + 1))
+            # Rows with missing values (code -1) come first and are never selected
+            self.categories[col] = values.cat.categories
+            self.postings[col] = (order, bounds[1:])
+            self.missing[col] = order[:bounds[1]]
+
+    def appended(self, batch):
+        """
+        Returns the index of this frame with a batch of newer rows appended.
+
+        The combined frame must hold the existing dated rows, then the batch's
+        dated rows, then the existing and the batch's NaT rows, with the batch
+        sorted by Datetime and its categoricals holding every existing category.
+        Only the batch is sorted; existing postings are shifted and merged per value.
+        """
+        index = copy.copy(self)
+        n_valid = len(self.timestamps)
+        batch_timestamps = batch['Datetime'].to_numpy()
+        batch_valid = np.count_nonzero(~np.isnat(batch_timestamps))
+        index.n_rows = self.n_rows + len(batch)
+        index.timestamps = np.concatenate([self.timestamps, batch_timestamps[:batch_valid]])
+
+        # Row numbers of the batch in the combined frame
+        batch_rows = np.concatenate([
+            n_valid + np.arange(batch_valid),
+            self.n_rows + batch_valid + np.arange(len(batch) - batch_valid),
+        ])
+        # Dated rows in either part come before every NaT row
+        first_nat = n_valid + batch_valid
+
+        index.categories, index.postings, index.missing = {}, {}, {}
+        for col, (order, bounds) in self.postings.items():
+            values = batch[col]
+            categories = values.cat.categories
+            old_codes = np.full(len(categories), -1)
+            old_codes[categories.get_indexer(self.categories[col])] = np.arange(len(self.categories[col]))
+
+            shifted = np.where(order < n_valid, order, order + batch_valid)
+            batch_codes = values.cat.codes.to_numpy()
+            batch_order = np.argsort(batch_codes, kind='stable')
+            batch_bounds = np.searchsorted(batch_codes[batch_order], np.arange(-1, len(categories) + 1))
+
+            blocks = []
+            for code in range(-1, len(categories)):
+                if code == -1:
+                    old = shifted[:bounds[0]]
+                elif old_codes[code] >= 0:
+                    old = shifted[bounds[old_codes[code]]:bounds[old_codes[code] + 1]]
+                else:
+                    old = shifted[:0]
+                new = batch_rows[batch_order[batch_bounds[code + 1]:batch_bounds[code + 2]]]
+                old_split, new_split = np.searchsorted(old, first_nat), np.searchsorted(new, first_nat)
+                blocks.append(np.concatenate([old[:old_split], new[:new_split], old[old_split:], new[new_split:]]))
+
+            merged = np.concatenate(blocks)
+            index.categories[col] = categories
+            index.postings[col] = (merged, np.cumsum([len(block) for block in blocks]))
+            index.missing[col] = blocks[0]
+        return index
+
+    def indexes(self, col):
+        return col in self.postings
+
+    def options(self, col):
+        """
+        Sorted values of a column that occur in at least one row.
+        """
+        order, bounds = self.postings[col]
+        present = np.diff(bounds) > 0
+        return sorted(self.categories[col][present].tolist())
+
+    def date_bounds(self):
+        """
+        First and last date with a parseable timestamp, or None.
+        """
+        if self.timestamps is None or len(self.timestamps) == 0:
+            return None
+        first, last = pd.Timestamp(self.timestamps[0]), pd.Timestamp(self.timestamps[-1])
+        return first.date(), last.date()
+
+    def date_slice(self, start_date, end_date):
+        """
+        Row range [lo, hi) whose timestamps fall on start_date..end_date inclusive.
+        """
+        dtype = self.timestamps.dtype
+        start = np.datetime64(start_date, 'D').astype(dtype)
+        stop = np.datetime64(end_date + datetime.timedelta(days=1), 'D').astype(dtype)
+        lo, hi = np.searchsorted(self.timestamps, [start, stop], side='left')
+        return int(lo), int(hi)
+
+    def _value_mask(self, col, values, lo, hi):
+        order, bounds = self.postings[col]
+        selected = np.zeros(len(self.categories[col]), dtype=bool)
+        codes = self.categories[col].get_indexer(values)
+        selected[codes[codes >= 0]] = True
+
+        # Scatter whichever side of the selection has fewer rows
+        sizes = np.diff(bounds)
+        invert = sizes[selected].sum() > sizes[~selected].sum()
+        if invert:
+            selected = ~selected
+
+        postings = [order[bounds[code]:bounds[code + 1]] for code in np.flatnonzero(selected & (sizes > 0))]
+        if invert:
+            postings.append(self.missing[col])
+
+        mask = np.zeros(hi - lo, dtype=bool)
+        for rows in postings:
+            start, stop = np.searchsorted(rows, [lo, hi])
+            mask[rows[start:stop] - lo] = True
+        return ~mask if invert else mask
+
+    def select(self, date_range=None, **selections):
+        """
+        Returns the matching rows as a slice (date range only) or an array of
+        row positions. selections maps an indexed column to its allowed values;
+        None or every present value means no constraint on that column.
+        """
+        lo, hi = (0, self.n_rows) if date_range is None else self.date_slice(*date_range)
+
+        mask = None
+        for col, values in selections.items():
+            if values is None or set(values) >= set(self.options(col)):
+                continue
+            col_mask = self._value_mask(col, values, lo, hi)
+            mask = col_mask if mask is None else mask & col_mask
+
+        if mask is None:
+            return slice(lo, hi)
+        return lo + np.flatnonzero(mask)
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+import streamlit_folium
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Samples kept per (page, step) for the rolling percentiles
+ROLLING_WINDOW = 200
+# Page of measurements taken outside a session, e.g. by the cache warm-up thread
+BACKGROUND_PAGE = "(background)"
+# Recording is off unless TRAFFIC_PERF=1 or turned on from the Settings page
+PERF_ENABLED = os.environ.get("TRAFFIC_PERF", "0") == "1"
+# Payload sizes take a second serialization, so only one call in this many of each step is sized
+SIZE_SAMPLE_EVERY = 10
+
+
+class PerfRecorder:
+    """
+    Rolling timings and payload sizes per page and step, shared by every
+    session of this server process, optionally appended to a JSON-lines log.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW, enabled=PERF_ENABLED, size_every=SIZE_SAMPLE_EVERY):
+        self.window = window
+        self.enabled = enabled
+        self.size_every = size_every
+        self.log_path = None
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._calls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def sample_size(self, step):
+        """
+        Whether to measure the payload size of this call of step: the first
+        call and every size_every-th after it, while recording.
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._calls[step] += 1
+            return (self._calls[step] - 1) % self.size_every == 0
+
+    def record(self, page, step, seconds, size=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples[(page, step)].append((seconds, size))
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps({
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "page": page, "step": step,
+                        "seconds": round(seconds, 6), "bytes": size,
+                    }) + "\n")
+
+    def summary(self):
+        """
+        p50/p95 latency in ms and median payload size per page and step.
+        """
+        with self._lock:
+            items = [(key, list(samples)) for key, samples in self._samples.items()]
+        rows = []
+        for (page, step), samples in sorted(items, key=lambda item: (str(item[0][0]), item[0][1])):
+            seconds = np.array([sample[0] for sample in samples]) * 1000
+            sizes = [sample[1] for sample in samples if sample[1] is not None]
+            rows.append({
+                'Page': page, 'Step': step, 'Calls': len(samples),
+                'p50 ms': np.percentile(seconds, 50), 'p95 ms': np.percentile(seconds, 95),
+                'Bytes p50': np.median(sizes) if sizes else None,
+            })
+        return pd.DataFrame(rows, columns=['Page', 'Step', 'Calls', 'p50 ms', 'p95 ms', 'Bytes p50'])
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+
+
+@st.cache_resource
+def get_recorder():
+    """
+    The recorder shared by every session of this server process.
+    """
+    return PerfRecorder()
+
+
+def set_page(page):
+    """
+    Attributes the following measurements of this rerun to page.
+    """
+    st.session_state['perf_page'] = page
+
+
+def record(step, seconds, size=None):
+    if get_script_run_ctx(suppress_warning=True) is None:
+        page = BACKGROUND_PAGE
+    else:
+        page = st.session_state.get('perf_page')
+    get_recorder().record(page, step, seconds, size)
+
+
+@contextmanager
+def timed(step):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(step, time.perf_counter() - start)
+
+
+def _figure_title(fig):
+    title = fig.layout.title.text
+    return f"plotly_chart: {title}" if title else "plotly_chart"
+
+
+def plotly_chart(fig, **kwargs):
+    """
+    st.plotly_chart that records render time and, for sampled calls, the figure's JSON size.
+    """
+    if not get_recorder().enabled:
+        return st.plotly_chart(fig, **kwargs)
+    start = time.perf_counter()
+    result = st.plotly_chart(fig, **kwargs)
+    seconds = time.perf_counter() - start
+    step = _figure_title(fig)
+    record(step, seconds, len(fig.to_json()) if get_recorder().sample_size(step) else None)
+    return result
+
+
+def st_folium(m, **kwargs):
+    """
+    streamlit_folium.st_folium that records render time and, for sampled calls, the map's HTML size.
+    """
+    if not get_recorder().enabled:
+        return streamlit_folium.st_folium(m, **kwargs)
+    start = time.perf_counter()
+    result = streamlit_folium.st_folium(m, **kwargs)
+    seconds = time.perf_counter() - start
+    record("st_folium", seconds, len(m.get_root().render()) if get_recorder().sample_size("st_folium") else None)
+    return result
+
+
+def dataframe(data, **kwargs):
+    """
+    st.dataframe that records render time and, for sampled calls, the Arrow size of the data.
+    """
+    if not get_recorder().enabled:
+        return st.dataframe(data, **kwargs)
+    start = time.perf_counter()
+    result = st.dataframe(data, **kwargs)
+    seconds = time.perf_counter() - start
+    size = None
+    if get_recorder().sample_size("dataframe"):
+        # Stylers wrap the frame they render
+        frame = getattr(data, 'data', data)
+        size = pa.Table.from_pandas(frame).nbytes
+    record("dataframe", seconds, size)
+    return result
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from utils.instrumentation import timed
+
+# Upper bound on memoized aggregate results kept per process, before room is
+# made for the cache warm-up. Override with TRAFFIC_CACHE_ENTRIES.
+MAX_ENTRIES = int(os.environ.get("TRAFFIC_CACHE_ENTRIES", "256"))
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss counters.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Computed outside the lock so one slow view does not block other sessions
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def reserve(self, entries):
+        """
+        Raises the capacity to at least entries; it is never lowered.
+        """
+        with self._lock:
+            self.max_entries = max(self.max_entries, entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def state_key(*parts):
+    """
+    Stable hash of view name, filter state and widget state.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def frame_key(df, filters):
+    """
+    Identifies a filtered frame by the loaded dataset it came from and the filters applied.
+    """
+    load_info = df.attrs.get('load_info', {})
+    return [load_info.get('store'), load_info.get('rows'), filters]
+
+
+@st.cache_resource
+def get_aggregate_cache():
+    """
+    The LRU shared by every session of this server process.
+    """
+    return LRUCache()
+
+
+def memoize(view, data_key, widget_state, compute):
+    """
+    Returns compute() for this view, data and widget state, reusing a cached
+    result when the same combination was computed before. Cached results are
+    shared across sessions and must not be mutated by the caller.
+    """
+    key = state_key(view, data_key, widget_state)
+    with timed(f"aggregate: {view}"):
+        return get_aggregate_cache().get_or_compute(key, compute)
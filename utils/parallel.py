@@ -0,0 +1,126 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Worker processes used for aggregation; 1 aggregates in the calling thread.
+# Override with the TRAFFIC_WORKERS environment variable when starting the server.
+DEFAULT_WORKERS = int(os.environ.get("TRAFFIC_WORKERS", "1"))
+# Smaller inputs are aggregated serially; shipping them to a pool does not pay off
+PARALLEL_MIN_ROWS = 200_000
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class SharedFrame:
+    """
+    Columns of a frame copied once into shared memory, so worker processes
+    read their rows without the frame being pickled. Categoricals are shared
+    as their codes; the categories travel with the spec.
+    """
+
+    def __init__(self, df, columns):
+        self._blocks = []
+        self.spec = {'rows': len(df), 'columns': []}
+        try:
+            for col in columns:
+                values = df[col]
+                categories = None
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    categories = values.dtype
+                    array = values.cat.codes.to_numpy()
+                else:
+                    array = values.to_numpy()
+                if array.dtype == object:
+                    raise TypeError(f"Column {col} has no fixed-width dtype to share")
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+                self.spec['columns'].append((col, block.name, array.dtype.str, categories))
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_shared(spec, start, stop):
+    """
+    Rows start:stop of a SharedFrame as a DataFrame, copied out of shared memory.
+    """
+    data = {}
+    for col, name, dtype, categories in spec['columns']:
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            array = np.array(np.ndarray((spec['rows'],), np.dtype(dtype), buffer=block.buf)[start:stop])
+        finally:
+            block.close()
+        data[col] = pd.Categorical.from_codes(array, dtype=categories) if categories is not None else array
+    return pd.DataFrame(data)
+
+
+def _run_partition(fn, spec, start, stop, args):
+    return fn(read_shared(spec, start, stop), *args)
+
+
+def get_pool(workers):
+    """
+    A process pool with the given number of workers, started once and reused.
+    Workers are spawned rather than forked because the app process runs threads.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+def partition_bounds(n_rows, parts, keys=None):
+    """
+    Row boundaries splitting n_rows into up to parts contiguous ranges. With
+    sorted keys, boundaries move back to the first row of their key so rows
+    with equal keys (e.g. one day) stay in one range.
+    """
+    bounds = np.linspace(0, n_rows, parts + 1).astype(np.int64)
+    if keys is not None and n_rows:
+        inner = np.searchsorted(keys, keys[np.minimum(bounds[1:-1], n_rows - 1)], side='left')
+        bounds[1:-1] = inner
+    return np.unique(bounds).tolist()
+
+
+def map_partitions(df, columns, bounds, fn, workers, *args):
+    """
+    Applies fn(frame, *args) to each row range of df[columns] in the worker
+    pool and returns the results in order. fn must be importable by the
+    workers (a module-level function). Only the partial results are pickled.
+    """
+    pool = get_pool(workers)
+    with SharedFrame(df, columns) as shared:
+        futures = [pool.submit(_run_partition, fn, shared.spec, start, stop, args)
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        return [future.result() for future in futures]
@@ -0,0 +1,175 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+# Declared storage types for the cleaned violations frame.
+# Low and medium cardinality text columns become pandas categoricals.
+CATEGORY_COLUMNS = [
+    'Violation_Type', 'Location', 'Date', 'Time', 'Vehicle_Type', 'Vehicle_Color',
+    'Registration_State', 'Driver_Gender', 'License_Type', 'Weather_Condition',
+    'Road_Condition', 'Officer_ID', 'Issuing_Agency', 'License_Validity',
+    'Helmet_Worn', 'Seatbelt_Worn', 'Traffic_Light_Status', 'Breathalyzer_Result',
+    'Towed', 'Fine_Paid', 'Payment_Method', 'Court_Appearance_Required', 'Comments',
+    'Month', 'Day_of_Week', 'Age_Band',
+]
+
+# Driver age bands: label -> first age in the band
+AGE_BANDS = {'Under 18': 0, '18-24': 18, '25-34': 25, '35-44': 35, '45-59': 45, '60+': 60}
+
+# Categoricals with a natural order are stored ordered, with all of these categories
+ORDERED_CATEGORIES = {
+    'Month': list(calendar.month_name)[1:],
+    'Day_of_Week': list(calendar.day_name),
+    'Age_Band': list(AGE_BANDS),
+}
+
+# Integer columns are downcast to the narrowest signed type that holds their values
+INTEGER_COLUMNS = [
+    'Fine_Amount', 'Driver_Age', 'Penalty_Points', 'Speed_Limit', 'Recorded_Speed',
+    'Vehicle_Model_Year', 'Number_of_Passengers', 'Previous_Violations',
+    'Month_Num', 'Hour', 'Overspeed', 'Vehicle_Age',
+]
+
+FLOAT_COLUMNS = ['Alcohol_Level']
+
+BOOLEAN_COLUMNS = ['Repeat_Offender']
+
+# Columns added by clean_data, including the features of utils.features; every
+# other stored column comes from the source file
+DERIVED_COLUMNS = [
+    'Datetime', 'Month', 'Month_Num', 'Day_of_Week', 'Hour',
+    'Overspeed', 'Age_Band', 'Vehicle_Age', 'Repeat_Offender',
+]
+
+# Casing is normalized on the category dictionary, not on every row
+TITLE_CASE_COLUMNS = ['Violation_Type', 'Location', 'Vehicle_Type', 'Gender', 'Payment_Method']
+
+
+def title_case_categories(series):
+    """
+    Title-cases a categorical column by rewriting its categories.
+    Categories that collapse to the same title-cased value are merged.
+    """
+    cat = series.cat
+    titled = cat.categories.astype(str).str.title()
+    if titled.is_unique:
+        return cat.rename_categories(titled)
+
+    merged, inverse = pd.factorize(titled)
+    codes = cat.codes.to_numpy()
+    codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=merged),
+                     index=series.index, name=series.name)
+
+
+def apply_schema(df):
+    """
+    Converts the cleaned frame to the declared compact dtypes.
+    """
+    for col, categories in ORDERED_CATEGORIES.items():
+        dtype = pd.CategoricalDtype(categories, ordered=True)
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    for col in TITLE_CASE_COLUMNS:
+        if col in df.columns:
+            df[col] = title_case_categories(df[col])
+
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            # Columns with missing values cannot be held in a numpy integer type
+            downcast = 'float' if df[col].isna().any() else 'integer'
+            df[col] = pd.to_numeric(df[col], downcast=downcast)
+
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], downcast='float')
+
+    for col in BOOLEAN_COLUMNS:
+        if col in df.columns and df[col].dtype != bool:
+            df[col] = df[col].astype(bool)
+
+    return df
+
+
+def sort_categories(df):
+    """
+    Sorts unordered category dictionaries in place. Parts cleaned separately
+    are unified in order of first appearance, which would otherwise leak into
+    groupby output order.
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered \
+                and not dtype.categories.is_monotonic_increasing:
+            df[col] = df[col].cat.reorder_categories(dtype.categories.sort_values())
+    return df
+
+
+def align_categories(*frames):
+    """
+    Returns shallow copies of the frames in which every categorical column
+    has the same dictionary in all of them (the union of their categories),
+    so they can be concatenated without falling back to object columns.
+    """
+    frames = [frame.copy(deep=False) for frame in frames]
+    for col in frames[0].columns:
+        dtypes = [frame[col].dtype for frame in frames if col in frame.columns]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            continue
+
+        categories = dtypes[0].categories
+        for dtype in dtypes[1:]:
+            new = dtype.categories.difference(categories)
+            if len(new):
+                categories = categories.append(new)
+        if not dtypes[0].ordered:
+            categories = categories.sort_values()
+
+        for frame in frames:
+            if col in frame.columns and not frame[col].cat.categories.equals(categories):
+                frame[col] = frame[col].cat.set_categories(categories)
+    return frames
+
+
+def validate_batch(batch, source_columns):
+    """
+    Checks that a raw batch has exactly the source columns and that its
+    numeric columns parse. Raises ValueError listing every problem found.
+    """
+    problems = []
+    missing = [col for col in source_columns if col not in batch.columns]
+    unexpected = [col for col in batch.columns if col not in source_columns]
+    if missing:
+        problems.append(f"missing columns {missing}")
+    if unexpected:
+        problems.append(f"unexpected columns {unexpected}")
+
+    for col in INTEGER_COLUMNS + FLOAT_COLUMNS:
+        if col in batch.columns and col in source_columns:
+            values = batch[col]
+            invalid = values.notna() & pd.to_numeric(values, errors='coerce').isna()
+            if invalid.any():
+                problems.append(f"{col} has {int(invalid.sum())} non-numeric values")
+
+    if problems:
+        raise ValueError("Batch does not match the violations schema: " + "; ".join(problems))
+
+
+def memory_report(df):
+    """
+    Returns the in-memory footprint of every column, largest first.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'Column': usage.index,
+        'Dtype': [str(df[col].dtype) for col in usage.index],
+        'Bytes': usage.to_numpy(),
+    })
+    report['Share'] = report['Bytes'] / max(report['Bytes'].sum(), 1)
+    return report.sort_values('Bytes', ascending=False, ignore_index=True)
@@ -0,0 +1,425 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+import streamlit as st
+
+from analytics.anomalies import SpikeDetector
+from analytics.quantiles import QuantileSketches
+from analytics.sketches import WorkloadSketches
+from utils.cube import CUBOIDS, DERIVED_DIMENSIONS, combine_cells
+from utils.data_loader import ensure_store
+from utils.schema import CATEGORY_COLUMNS, ORDERED_CATEGORIES, apply_schema, sort_categories
+from utils.store import read_manifest, read_parts, split_parts
+
+DATABASE_FILE = "violations.sqlite"
+TABLE = "violations"
+# Normalized day of Datetime as ISO text; the cube's Date dimension
+DAY_COLUMN = "Day"
+# Columns with an index for the sidebar filters
+INDEXED_COLUMNS = (DAY_COLUMN, 'Location', 'Violation_Type')
+INSERT_CHUNK_ROWS = 50_000
+# Most rows select() fetches for a page; larger selections are sampled evenly
+SELECT_ROW_LIMIT = int(os.environ.get("TRAFFIC_SQL_ROW_LIMIT", "200000"))
+
+
+def database_path(store_dir):
+    return os.path.join(store_dir, DATABASE_FILE)
+
+
+def _column(dim):
+    return DAY_COLUMN if dim == 'Date' else dim
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_predicate(filters, columns, options=None):
+    """
+    WHERE clause and parameters selecting the same rows FilterIndex.select
+    and ViolationCube.where select for a list of filter states. Given
+    options(col), a selection of every value of an indexed column adds no
+    clause, so rows missing a value stay selected as they do there.
+    """
+    clauses, params = [], []
+    for state in filters:
+        for col, values in state.items():
+            if values is None:
+                continue
+            if col == 'date_range':
+                clauses.append(f"{_quote(DAY_COLUMN)} BETWEEN ? AND ?")
+                params += [pd.Timestamp(day).strftime('%Y-%m-%d') for day in values]
+            elif col not in columns:
+                raise ValueError(f"Unknown filter column: {col}")
+            elif options is not None and col in INDEXED_COLUMNS and set(values) >= set(options(col)):
+                continue
+            else:
+                clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+                params += [str(value) for value in values]
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _sql_frame(df):
+    """
+    A cleaned frame as SQLite stores it: categoricals as text, timestamps as
+    ISO text and the day of each timestamp in DAY_COLUMN.
+    """
+    out = {}
+    for col in df.columns:
+        values = df[col]
+        if col == 'Datetime':
+            out[col] = values.dt.strftime('%Y-%m-%d %H:%M:%S')
+            out[DAY_COLUMN] = values.dt.strftime('%Y-%m-%d')
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            out[col] = values.astype(object)
+        else:
+            out[col] = values
+    return pd.DataFrame(out)
+
+
+def _insert_parts(con, store_dir, parts):
+    for part in parts:
+        frame = _sql_frame(read_parts(store_dir, [part]))
+        frame.to_sql(TABLE, con, if_exists='append', index=False, chunksize=INSERT_CHUNK_ROWS)
+
+
+def build_database(store_dir, manifest):
+    """
+    Writes every part of the store into a fresh SQLite file next to it, one
+    part at a time, so memory stays bounded by the part size.
+    """
+    path = database_path(store_dir)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with closing(sqlite3.connect(tmp_path)) as con:
+        _insert_parts(con, store_dir, manifest['parts'])
+        for col in INDEXED_COLUMNS:
+            con.execute(f"CREATE INDEX {_quote('idx_' + col)} ON {TABLE} ({_quote(col)})")
+        con.execute("CREATE TABLE meta (batches INTEGER)")
+        con.execute("INSERT INTO meta VALUES (?)", (manifest['batches'],))
+        con.commit()
+    os.replace(tmp_path, path)
+
+
+def _restore_types(frame, dims):
+    # Text dimensions become categoricals with sorted categories, or their declared order, as in the pandas cube
+    for dim in dims:
+        if dim == 'Date':
+            frame[dim] = pd.to_datetime(frame[dim])
+        elif dim in ORDERED_CATEGORIES:
+            frame[dim] = frame[dim].astype(pd.CategoricalDtype(ORDERED_CATEGORIES[dim], ordered=True))
+        elif frame[dim].dtype == object or pd.api.types.is_string_dtype(frame[dim]):
+            frame[dim] = frame[dim].astype('category')
+    return frame
+
+
+class SqlCube:
+    """
+    The ViolationCube interface over the SQLite table. where() adds to the
+    predicate and rollup() and totals() run GROUP BY queries with it, so only
+    aggregates leave the database.
+    """
+
+    def __init__(self, database, filters=None):
+        self.database = database
+        self._filters = filters or []
+        self.version = database.version
+        self.key = [self.version] + self._filters
+        self.workers = 1
+        self._cells = {}
+
+    def where(self, date_range=None, **selections):
+        filters = {'date_range': date_range, **selections}
+        if all(value is None for value in filters.values()):
+            return self
+        return SqlCube(self.database, self._filters + [filters])
+
+    def _group(self, dims, dropna):
+        where, params = sql_predicate(self._filters, self.database.columns, self.database.options)
+        columns = [f"{_quote(_column(dim))} AS {_quote(dim)}" for dim in dims]
+        if dropna:
+            not_null = " AND ".join(f"{_quote(_column(dim))} IS NOT NULL" for dim in dims)
+            where = f"{where} AND {not_null}" if where else f" WHERE {not_null}"
+        group = ", ".join(_quote(_column(dim)) for dim in dims)
+        sql = (f"SELECT {', '.join(columns)}, COUNT(*) AS Count, SUM(Fine_Amount) AS Fine_Sum, "
+               f"SUM(Fine_Amount * Fine_Amount) AS Fine_Sq, MAX(Fine_Amount) AS Fine_Max "
+               f"FROM {TABLE}{where} GROUP BY {group} ORDER BY {group}")
+        out = _restore_types(self.database.query(sql, params), dims)
+        if any(dim in ORDERED_CATEGORIES for dim in dims):
+            # SQLite orders text alphabetically; months and weekdays sort in their declared order
+            out = out.sort_values(dims, kind='stable', ignore_index=True)
+        return out.astype({'Count': 'int64', 'Fine_Sum': 'float64', 'Fine_Sq': 'float64', 'Fine_Max': 'float64'})
+
+    def cuboid(self, name):
+        """
+        Cells of the named cuboid under the predicate, fetched once; for
+        analyses that work on cells rather than rollups. The predicate selects
+        days exactly, so cells come per day only for the daily cuboid.
+        """
+        if name not in self._cells:
+            grain, dims = CUBOIDS[name]
+            dims = (['Date'] if grain == 'D' else []) + dims
+            sources = [DERIVED_DIMENSIONS[dim][0] if dim in DERIVED_DIMENSIONS else dim for dim in dims]
+            cells = self._group([dim for dim in dict.fromkeys(sources) if _column(dim) in self.database.columns],
+                                dropna=False)
+            derived = [dim for dim in dims if dim in DERIVED_DIMENSIONS and DERIVED_DIMENSIONS[dim][0] in cells.columns]
+            if derived:
+                for dim in derived:
+                    col, derive = DERIVED_DIMENSIONS[dim]
+                    cells[dim] = derive(cells[col].to_numpy(dtype='float64', na_value=float('nan')))
+                cells = combine_cells(cells, [dim for dim in dims if dim in cells.columns])
+            self._cells[name] = cells
+        return self._cells[name]
+
+    def rollup(self, dims):
+        dims = list(dims)
+        if not dims:
+            return pd.DataFrame([self.totals()])
+        out = self._group(dims, dropna=True)
+        out['Fine_Mean'] = out['Fine_Sum'] / out['Count']
+        return out.reset_index(drop=True)
+
+    def totals(self):
+        where, params = sql_predicate(self._filters, self.database.columns, self.database.options)
+        row = self.database.query(
+            f"SELECT COUNT(*) AS Count, SUM(Fine_Amount) AS Fine_Sum, SUM(Fine_Amount * Fine_Amount) AS Fine_Sq, "
+            f"MAX(Fine_Amount) AS Fine_Max FROM {TABLE}{where}", params).iloc[0]
+        count = int(row['Count'])
+        fine_sum = float(row['Fine_Sum'] or 0)
+        fine_sq = float(row['Fine_Sq'] or 0)
+        mean = fine_sum / count if count else 0.0
+        variance = max(fine_sq / count - mean * mean, 0.0) if count else 0.0
+        return {
+            'Count': count,
+            'Fine_Sum': fine_sum,
+            'Fine_Sq': fine_sq,
+            'Fine_Max': float(row['Fine_Max'] or 0),
+            'Fine_Mean': mean,
+            'Fine_Std': variance ** 0.5,
+        }
+
+    def __len__(self):
+        return sum(len(self.cuboid(name)) for name in CUBOIDS)
+
+    @property
+    def empty(self):
+        return self.totals()['Count'] == 0
+
+
+class SqlDatabase:
+    """
+    The cleaned violations in an embedded SQLite file next to the store, for
+    data that should not live in every process's memory. Offers the filter
+    options of FilterIndex, a SqlCube and the rows a page asks for.
+
+    Batches appended to the store are inserted on the next refresh.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.workers = 1
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self, force_rebuild=False, rebuild_database=False):
+        start = time.perf_counter()
+        self.store_dir, ingest = ensure_store(self.file_path, force_rebuild=force_rebuild)
+        self.path = database_path(self.store_dir)
+        manifest = read_manifest(self.store_dir)
+        if force_rebuild or rebuild_database or ingest is not None or not os.path.exists(self.path):
+            build_database(self.store_dir, manifest)
+        self._sketches = None
+        self._quantiles = None
+        self._opened(time.perf_counter() - start, len(manifest['parts']), ingest)
+
+    def _opened(self, seconds, parts, ingest=None):
+        with closing(self.connect()) as con:
+            self.batches = con.execute("SELECT batches FROM meta").fetchone()[0]
+            self.rows = con.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+            self.columns = [row[1] for row in con.execute(f"PRAGMA table_info({TABLE})")]
+        self.version = f"sqlite:{self.path}:{os.stat(self.path).st_mtime_ns}"
+        self.load_info = {
+            "source": self.file_path,
+            "store": self.store_dir,
+            "database": self.path,
+            "rows": self.rows,
+            "parts": parts,
+            "batches": self.batches,
+            "seconds": round(seconds, 4),
+            "ingest": ingest,
+            "bytes": os.path.getsize(self.path),
+        }
+        self.cube = SqlCube(self)
+        self._spikes = None
+        # Filter options and date bounds only change with the data
+        self._options = {}
+        first, last = self.query(f"SELECT MIN({DAY_COLUMN}) AS first, MAX({DAY_COLUMN}) AS last FROM {TABLE}").iloc[0]
+        self._date_bounds = None if first is None else (datetime.date.fromisoformat(first),
+                                                         datetime.date.fromisoformat(last))
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def query(self, sql, params=()):
+        with closing(self.connect()) as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    def indexes(self, col):
+        return col in self.columns
+
+    def options(self, col):
+        """
+        Sorted values of a column that occur in at least one row, queried
+        once per version of the data.
+        """
+        if col not in self._options:
+            values = self.query(f"SELECT DISTINCT {_quote(col)} AS value FROM {TABLE} "
+                                f"WHERE {_quote(col)} IS NOT NULL")['value']
+            self._options[col] = sorted(values.tolist())
+        return self._options[col]
+
+    def date_bounds(self):
+        """
+        First and last date with a parseable timestamp, or None; queried
+        when the data is opened or refreshed.
+        """
+        return self._date_bounds
+
+    def select(self, filters, columns=None, limit=None):
+        """
+        Rows matching the sidebar filters as a cleaned frame in time order.
+        With limit, larger selections are sampled evenly down to about that
+        many rows and attrs['matching_rows'] holds how many matched.
+        """
+        columns = [col for col in (columns or self.columns) if col != DAY_COLUMN]
+        where, params = sql_predicate([filters], self.columns, self.options)
+        matching = None
+        if limit is not None:
+            matching = self.query(f"SELECT COUNT(*) AS n FROM {TABLE}{where}", params)['n'].iloc[0]
+            if matching > limit:
+                # Every step-th row in insertion order, which follows time within each part
+                where = f"{where} AND" if where else " WHERE"
+                where += " rowid % ? = 0"
+                params = params + [-(-int(matching) // limit)]
+        df = self.query(f"SELECT {', '.join(_quote(col) for col in columns)} FROM {TABLE}{where} "
+                        f"ORDER BY Datetime IS NULL, Datetime" + (" LIMIT ?" if limit is not None else ""),
+                        params + ([limit] if limit is not None else []))
+        if 'Datetime' in df.columns:
+            df['Datetime'] = pd.to_datetime(df['Datetime'], format='ISO8601')
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        df = sort_categories(apply_schema(df))
+        # frame_key() tells data versions apart by the load info
+        df.attrs['load_info'] = self.load_info
+        if matching is not None and matching > len(df):
+            df.attrs['matching_rows'] = int(matching)
+        return df
+
+    def _loaded_parts(self):
+        """
+        Store parts holding the rows in the database. When compaction merged
+        them with later appends, the database is rebuilt from the store first.
+        """
+        split = split_parts(read_manifest(self.store_dir)['parts'], self.batches)
+        if split is None:
+            self._load(rebuild_database=True)
+            split = split_parts(read_manifest(self.store_dir)['parts'], self.batches)
+        return split[0]
+
+    @property
+    def sketches(self):
+        """
+        Workload sketches built from the store one part at a time, so memory
+        stays bounded by the part size.
+        """
+        if self._sketches is None:
+            sketches = WorkloadSketches()
+            for part in self._loaded_parts():
+                sketches = sketches.appended(read_parts(self.store_dir, [part]))
+            self._sketches = sketches
+        return self._sketches
+
+    @property
+    def quantiles(self):
+        """
+        Quantile sketches built like the workload sketches; months a date
+        range covers partly are selected from the database.
+        """
+        if self._quantiles is None:
+            quantiles = QuantileSketches(rows=self.select)
+            for part in self._loaded_parts():
+                quantiles = quantiles.appended(read_parts(self.store_dir, [part]))
+            self._quantiles = quantiles
+        return self._quantiles
+
+    @property
+    def spikes(self):
+        if self._spikes is None:
+            self._spikes = SpikeDetector.from_cells(self.cube.rollup(['Date', 'Location', 'Violation_Type']))
+        return self._spikes
+
+    def refresh(self):
+        """
+        Inserts parts appended to the store since the last refresh, or
+        rebuilds the database when the source file changed.
+        """
+        start = time.perf_counter()
+        store_dir, _ = ensure_store(self.file_path)
+        manifest = read_manifest(store_dir)
+        if store_dir != self.store_dir or manifest['batches'] < self.batches:
+            self._load()
+            return True
+        if manifest['batches'] == self.batches:
+            return False
+        split = split_parts(manifest['parts'], self.batches)
+        if split is None:
+            # Compaction merged appends not inserted yet into older parts
+            self._load(rebuild_database=True)
+            return True
+        new_parts = split[1]
+        with closing(self.connect()) as con:
+            _insert_parts(con, store_dir, new_parts)
+            con.execute("UPDATE meta SET batches = ?", (manifest['batches'],))
+            con.commit()
+        if self._sketches is not None:
+            for part in new_parts:
+                self._sketches = self._sketches.appended(read_parts(store_dir, [part]))
+        if self._quantiles is not None:
+            for part in new_parts:
+                self._quantiles = self._quantiles.appended(read_parts(store_dir, [part]))
+        self._opened(time.perf_counter() - start, len(manifest['parts']))
+        return True
+
+    def snapshot(self):
+        """
+        Refreshes and returns (None, self, cube, spikes, sketches, quantiles):
+        the same shape as Dataset.snapshot, without a frame in memory.
+        """
+        with self._lock:
+            self.refresh()
+            # Sketches first: building them may reload the database after a compaction
+            sketches, quantiles = self.sketches, self.quantiles
+            return None, self, self.cube, self.spikes, sketches, quantiles
+
+    def rebuild(self):
+        with self._lock:
+            self._load(force_rebuild=True)
+
+
+@st.cache_resource
+def load_database(file_path):
+    """
+    Opens the SQLite backend once per process, building it on first use.
+    """
+    try:
+        return SqlDatabase(file_path)
+    except FileNotFoundError:
+        st.error(f"File not found: {file_path}")
+        st.stop()
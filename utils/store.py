@@ -0,0 +1,269 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+CACHE_DIR = ".cache"
+MANIFEST_FILE = "manifest.json"
+FINGERPRINTS_FILE = "fingerprints.json"
+HASH_BLOCK_SIZE = 1 << 20
+
+# Bump whenever the cleaning pipeline or stored dtypes change so old stores are rebuilt
+STORE_VERSION = 7
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path, data):
+    # Write to a temp file first so readers never see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def file_fingerprint(file_path, cache_dir=CACHE_DIR):
+    """
+    Returns the size, mtime and SHA-256 content hash of a source file.
+    The hash is only recomputed when size or mtime change.
+    """
+    stat = os.stat(file_path)
+    abs_path = os.path.abspath(file_path)
+    known_path = os.path.join(cache_dir, FINGERPRINTS_FILE)
+    known = _read_json(known_path) or {}
+
+    entry = known.get(abs_path)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    known[abs_path] = entry
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_json(known_path, known)
+    return entry
+
+
+def store_path(file_path, fingerprint, cache_dir=CACHE_DIR):
+    """
+    Directory holding the prepared data for one version of a source file.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(cache_dir, f"{stem}-{fingerprint['sha256'][:16]}")
+
+
+def part_path(store_dir, part_no):
+    return os.path.join(store_dir, f"part-{part_no:05d}.feather")
+
+
+def read_manifest(store_dir):
+    """
+    Returns the manifest of a complete, current-version store, or None.
+    """
+    manifest = _read_json(os.path.join(store_dir, MANIFEST_FILE))
+    if manifest is None or manifest.get("version") != STORE_VERSION:
+        return None
+    return manifest
+
+
+def read_parts(store_dir, parts):
+    """
+    Memory-maps the given parts of a store and returns them as one frame.
+    """
+    # Parts are cleaned independently, so integer widths and category
+    # dictionaries can differ between them and are unified here
+    tables = [feather.read_table(os.path.join(store_dir, part["file"]), memory_map=True) for part in parts]
+    table = pa.concat_tables(tables, promote_options="permissive").unify_dictionaries()
+    return table.to_pandas()
+
+
+def overlapping_parts(parts, start=None, end=None, undated=True):
+    """
+    Parts whose timestamp range overlaps start..end (inclusive; None leaves
+    that side open), judged from the min/max recorded for each part. Parts
+    with undated rows only are kept when undated is true.
+    """
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    selected = []
+    for part in parts:
+        if part.get("min") is None:
+            if undated:
+                selected.append(part)
+        elif (start is None or pd.Timestamp(part["max"]) >= start) and \
+                (end is None or pd.Timestamp(part["min"]) <= end):
+            selected.append(part)
+    return selected
+
+
+def read_store(store_dir, manifest=None, start=None, end=None, undated=True):
+    """
+    Memory-maps the parts of the store overlapping start..end (all by
+    default) and returns them as one frame. Returns None when the store is
+    missing, incomplete or from an older version.
+    """
+    manifest = manifest or read_manifest(store_dir)
+    if manifest is None:
+        return None
+    paths = [os.path.join(store_dir, part["file"]) for part in manifest["parts"]]
+    if not paths or not all(os.path.exists(path) for path in paths):
+        return None
+    parts = overlapping_parts(manifest["parts"], start, end, undated)
+    if not parts:
+        # Nothing overlaps; an empty frame with the stored columns and dtypes
+        return read_parts(store_dir, manifest["parts"][:1]).iloc[:0]
+    return read_parts(store_dir, parts)
+
+
+def store_columns(store_dir):
+    """
+    Column names of the stored frame, read from the schema of its first part.
+    """
+    manifest = read_manifest(store_dir)
+    if manifest is None or not manifest["parts"]:
+        return None
+    path = os.path.join(store_dir, manifest["parts"][0]["file"])
+    return feather.read_table(path, memory_map=True).schema.names
+
+
+def clear_store(store_dir):
+    """
+    Removes any previous contents so a rebuild starts from an empty store.
+    """
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.makedirs(store_dir, exist_ok=True)
+
+
+def write_part(store_dir, df, part_no, month=None, batches=(0, 0)):
+    """
+    Persists one cleaned partition as uncompressed Feather so it can be
+    memory-mapped, and returns its manifest entry with its month (the last
+    one, for a partition of several sparse months), the first and last append whose rows it holds (0 for the ingested CSV)
+    and its first and last timestamp, which readers use to skip it.
+    """
+    path = part_path(store_dir, part_no)
+    tmp_path = f"{path}.tmp"
+    df.to_feather(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    timestamps = df["Datetime"] if "Datetime" in df.columns else pd.Series(dtype="datetime64[us]")
+    first, last = timestamps.min(), timestamps.max()
+    return {
+        "file": os.path.basename(path),
+        "rows": len(df),
+        "month": month,
+        "batches": list(batches),
+        "min": None if pd.isna(first) else first.isoformat(),
+        "max": None if pd.isna(last) else last.isoformat(),
+    }
+
+
+def write_manifest(store_dir, fingerprint, parts):
+    """
+    Records the parts of a finished store. The manifest is written last;
+    its presence marks the store as complete.
+    """
+    _write_json(os.path.join(store_dir, MANIFEST_FILE), {
+        "version": STORE_VERSION,
+        "fingerprint": fingerprint,
+        "rows": sum(part["rows"] for part in parts),
+        "parts": parts,
+        "batches": 0,
+        "next_part": len(parts),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+
+def _save_manifest(store_dir, manifest):
+    manifest["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    _write_json(os.path.join(store_dir, MANIFEST_FILE), manifest)
+
+
+def append_parts(store_dir, partitions, source=None):
+    """
+    Adds a cleaned batch, split into (month, frame) partitions, to a complete
+    store as its next parts and records them in the manifest under the next
+    append number. Appends are expected to come from a single writer.
+    """
+    manifest = read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No prepared store at {store_dir}")
+
+    batch = manifest["batches"] + 1
+    parts = []
+    for month, df in partitions:
+        part = write_part(store_dir, df, manifest["next_part"] + len(parts), month=month, batches=(batch, batch))
+        if source is not None:
+            part["source"] = source
+        parts.append(part)
+    manifest["parts"].extend(parts)
+    manifest["rows"] += sum(part["rows"] for part in parts)
+    manifest["batches"] = batch
+    manifest["next_part"] += len(parts)
+    # Parts replaced by the previous append's compaction are deleted only now,
+    # so a reader holding the manifest from before it could still open them
+    retired = manifest.pop("retired", [])
+    # The parts are on disk before the manifest lists them, so readers never see a missing part
+    _save_manifest(store_dir, manifest)
+    for file in retired:
+        try:
+            os.remove(os.path.join(store_dir, file))
+        except FileNotFoundError:
+            pass
+    return parts
+
+
+def replace_parts(store_dir, parts, df, month):
+    """
+    Replaces parts of one month with a single part holding df, their merged
+    rows, at the position of the first of them. The replaced files stay on
+    disk until the next append.
+    """
+    manifest = read_manifest(store_dir)
+    files = {part["file"] for part in parts}
+    batches = (min(part["batches"][0] for part in parts), max(part["batches"][1] for part in parts))
+    merged = write_part(store_dir, df, manifest["next_part"], month=month, batches=batches)
+    kept = []
+    for part in manifest["parts"]:
+        if part["file"] not in files:
+            kept.append(part)
+        elif merged is not None:
+            kept.append(merged)
+            merged = None
+    manifest["parts"] = kept
+    manifest["next_part"] += 1
+    manifest["retired"] = manifest.get("retired", []) + sorted(files)
+    _save_manifest(store_dir, manifest)
+
+
+def split_parts(parts, batches):
+    """
+    Splits parts into those holding rows of the first `batches` appends and
+    those holding rows appended later. Returns None when compaction merged
+    rows from both sides into one part, so a reader that loaded the first
+    `batches` appends has to reload instead.
+    """
+    loaded, new = [], []
+    for part in parts:
+        first, last = part["batches"]
+        if last <= batches:
+            loaded.append(part)
+        elif first > batches:
+            new.append(part)
+        else:
+            return None
+    return loaded, new
@@ -1,5 +1,8 @@
 import streamlit as st
 
+from analytics.filters import filter_frame
+from utils.filter_index import FilterIndex
+
 def apply_custom_css():
     """
     Applies custom CSS to clean up the Streamlit UI and match the desired aesthetic.
@@ -43,43 +46,53 @@ def apply_custom_css():
         </style>
         """, unsafe_allow_html=True)
 
-def sidebar_filters(df):
+def sidebar_filter_state(index):
     """
-    Common sidebar filters that can be reused or modified.
-    Returns the filtered dataframe.
+    Renders the common sidebar filters and returns the selection as a dict
+    accepted by FilterIndex.select and ViolationCube.where.
     """
     st.sidebar.header("Filters")
-    
+    filters = {'date_range': None}
+
     # Date Range
-    if 'Datetime' in df.columns and not df['Datetime'].isnull().all():
-        min_date = df['Datetime'].min().date()
-        max_date = df['Datetime'].max().date()
-        
+    bounds = index.date_bounds()
+    if bounds is not None:
+        min_date, max_date = bounds
+
         try:
-            date_range = st.sidebar.date_input(
+            selected_dates = st.sidebar.date_input(
                 "Select Date Range",
                 value=(min_date, max_date),
                 min_value=min_date,
                 max_value=max_date
             )
-            if len(date_range) == 2:
-                start_date, end_date = date_range
-                df = df[(df['Datetime'].dt.date >= start_date) & (df['Datetime'].dt.date <= end_date)]
+            if len(selected_dates) == 2:
+                filters['date_range'] = tuple(selected_dates)
         except Exception:
             pass # Handle date input errors gracefully
 
     # State/Location Filter
-    if 'Location' in df.columns:
-        all_locations = sorted(df['Location'].unique().tolist())
+    if index.indexes('Location'):
+        all_locations = index.options('Location')
         selected_locations = st.sidebar.multiselect("Select State/Location", all_locations, default=all_locations)
-        if selected_locations:
-            df = df[df['Location'].isin(selected_locations)]
-            
+        filters['Location'] = selected_locations or None
+
     # Violation Type Filter
-    if 'Violation_Type' in df.columns:
-        all_violations = sorted(df['Violation_Type'].unique().tolist())
+    if index.indexes('Violation_Type'):
+        all_violations = index.options('Violation_Type')
         selected_violations = st.sidebar.multiselect("Select Violation Type", all_violations, default=all_violations)
-        if selected_violations:
-            df = df[df['Violation_Type'].isin(selected_violations)]
+        filters['Violation_Type'] = selected_violations or None
 
-    return df
+    return filters
+
+
+def sidebar_filters(df, index=None):
+    """
+    Common sidebar filters that can be reused or modified.
+    Returns the filtered dataframe.
+
+    index is a FilterIndex built over df; without one an index is built on the fly.
+    """
+    if index is None:
+        index = FilterIndex(df)
+    return filter_frame(df, index, sidebar_filter_state(index))
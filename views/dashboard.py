@@ -1,16 +1,54 @@
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
 import base64
 
+from analytics.anomalies import MIN_COUNT, Z_THRESHOLD
+from analytics.dashboard import aggregates
+from analytics.quantiles import COMPRESSION
+from utils.instrumentation import dataframe, plotly_chart
+from utils.memo import memoize
+
 def get_base64_of_bin_file(bin_file):
     with open(bin_file, 'rb') as f:
         data = f.read()
     return base64.b64encode(data).decode()
 
-def show(df):
+def show_alerts(alerts):
+    st.subheader("🚨 Spike Alerts")
+    st.caption(f"Days on which a state's count of one violation type was at least {MIN_COUNT} and "
+               f"{Z_THRESHOLD:g} deviations above its usual level for that weekday.")
+    if alerts.empty:
+        st.success("No spikes under the current filters.")
+        return
+    st.write(f"**{len(alerts):,}** spikes; the most recent are listed first.")
+    dataframe(alerts.head(100), hide_index=True, column_config={
+        'Date': st.column_config.DateColumn(format="YYYY-MM-DD"),
+        'Expected': st.column_config.NumberColumn(format="%.1f"),
+        'Z_Score': st.column_config.NumberColumn("Z-Score", format="%.1f"),
+    })
+
+def show_percentiles(quantiles):
+    st.subheader("📏 Percentiles")
+    table = memoize('dashboard.percentiles', quantiles.key, {}, quantiles.percentiles)
+    if not table['Count'].any():
+        st.info("No violations under the current filters.")
+        return
+    dataframe(table, hide_index=True, column_config={
+        'Count': st.column_config.NumberColumn("Rows", format="%d"),
+        **{col: st.column_config.NumberColumn(format="%.2f") for col in ('Median', 'P90', 'P99')},
+    })
+    st.caption(f"Estimated from t-digests (compression {COMPRESSION}) kept per month, state and violation type; "
+               "months the date range covers partly are read from the rows. "
+               "Overspeed is the recorded speed minus the speed limit.")
+
+def warm(cube):
+    memoize('dashboard', cube.key, {}, lambda: aggregates(cube))
+
+def warm_percentiles(quantiles):
+    memoize('dashboard.percentiles', quantiles.key, {}, quantiles.percentiles)
+
+def show(cube, alerts, quantiles):
     # --- Title Section (Above Image) ---
     st.markdown("<h1 style='text-align: center; margin-bottom: 20px;'>🚦 SMART TRAFFIC DETECTOR 🚦</h1>", unsafe_allow_html=True)
 
@@ -47,61 +85,65 @@ def show(df):
     except Exception as e:
         st.warning(f"Could not load banner: {e}")
         
+    aggs = memoize('dashboard', cube.key, {}, lambda: aggregates(cube))
+    totals = aggs['totals']
+    by_violation = aggs['by_violation']
+    state_counts = aggs['state_counts']
+    daily_stats = aggs['daily_stats']
+
     # --- Top KPIs ---
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_violations = len(df)
+        total_violations = totals['Count']
         st.metric("Total Violations", f"{total_violations:,}")
 
     with col2:
-        total_fines = df['Fine_Amount'].sum()
+        total_fines = totals['Fine_Sum']
         st.metric("Total Fines Collected", f"₹{total_fines:,.0f}")
 
     with col3:
-        # Use simple Numpy calculation for avg and std dev
-        if not df.empty:
-            fine_array = df['Fine_Amount'].to_numpy()
-            avg_fine = np.mean(fine_array)
-            std_fine = np.std(fine_array)
-        else:
-            avg_fine = 0
-            std_fine = 0
+        # Mean and std dev come from the cube's running sums
+        avg_fine = totals['Fine_Mean']
+        std_fine = totals['Fine_Std']
             
         st.metric("Avg Fine Amount", f"₹{avg_fine:,.0f}", delta=f"±₹{std_fine:.0f} SD")
         
     with col4:
         # Most common violation
-        if not df.empty:
-            top_violation = df['Violation_Type'].mode()[0]
+        if totals['Count']:
+            top_violation = by_violation['Violation_Type'].iloc[0]
         else:
             top_violation = "N/A"
         st.metric("Top Violation", top_violation)
 
     st.markdown("---")
 
+    show_alerts(alerts)
+
+    st.markdown("---")
+
+    show_percentiles(quantiles)
+
+    st.markdown("---")
+
     # --- Basic Graphs (Simple Streamlit Charts) ---
     st.subheader("General Statistics (Basic Charts)")
     b_col1, b_col2 = st.columns(2)
     
     with b_col1:
         st.write("**Top 5 Violations (Simple Bar)**")
-        if not df.empty:
-            # Preparing data for st.bar_chart
-            top_5 = df['Violation_Type'].value_counts().head(5)
-            st.bar_chart(top_5)
+        if totals['Count']:
+            st.bar_chart(aggs['top_5'])
             
     with b_col2:
         st.write("**Violation Counts by State**")
-        if not df.empty and 'Location' in df.columns:
-            state_counts = df['Location'].value_counts().reset_index()
-            state_counts.columns = ['State', 'Count']
-            
+        if totals['Count']:
             # Using Plotly to assign different colors to each state
             fig_state = px.bar(state_counts, x='State', y='Count', color='State',
                                title="Violations by State", template="plotly_dark")
             fig_state.update_layout(showlegend=False)
-            st.plotly_chart(fig_state, use_container_width=True)
+            plotly_chart(fig_state, use_container_width=True)
 
     st.markdown("---")
 
@@ -110,24 +152,15 @@ def show(df):
     
     with col_graph1:
         st.subheader("Violation Distribution")
-        if not df.empty:
-            viol_counts = df['Violation_Type'].value_counts().reset_index()
-            viol_counts.columns = ['Violation Type', 'Count']
-            fig_viol = px.bar(viol_counts, x='Count', y='Violation Type', orientation='h',
+        if totals['Count']:
+            fig_viol = px.bar(aggs['viol_counts'], x='Count', y='Violation Type', orientation='h',
                               color='Count', color_continuous_scale='Viridis',
                               title="Violations by Type")
-            st.plotly_chart(fig_viol, use_container_width=True)
+            plotly_chart(fig_viol, use_container_width=True)
             
     with col_graph2:
         st.subheader("Violations & Fines Over Time")
-        if not df.empty and 'Datetime' in df.columns:
-            # Group by date for a time series
-            daily_stats = df.groupby(df['Datetime'].dt.date).agg(
-                Violations=('Violation_ID', 'count'),
-                Daily_Fines=('Fine_Amount', 'sum')
-            ).reset_index()
-            daily_stats['Cumulative_Fines'] = daily_stats['Daily_Fines'].cumsum()
-            
+        if totals['Count']:
             # Interactive Area Chart with Range Slider
             fig_trend = px.area(daily_stats, x='Datetime', y='Violations',
                                 title="Daily Violation Volume (Interactive)",
@@ -136,7 +169,7 @@ def show(df):
             fig_trend.update_xaxes(rangeslider_visible=True)
             # Force legend to show "Total Violations"
             fig_trend.update_traces(name="Daily Violations", showlegend=True)
-            st.plotly_chart(fig_trend, use_container_width=True)
+            plotly_chart(fig_trend, use_container_width=True)
 
     # --- Insightful Quick Stats & Advanced Graph ---
     st.markdown("---")
@@ -146,29 +179,26 @@ def show(df):
     
     with i_col1:
         st.markdown("### Key Metrics")
-        if not df.empty:
+        if totals['Count']:
             # Top State
-            top_state = df['Location'].mode()[0]
+            top_state = state_counts['State'].iloc[0]
             st.info(f"**Highest Violation State**: {top_state}")
 
             # Max Fine
-            max_fine_row = df.loc[df['Fine_Amount'].idxmax()]
-            st.warning(f"**Highest Single Fine**: ₹{max_fine_row['Fine_Amount']:,} ({max_fine_row['Violation_Type']})")
+            max_fine_row = by_violation.loc[by_violation['Fine_Max'].idxmax()]
+            st.warning(f"**Highest Single Fine**: ₹{max_fine_row['Fine_Max']:,.0f} ({max_fine_row['Violation_Type']})")
 
             # Payment Rate
-            paid_count = df[df['Fine_Paid'] == 'Yes'].shape[0]
-            total_violations = len(df)
-            payment_rate = (paid_count / total_violations) * 100
+            payment_rate = (aggs['paid_count'] / totals['Count']) * 100
             st.success(f"**Fine Payment Rate**: {payment_rate:.1f}%")
 
     with i_col2:
         st.markdown("### Cumulative Revenue Impact")
-        if not df.empty and 'Datetime' in df.columns:
+        if totals['Count']:
             # Cumulative Fines Line Chart
             fig_rev = px.line(daily_stats, x='Datetime', y='Cumulative_Fines',
                               title="Cumulative Fines Collected (Financial Growth)",
                               template="plotly_dark",
                               line_shape='spline')
             fig_rev.update_traces(fill='tozeroy', line_color='#00CC96', name="Total Collected", showlegend=True)
-            st.plotly_chart(fig_rev, use_container_width=True)
-
+            plotly_chart(fig_rev, use_container_width=True)
@@ -1,41 +1,73 @@
 import streamlit as st
 import plotly.express as px
 
-def show(df):
+from analytics.distributions import SCATTER_ROW_THRESHOLD
+from analytics.driver_behavior import age_bounds, aggregates
+from utils.chart_helper import (
+    density_figure, distribution_figure, estimate_payload, scatter_row_threshold, show_density_note
+)
+from utils.instrumentation import plotly_chart
+from utils.memo import frame_key, memoize
+
+def _repeat_scatter(df):
+    return px.scatter(df, x='Driver_Age', y='Previous_Violations',
+                      color='Driver_Gender', size='Fine_Amount',
+                      title="Repeat Violations vs Age")
+
+def _aggregates(df, age_range, threshold):
+    aggs = aggregates(df, age_range, threshold)
+    if aggs['repeat_density'] is not None:
+        aggs['raw_bytes'] = estimate_payload(aggs['repeat_rows'], aggs['repeat_count'], _repeat_scatter)
+    return aggs
+
+def warm(df, filters):
+    memoize('driver_behavior.bounds', frame_key(df, filters), {}, lambda: age_bounds(df))
+    memoize('driver_behavior', frame_key(df, filters), {'age_range': (18, 60), 'threshold': SCATTER_ROW_THRESHOLD},
+            lambda: _aggregates(df, (18, 60), SCATTER_ROW_THRESHOLD))
+
+def show(df, filters):
     st.title("🧍 Driver Behavior Analysis")
 
     # --- Interactive Filters ---
     with st.expander("Filter Options", expanded=True):
         st.markdown("### Driver Demographics")
-        age_range = st.slider("Select Driver Age Range", 
-                                      int(df['Driver_Age'].min()), 
-                                      int(df['Driver_Age'].max()), 
+        age_min, age_max = memoize('driver_behavior.bounds', frame_key(df, filters), {}, lambda: age_bounds(df))
+        age_range = st.slider("Select Driver Age Range",
+                                      age_min,
+                                      age_max,
                                       (18, 60))
-                                      
-    filtered_df = df[(df['Driver_Age'] >= age_range[0]) & (df['Driver_Age'] <= age_range[1])]
+
+    threshold = scatter_row_threshold()
+    aggs = memoize('driver_behavior', frame_key(df, filters), {'age_range': age_range, 'threshold': threshold},
+                   lambda: _aggregates(df, age_range, threshold))
 
     col1, col2 = st.columns(2)
 
     with col1:
         st.subheader("Age Distribution (Violin)")
-        fig_violin = px.violin(filtered_df, x='Driver_Gender', y='Driver_Age', 
-                               color='Driver_Gender', box=True, 
-                               title="Age Spread by Gender")
-        st.plotly_chart(fig_violin, use_container_width=True)
+        fig_violin = distribution_figure(aggs['age_summary'], 'Driver_Gender', 'Driver_Age',
+                                         title="Age Spread by Gender", violin=True)
+        plotly_chart(fig_violin, use_container_width=True)
 
     with col2:
         st.subheader("Gender vs Fine Impact")
-        fig_box = px.box(filtered_df, x='Driver_Gender', y='Fine_Amount',
-                         title="Who pays more?")
-        st.plotly_chart(fig_box, use_container_width=True)
+        fig_box = distribution_figure(aggs['fine_summary'], 'Driver_Gender', 'Fine_Amount',
+                                      title="Who pays more?")
+        plotly_chart(fig_box, use_container_width=True)
+
+    st.subheader("Violations by Age Band")
+    fig_bands = px.bar(aggs['age_bands'], x='Age_Band', y='Violations', color='Repeat_Share',
+                       color_continuous_scale='Reds', labels={'Age_Band': 'Age band', 'Repeat_Share': 'Repeat share'},
+                       title="Violations and Repeat Offender Share per Age Band")
+    plotly_chart(fig_bands, use_container_width=True)
 
     st.subheader("Recidivism (Repeat Offenders)")
-    # Assuming 'Previous_Violations' is a count
-    repeat_offenders = filtered_df[filtered_df['Previous_Violations'] > 0]
-    st.metric("Repeat Offenders in Range", len(repeat_offenders))
-    
-    if not repeat_offenders.empty:
-        fig_rep = px.scatter(repeat_offenders, x='Driver_Age', y='Previous_Violations', 
-                             color='Driver_Gender', size='Fine_Amount',
-                             title="Repeat Violations vs Age")
-        st.plotly_chart(fig_rep, use_container_width=True)
+    st.metric("Repeat Offenders in Range", aggs['repeat_count'])
+
+    if aggs['repeat_density'] is not None:
+        grid = aggs['repeat_density']
+        fig_rep = density_figure(grid, 'Driver_Age', 'Previous_Violations', "Repeat Violations vs Age (Density)")
+        plotly_chart(fig_rep, use_container_width=True)
+        show_density_note(grid['points'], fig_rep, aggs['raw_bytes'])
+    elif aggs['repeat_count']:
+        plotly_chart(_repeat_scatter(aggs['repeat_rows']), use_container_width=True)
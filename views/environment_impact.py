@@ -1,20 +1,29 @@
 import streamlit as st
 import plotly.express as px
 
-def show(df):
+from analytics.environment_impact import aggregates
+from utils.instrumentation import plotly_chart
+from utils.memo import memoize
+
+def warm(cube):
+    memoize('environment_impact', cube.key, {}, lambda: aggregates(cube))
+
+def show(cube):
     st.title("🌨️ Environment Impact Analysis")
     st.write("Analyzing how weather and road conditions correlate with violations.")
 
+    weather_counts, road_counts = memoize('environment_impact', cube.key, {}, lambda: aggregates(cube))
+
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Violations by Weather")
-        fig_w = px.histogram(df, x='Weather_Condition', color='Weather_Condition', 
-                             title="Impact of Weather")
-        st.plotly_chart(fig_w, use_container_width=True)
+        fig_w = px.bar(weather_counts, x='Weather_Condition', y='Count', color='Weather_Condition',
+                       title="Impact of Weather")
+        plotly_chart(fig_w, use_container_width=True)
         
     with col2:
         st.subheader("Violations by Road Condition")
-        fig_r = px.histogram(df, x='Road_Condition', color='Road_Condition',
-                             title="Impact of Road Conditions")
-        st.plotly_chart(fig_r, use_container_width=True)
+        fig_r = px.bar(road_counts, x='Road_Condition', y='Count', color='Road_Condition',
+                       title="Impact of Road Conditions")
+        plotly_chart(fig_r, use_container_width=True)
@@ -0,0 +1,56 @@
+import streamlit as st
+import plotly.express as px
+
+from analytics.officer_workload import TOP_OFFICERS, aggregates
+from analytics.sketches import GROUP_COLUMN, HLL_PRECISION, TOP_K_CAPACITY, TOP_K_COLUMN
+from utils.instrumentation import dataframe, plotly_chart
+from utils.memo import memoize
+
+def warm(sketches, filters):
+    memoize('officer_workload', sketches.key, {'date_range': filters['date_range'], 'top_n': TOP_OFFICERS},
+            lambda: aggregates(sketches, filters['date_range'], TOP_OFFICERS))
+
+def show(sketches, filters):
+    st.title("👮 Officer Workload")
+    st.write("Who issues violations and to how many distinct drivers, over the selected dates.")
+
+    top_n = st.slider("Officers to list", 5, TOP_K_CAPACITY, TOP_OFFICERS)
+    aggs = memoize('officer_workload', sketches.key, {'date_range': filters['date_range'], 'top_n': top_n},
+                   lambda: aggregates(sketches, filters['date_range'], top_n))
+    totals = aggs['totals']
+    if not totals['Violations']:
+        st.warning("No dated violations in the selected range.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Violations", f"{totals['Violations']:,}")
+    col2.metric("Active Officers (est.)", f"{totals['Officers']:,}")
+    col3.metric("Distinct Drivers (est.)", f"{totals['Drivers']:,}")
+    col4.metric("Violations per Officer", f"{totals['Violations'] / max(totals['Officers'], 1):,.1f}")
+
+    st.subheader("Workload by Issuing Agency")
+    agencies = aggs['agencies']
+    fig_agency = px.bar(agencies, x=GROUP_COLUMN, y='Violations', color='Per_Officer',
+                        hover_data=['Officers', 'Drivers'], color_continuous_scale='Oranges',
+                        labels={'Per_Officer': 'Per officer'}, title="Violations per Agency")
+    plotly_chart(fig_agency, use_container_width=True)
+    dataframe(agencies, hide_index=True, column_config={
+        'Officers': st.column_config.NumberColumn("Officers (est.)", format="%d"),
+        'Drivers': st.column_config.NumberColumn("Drivers (est.)", format="%d"),
+        'Per_Officer': st.column_config.NumberColumn("Violations per Officer", format="%.1f"),
+    })
+
+    st.subheader(f"Top {top_n} Issuing Officers")
+    officers = aggs['top_officers']
+    # Bars show the counted violations; the error bar reaches the most the true count can be
+    fig_officers = px.bar(officers.iloc[::-1], x='Violations', y=TOP_K_COLUMN, orientation='h',
+                          error_x='Max_Error', error_x_minus=[0] * len(officers), title="Most Active Officers")
+    fig_officers.update_layout(height=max(400, 22 * len(officers)), yaxis_title=None)
+    plotly_chart(fig_officers, use_container_width=True)
+
+    st.caption(f"Officer and driver counts are HyperLogLog estimates ({2 ** HLL_PRECISION} registers, about "
+               f"{104 / 2 ** (HLL_PRECISION / 2):.0f}% error). Officer rankings merge the top {TOP_K_CAPACITY} "
+               "officers of each day; an officer's true count lies between the bar and the end of its error bar. "
+               "Drivers are told apart by registration state, vehicle and licence attributes. "
+               "State and violation type filters do not apply to this page. "
+               f"The sketches take {sketches.nbytes / 1e6:,.1f} MB for {len(sketches.days):,} days.")
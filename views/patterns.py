@@ -0,0 +1,49 @@
+import streamlit as st
+import plotly.express as px
+
+from analytics.patterns import MAX_ITEMS, MIN_SUPPORT, PATTERN_ATTRIBUTES, aggregates
+from utils.instrumentation import dataframe, plotly_chart
+from utils.memo import memoize
+
+def warm(cube):
+    memoize('patterns', cube.key, {'min_support': MIN_SUPPORT, 'max_items': MAX_ITEMS, 'attributes': PATTERN_ATTRIBUTES},
+            lambda: aggregates(cube, MIN_SUPPORT, MAX_ITEMS, PATTERN_ATTRIBUTES))
+
+def show(cube):
+    st.title("🧩 Violation Patterns")
+    st.write("Attribute combinations that occur together more often than chance under the current filters.")
+
+    with st.expander("Mining Options", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_support = st.slider("Minimum support (%)", 0.1, 10.0, MIN_SUPPORT * 100, step=0.1) / 100
+        with col2:
+            max_items = st.slider("Maximum items per pattern", 2, len(PATTERN_ATTRIBUTES), MAX_ITEMS)
+        with col3:
+            sort_by = st.radio("Rank by", ["Lift", "Support"], horizontal=True)
+        attributes = st.multiselect("Attributes", PATTERN_ATTRIBUTES, default=PATTERN_ATTRIBUTES)
+
+    if len(attributes) < 2:
+        st.info("Select at least two attributes.")
+        return
+
+    patterns = memoize(
+        'patterns', cube.key, {'min_support': min_support, 'max_items': max_items, 'attributes': attributes},
+        lambda: aggregates(cube, min_support, max_items, attributes)
+    )
+    if patterns.empty:
+        st.warning("No patterns reach the minimum support. Try lowering it or widening the filters.")
+        return
+
+    top = patterns.sort_values([sort_by, 'Count'], ascending=False, kind='stable').head(20)
+    st.caption(f"{len(patterns):,} frequent patterns; lift above 1 means the values co-occur more than expected.")
+
+    st.subheader(f"Top Patterns by {sort_by}")
+    fig = px.bar(top.iloc[::-1], x=sort_by, y='Pattern', orientation='h', color='Support',
+                 hover_data=['Count', 'Lift'], color_continuous_scale='Reds', title="Top Patterns")
+    fig.update_layout(height=600, yaxis_title=None)
+    plotly_chart(fig, use_container_width=True)
+
+    st.subheader("All Patterns")
+    dataframe(patterns[['Pattern', 'Items', 'Count', 'Support', 'Lift']], hide_index=True,
+              column_config={'Support': st.column_config.NumberColumn(format="percent")})
@@ -1,80 +1,73 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 import folium
-from streamlit_folium import st_folium
 
-def show(df):
+from analytics.risk_map import HEX_SIZE, aggregates, hex_bins, hex_features, point_features
+from utils.instrumentation import dataframe, plotly_chart, st_folium
+from utils.memo import memoize
+
+# Base map settings, centered on India. Only the violation layer changes between reruns.
+MAP_CENTER = [20.5937, 78.9629]
+MAP_ZOOM = 4
+MAP_TILES = "CartoDB dark_matter"
+
+def _base_map():
+    """
+    A plain base map for one render; st_folium adds the layer to it, so it is never shared.
+    """
+    return folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM, tiles=MAP_TILES)
+
+def _layer_data(map_data, layer_type, hex_size):
+    if layer_type == "Hex grid":
+        return hex_features(hex_bins(map_data, hex_size), px.colors.sequential.Reds, hex_size)
+    return point_features(map_data, px.colors.sequential.Plasma)
+
+def _feature_group(layer, layer_type):
+    """
+    One GeoJSON layer for all locations or cells; each feature carries its own style.
+    """
+    group = folium.FeatureGroup(name="Violations")
+    if layer_type == "Hex grid":
+        folium.GeoJson(layer, tooltip=folium.GeoJsonTooltip(
+            ['Total_Violations', 'Avg_Fine', 'Locations'], aliases=['Violations', 'Avg fine', 'Locations']
+        )).add_to(group)
+    else:
+        folium.GeoJson(layer, marker=folium.CircleMarker(fill=True, fill_opacity=0.6), tooltip=folium.GeoJsonTooltip(
+            ['Location', 'Total_Violations', 'Avg_Fine'], aliases=['Location', 'Violations', 'Avg fine']
+        )).add_to(group)
+    return group
+
+def _show_map(group):
+    # The stable key keeps the component mounted, so reruns only swap the layer
+    st_folium(_base_map(), key="risk_map", feature_group_to_add=group, width=700, height=500,
+              use_container_width=True, returned_objects=[])
+
+def warm(cube):
+    # The Locations layer is the one shown first
+    _, map_data = memoize('risk_map', cube.key, {}, lambda: aggregates(cube))
+    if not map_data.empty:
+        memoize('risk_map_layer', cube.key, {'layer': "Locations", 'hex_size': HEX_SIZE},
+                lambda: _layer_data(map_data, "Locations", HEX_SIZE))
+
+def show(cube):
     st.title("🗺️ India Risk Map Analysis")
     st.write("Geospatial distribution of traffic violations across Indian states.")
 
-    if df.empty:
+    state_stats, map_data = memoize('risk_map', cube.key, {}, lambda: aggregates(cube))
+    if state_stats.empty:
         st.warning("No data available to display maps.")
         return
 
-    # Aggregate data by State (Location)
-    state_stats = df.groupby('Location').agg(
-        Total_Violations=('Violation_ID', 'count'),
-        Total_Fines=('Fine_Amount', 'sum'),
-        Avg_Fine=('Fine_Amount', 'mean')
-    ).reset_index()
-    
-    indian_states_coords = {
-        "Andhra Pradesh": [15.9129, 79.7400],
-        "Arunachal Pradesh": [28.2180, 94.7278],
-        "Assam": [26.2006, 92.9376],
-        "Bihar": [25.0961, 85.3131],
-        "Chhattisgarh": [21.2787, 81.8661],
-        "Goa": [15.2993, 74.1240],
-        "Gujarat": [22.2587, 71.1924],
-        "Haryana": [29.0588, 76.0856],
-        "Himachal Pradesh": [31.1048, 77.1734],
-        "Jharkhand": [23.6102, 85.2799],
-        "Karnataka": [15.3173, 75.7139],
-        "Kerala": [10.8505, 76.2711],
-        "Madhya Pradesh": [22.9734, 78.6569],
-        "Maharashtra": [19.7515, 75.7139],
-        "Manipur": [24.6637, 93.9063],
-        "Meghalaya": [25.4670, 91.3662],
-        "Mizoram": [23.1645, 92.9376],
-        "Nagaland": [26.1584, 94.5624],
-        "Odisha": [20.9517, 85.0985],
-        "Punjab": [31.1471, 75.3412],
-        "Rajasthan": [27.0238, 74.2179],
-        "Sikkim": [27.5330, 88.5122],
-        "Tamil Nadu": [11.1271, 78.6569],
-        "Telangana": [18.1124, 79.0193],
-        "Tripura": [23.9408, 91.9882],
-        "Uttar Pradesh": [26.8467, 80.9462],
-        "Uttarakhand": [30.0668, 79.0193],
-        "West Bengal": [22.9868, 87.8550],
-        "Delhi": [28.7041, 77.1025]
-    }
-
-    state_stats['lat'] = state_stats['Location'].map(lambda x: indian_states_coords.get(x, [None, None])[0])
-    state_stats['lon'] = state_stats['Location'].map(lambda x: indian_states_coords.get(x, [None, None])[1])
-    
-    # Filter out locations we couldn't map
-    map_data = state_stats.dropna(subset=['lat', 'lon'])
-
     # --- Folium Map ---
     st.subheader("Geospatial View (Folium)")
     if not map_data.empty:
-        # Center map on India
-        m = folium.Map(location=[20.5937, 78.9629], zoom_start=4, tiles="CartoDB dark_matter")
-        
-        for _, row in map_data.iterrows():
-            # Add markers
-            folium.CircleMarker(
-                location=[row['lat'], row['lon']],
-                radius=row['Total_Violations'] * 0.05, # Scale radius or use log
-                popup=f"{row['Location']}: {row['Total_Violations']} Violations",
-                color="#ff4b4b",
-                fill=True,
-                fill_color="#ff4b4b"
-            ).add_to(m)
-            
-        st_folium(m, width=700, height=500, use_container_width=True)
+        layer_type = st.radio("Layer", ["Locations", "Hex grid"], horizontal=True)
+        hex_size = HEX_SIZE
+        if layer_type == "Hex grid":
+            hex_size = st.slider("Hex size (degrees)", 0.25, 4.0, HEX_SIZE, step=0.25)
+        layer = memoize('risk_map_layer', cube.key, {'layer': layer_type, 'hex_size': hex_size},
+                        lambda: _layer_data(map_data, layer_type, hex_size))
+        _show_map(_feature_group(layer, layer_type))
     else:
         st.write("Map data unavailable.")
 
@@ -94,7 +87,7 @@ def show(df):
             mapbox_style="carto-darkmatter",
             title="Violation Hotspots"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        plotly_chart(fig, use_container_width=True)
     else:
         st.info("Could not map state names to coordinates. Showing stats instead.")
 
@@ -105,8 +98,8 @@ def show(df):
         fig_tree = px.treemap(state_stats, path=['Location'], values='Total_Violations',
                               color='Total_Fines', color_continuous_scale='RdBu',
                               title="Volume vs Value")
-        st.plotly_chart(fig_tree, use_container_width=True)
+        plotly_chart(fig_tree, use_container_width=True)
 
     with col2:
         st.subheader("State-wise Statistics")
-        st.dataframe(state_stats.set_index('Location').style.background_gradient(cmap='Reds'))
+        dataframe(state_stats.set_index('Location').style.background_gradient(cmap='Reds'))
@@ -1,54 +1,85 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 
-def show(df):
+from analytics.distributions import SCATTER_ROW_THRESHOLD
+from analytics.violation_trends import aggregates, fine_bounds
+from utils.chart_helper import (
+    density_figure, distribution_figure, estimate_payload, scatter_row_threshold, show_density_note
+)
+from utils.instrumentation import plotly_chart
+from utils.memo import frame_key, memoize
+
+def _speed_fine_scatter(df):
+    return px.scatter(df, x='Recorded_Speed', y='Fine_Amount',
+                      color='Violation_Type', size='Fine_Amount',
+                      hover_data=['Location'],
+                      title="Correlation: Speed vs Fine")
+
+def _aggregates(df, min_fine, threshold):
+    aggs = aggregates(df, min_fine, threshold)
+    if aggs['density'] is not None:
+        aggs['raw_bytes'] = estimate_payload(aggs['scatter_rows'], aggs['rows'], _speed_fine_scatter)
+    return aggs
+
+def warm(df, filters):
+    if df.empty:
+        return
+    memoize('violation_trends.bounds', frame_key(df, filters), {}, lambda: fine_bounds(df))
+    memoize('violation_trends', frame_key(df, filters), {'min_fine': 0, 'threshold': SCATTER_ROW_THRESHOLD},
+            lambda: _aggregates(df, 0, SCATTER_ROW_THRESHOLD))
+
+def show(df, filters):
     st.title("📊 Violation Trends")
-    
+
     if df.empty:
         st.write("No data available.")
         return
 
-    
-    
+
+
     # --- Interactive Filters ---
     with st.expander("Filter Options", expanded=True):
         st.markdown("### Violation Trends Options")
-        min_fine = st.slider("Minimum Fine Amount", 
-                                     min_value=int(df['Fine_Amount'].min()), 
-                                     max_value=int(df['Fine_Amount'].max()), 
+        fine_min, fine_max = memoize('violation_trends.bounds', frame_key(df, filters), {}, lambda: fine_bounds(df))
+        min_fine = st.slider("Minimum Fine Amount",
+                                     min_value=fine_min,
+                                     max_value=fine_max,
                                      value=0, step=100)
-    
-    filtered_df = df[df['Fine_Amount'] >= min_fine]
-    
+
+    threshold = scatter_row_threshold()
+    aggs = memoize('violation_trends', frame_key(df, filters), {'min_fine': min_fine, 'threshold': threshold},
+                   lambda: _aggregates(df, min_fine, threshold))
+
     col1, col2 = st.columns(2)
 
     with col1:
         # Sunburst Chart: Violation Type -> Vehicle Type
         st.subheader("Violation Hierarchy")
-        if not filtered_df.empty:
-            fig_sun = px.sunburst(filtered_df, path=['Violation_Type', 'Vehicle_Type'], 
+        if not aggs['sun_data'].empty:
+            fig_sun = px.sunburst(aggs['sun_data'], path=['Violation_Type', 'Vehicle_Type'],
                                   values='Fine_Amount', color='Violation_Type',
                                   title="Violation Type > Vehicle Type Distribution")
-            st.plotly_chart(fig_sun, use_container_width=True)
+            plotly_chart(fig_sun, use_container_width=True)
         else:
             st.info("No data for current filter.")
 
     with col2:
         # Scatter Plot: Fine Amount vs Speed
         st.subheader("Fine Amount vs Speed")
-        if not filtered_df.empty and 'Recorded_Speed' in filtered_df.columns:
-            fig_scatter = px.scatter(filtered_df, x='Recorded_Speed', y='Fine_Amount',
-                                     color='Violation_Type', size='Fine_Amount',
-                                     hover_data=['Location'],
-                                     title="Correlation: Speed vs Fine")
-            st.plotly_chart(fig_scatter, use_container_width=True)
+        if aggs['density'] is not None:
+            grid = aggs['density']
+            fig_density = density_figure(grid, 'Recorded_Speed', 'Fine_Amount', "Correlation: Speed vs Fine (Density)")
+            plotly_chart(fig_density, use_container_width=True)
+            show_density_note(grid['points'], fig_density, aggs['raw_bytes'])
+        elif aggs['rows']:
+            plotly_chart(_speed_fine_scatter(aggs['scatter_rows']), use_container_width=True)
         else:
             st.info("Insufficient data for scatter plot.")
 
     # Box Plot remains relevant for distribution analysis
     st.subheader("Fine Amount Distribution (Box Plot)")
-    if not filtered_df.empty:
-        fig_box = px.box(filtered_df, x='Violation_Type', y='Fine_Amount', color='Violation_Type',
-                         title="Fine Variations by Type")
-        st.plotly_chart(fig_box, use_container_width=True)
+    if aggs['rows']:
+        # Quartiles and whiskers are computed server-side; only the summary is sent
+        fig_box = distribution_figure(aggs['fine_summary'], 'Violation_Type', 'Fine_Amount',
+                                      title="Fine Variations by Type")
+        plotly_chart(fig_box, use_container_width=True)